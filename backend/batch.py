@@ -0,0 +1,99 @@
+"""
+Batch generation for many schools: pool sizing, per-job solver threads, time budgets and the
+batch summary. Used by the /api/generate-batch endpoint and by batch_cli.py.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Iterator
+
+from models import ScheduleRequest
+from solver import generate_schedule
+
+BATCH_MAX_WORKERS = int(os.environ.get("SCHEDULER_BATCH_MAX_WORKERS", "0")) or None  # None = one per core
+
+
+def batch_pool_size(job_count: int, max_workers: Optional[int] = None) -> int:
+    """
+    Number of worker processes for a batch: one per core, never more than there are jobs.
+    A requested max_workers is capped at SCHEDULER_BATCH_MAX_WORKERS (default: the core count).
+    """
+    limit = BATCH_MAX_WORKERS or os.cpu_count() or 1
+    return max(1, min(job_count, max_workers or limit, limit))
+
+
+def prepare_batch(requests: List[ScheduleRequest], pool_size: int) -> List[ScheduleRequest]:
+    """
+    Splits the cores between the pool processes so that N parallel CP-SAT solves
+    do not each spawn one search thread per core (oversubscription).
+    Requests that already set solver_workers are left untouched.
+    """
+    threads = max(1, (os.cpu_count() or 1) // pool_size)
+    return [
+        req if req.solver_workers else req.model_copy(update={"solver_workers": threads})
+        for req in requests
+    ]
+
+
+def apply_time_budget(request: ScheduleRequest, seconds: float) -> ScheduleRequest:
+    """Soft limit of about `seconds` for one job, spread over the fields each strategy reads (fields the request already sets win)."""
+    update = {"time_budget": seconds, "timeout": max(1, int(seconds)), "genetic_time_budget": seconds}
+    return request.model_copy(update={k: v for k, v in update.items() if k not in request.model_fields_set})
+
+
+def run_batch_job(index: int, request: ScheduleRequest) -> Dict[str, Any]:
+    """
+    Worker function (module level for pickling): solves one school and returns
+    the result together with its timing and a short summary.
+    """
+    started = time.perf_counter()
+    try:
+        result = generate_schedule(request)
+    except Exception as e:
+        result = {"status": "error", "message": str(e)}
+    elapsed = time.perf_counter() - started
+
+    return {
+        "index": index,
+        "school_id": request.school_id or str(index),
+        "status": result["status"],
+        "lessons": len(result.get("schedule") or []),
+        "violations": len(result.get("violations") or []),
+        "elapsed": round(elapsed, 3),
+        "result": result,
+    }
+
+
+def summarize_batch(jobs: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    """Aggregates per-school job reports (without the schedules) into a batch summary."""
+    by_status = {}
+    for job in jobs:
+        by_status[job["status"]] = by_status.get(job["status"], 0) + 1
+
+    solve_time = sum(job["elapsed"] for job in jobs)
+    return {
+        "total": len(jobs),
+        "by_status": by_status,
+        "total_violations": sum(job["violations"] for job in jobs),
+        "wall_time": round(wall_time, 3),
+        "solve_time": round(solve_time, 3),
+        # How many solves ran in parallel on average (1.0 = serial)
+        "parallelism": round(solve_time / wall_time, 2) if wall_time > 0 else 0.0,
+        "schools": [
+            {k: job[k] for k in ("index", "school_id", "status", "lessons", "violations", "elapsed")}
+            for job in sorted(jobs, key=lambda j: j["index"])
+        ],
+    }
+
+
+def iter_batch(requests: List[ScheduleRequest], max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Solves all requests across a process pool, yielding job reports in completion order."""
+    if not requests:
+        return
+    pool_size = batch_pool_size(len(requests), max_workers)
+    jobs = prepare_batch(requests, pool_size)
+
+    with ProcessPoolExecutor(max_workers=pool_size) as executor:
+        futures = [executor.submit(run_batch_job, i, req) for i, req in enumerate(jobs)]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,97 @@
+"""
+Headless batch generation: solves ScheduleRequest JSON files (the generate_data.py shape)
+across a process pool, without the API or the database:
+
+    python batch_cli.py schools/*.json --workers 4 --time-budget 60 --output-dir results/ --csv summary.csv
+
+A file holds one request, a list of requests or {"requests": [...]}; a directory stands for
+its *.json files. Requests without a school_id are named after their file. --time-budget
+bounds each job's solve: the OR-Tools cascade passes, their alternatives and the decomposition
+stages share it, PuLP and local search get it as their timeout and the genetic strategy as its
+budget (values set in the request itself win). It is a soft limit: a running CP-SAT call or
+CBC process is not interrupted, and repair mode only uses it for its last level.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+
+from models import ScheduleRequest
+from batch import iter_batch, summarize_batch, apply_time_budget
+
+SUMMARY_FIELDS = ["index", "school_id", "status", "lessons", "violations", "elapsed"]
+
+
+def load_requests(paths):
+    requests = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            files = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+            for file in files:
+                with open(file, encoding="utf-8") as f:
+                    state = json.load(f)
+                items = state.get("requests", [state]) if isinstance(state, dict) else state
+                stem = os.path.splitext(os.path.basename(file))[0]
+                for i, item in enumerate(items):
+                    request = ScheduleRequest(**item)
+                    if not request.school_id:
+                        request = request.model_copy(update={"school_id": stem if len(items) == 1 else f"{stem}-{i}"})
+                    requests.append(request)
+    return requests
+
+
+def print_table(summary):
+    width = max([len("school")] + [len(s["school_id"]) for s in summary["schools"]])
+    print(f"{'school':<{width}}  {'status':<8} {'lessons':>7} {'viol.':>5} {'time, s':>8}")
+    for s in summary["schools"]:
+        print(f"{s['school_id']:<{width}}  {s['status']:<8} {s['lessons']:>7} {s['violations']:>5} {s['elapsed']:>8.2f}")
+    statuses = ", ".join(f"{status} {count}" for status, count in sorted(summary["by_status"].items()))
+    print(f"{summary['total']} schools ({statuses}), wall {summary['wall_time']}s, "
+          f"solve {summary['solve_time']}s, parallelism x{summary['parallelism']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate timetables for ScheduleRequest JSON files in parallel")
+    parser.add_argument("inputs", nargs="+", help="ScheduleRequest JSON files, globs or directories of them")
+    parser.add_argument("--workers", type=int, help="Pool processes (default: one per core, at most one per job)")
+    parser.add_argument("--time-budget", type=float, help="Soft limit in seconds per job (see above for what it bounds)")
+    parser.add_argument("--output-dir", help="Write every job's result (schedule, violations) as <school_id>.json here")
+    parser.add_argument("--csv", help="Write the per-school summary rows as CSV here")
+    parser.add_argument("--json", help="Write the batch summary as JSON here")
+    args = parser.parse_args(argv)
+
+    requests = load_requests(args.inputs)
+    if not requests:
+        raise SystemExit("No requests found")
+    if args.time_budget:
+        requests = [apply_time_budget(req, args.time_budget) for req in requests]
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    print(f"🗂️ {len(requests)} schools")
+
+    started = time.perf_counter()
+    jobs = []
+    for job in iter_batch(requests, max_workers=args.workers):
+        jobs.append(job)
+        print(f"[{len(jobs)}/{len(requests)}] {job['school_id']}: {job['status']}, "
+              f"{job['lessons']} lessons, {job['violations']} violations in {job['elapsed']}s")
+        if args.output_dir:
+            with open(os.path.join(args.output_dir, f"{job['school_id']}.json"), "w", encoding="utf-8") as f:
+                json.dump(job["result"], f, ensure_ascii=False, indent=2)
+    summary = summarize_batch(jobs, time.perf_counter() - started)
+    print_table(summary)
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(summary["schools"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 1 if summary["by_status"].get("error") else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy.orm import sessionmaker
+from models import ScheduleRequest, Teacher, Subject, ClassGroup, TeachingPlanItem
+
+# Tests that import main must not create/migrate the bundled school_scheduler.db (nor whatever
+# database SCHEDULER_DATABASE_URL points the app at), so they always get a throwaway one
+os.environ["SCHEDULER_DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_scheduler.db')}"
+os.environ.setdefault("SCHEDULER_CHECKPOINT_DIR", os.path.join(tempfile.mkdtemp(), "checkpoints"))
+
+
+def build_grid_request(classes, subjects, hours=4, availability=None, **fields):
+    """
+    Every class ("5-A", "6-A", ...) takes every subject `hours` times a week; subject i is taught by
+    teacher i. `availability` maps a teacher index to its blocked periods; `fields` go to ScheduleRequest.
+    """
+    availability = availability or {}
+    return ScheduleRequest(
+        subjects=[Subject(id=f"s{i}", name=f"Subject {i}") for i in range(subjects)],
+        teachers=[Teacher(id=f"t{i}", name=f"Teacher {i}", subjects=[f"s{i}"], availability=availability.get(i)) for i in range(subjects)],
+        classes=[ClassGroup(id=f"c{c}", name=f"{5 + c}-A") for c in range(classes)],
+        plan=[
+            TeachingPlanItem(class_id=f"c{c}", subject_id=f"s{i}", teacher_id=f"t{i}", hours_per_week=hours)
+            for c in range(classes) for i in range(subjects)
+        ],
+        **fields,
+    )
+
+
+@pytest.fixture
+def grid_request():
+    """build_grid_request, the classes x subjects school most solver tests run on."""
+    return build_grid_request
+
+
+def build_pins_request(pinned=None, forbidden=None, **kwargs):
+    """Two teachers, two classes and 14 lessons: small enough for exact solves in every strategy."""
+    return ScheduleRequest(
+        teachers=[Teacher(id="t1", name="T1", subjects=["s1"]), Teacher(id="t2", name="T2", subjects=["s2"])],
+        subjects=[Subject(id="s1", name="Math"), Subject(id="s2", name="Art")],
+        classes=[ClassGroup(id="c1", name="5A"), ClassGroup(id="c2", name="6B")],
+        plan=[
+            TeachingPlanItem(class_id="c1", subject_id="s1", teacher_id="t1", hours_per_week=4),
+            TeachingPlanItem(class_id="c1", subject_id="s2", teacher_id="t2", hours_per_week=3),
+            TeachingPlanItem(class_id="c2", subject_id="s1", teacher_id="t1", hours_per_week=3),
+            TeachingPlanItem(class_id="c2", subject_id="s2", teacher_id="t2", hours_per_week=4),
+        ],
+        pinned_lessons=pinned,
+        forbidden_slots=forbidden,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def pins_request():
+    """build_pins_request: the small school of the pin, stats, export, profile and admission tests."""
+    return build_pins_request
+
+
+@pytest.fixture
+def pins():
+    """Two pinned lessons of the pins_request school, both on Wednesday period 1."""
+    return [
+        {"class_id": "c1", "subject_id": "s1", "teacher_id": "t1", "day": "Wed", "period": 1},
+        {"class_id": "c2", "subject_id": "s2", "teacher_id": "t2", "day": "Wed", "period": 1},
+    ]
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """(engine, session) of a fresh, migrated SQLite database under tmp_path."""
+    from database import create_db_engine, init_db  # After SCHEDULER_DATABASE_URL is set above
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    init_db(db_engine)
+    db = sessionmaker(bind=db_engine)()
+    yield db_engine, db
+    db.close()
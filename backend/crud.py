@@ -0,0 +1,347 @@
+"""
+Database access for the API: the plan tables, schedules stored as lesson rows with versions
+(periodic snapshots plus added/removed deltas) and the per-solve statistics. Every function
+takes a session and is called from the database thread pool.
+"""
+from datetime import datetime, timezone
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import select, update, func, and_, or_, text
+from sqlalchemy.orm import Session
+
+from database import SubjectDB, TeacherDB, ClassGroupDB, teachingPlanDB, ScheduleDB, ScheduleVersionDB, LessonDB, SolveStatsDB
+from logic.schedule_diff import LessonKey, lesson_key, compute_delta, apply_delta, expand_index
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+DAY_INDEX = {d: i for i, d in enumerate(DAYS)}
+
+LESSON_COLUMNS = (LessonDB.class_id, LessonDB.subject_id, LessonDB.teacher_id, LessonDB.day, LessonDB.period)
+
+
+def utc_timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+# --- Plan data (subjects, teachers, classes, teaching plan) ---
+
+def save_plan(db: Session, subjects: List[Dict[str, Any]], teachers: List[Dict[str, Any]],
+              classes: List[Dict[str, Any]], plan: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Replaces the stored plan data in one transaction using bulk inserts."""
+    db.query(teachingPlanDB).delete(synchronize_session=False)
+    db.query(SubjectDB).delete(synchronize_session=False)
+    db.query(TeacherDB).delete(synchronize_session=False)
+    db.query(ClassGroupDB).delete(synchronize_session=False)
+
+    db.bulk_insert_mappings(SubjectDB, [{"id": s["id"], "name": s["name"], "color": s.get("color")} for s in subjects])
+    db.bulk_insert_mappings(TeacherDB, [
+        {
+            "id": t["id"],
+            "name": t["name"],
+            "subjects": t.get("subjects", []),
+            "is_primary": t.get("is_primary", False),
+            "prefers_period_zero": t.get("prefers_period_zero", False),
+            "photo": t.get("photo"),
+            "availability": t.get("availability"),
+        }
+        for t in teachers
+    ])
+    db.bulk_insert_mappings(ClassGroupDB, [
+        {"id": c["id"], "name": c["name"], "excluded_subjects": c.get("excluded_subjects", [])} for c in classes
+    ])
+    db.bulk_insert_mappings(teachingPlanDB, [
+        {"class_id": p["class_id"], "subject_id": p["subject_id"], "teacher_id": p["teacher_id"], "hours_per_week": p["hours_per_week"]}
+        for p in plan
+    ])
+    db.commit()
+    return {"subjects": len(subjects), "teachers": len(teachers), "classes": len(classes), "plan": len(plan)}
+
+
+def load_plan(db: Session) -> Dict[str, List[Dict[str, Any]]]:
+    """Loads the stored plan data as plain dicts (the ScheduleRequest shape)."""
+    subjects = db.execute(select(SubjectDB.id, SubjectDB.name, SubjectDB.color)).mappings().all()
+    teachers = db.execute(select(
+        TeacherDB.id, TeacherDB.name, TeacherDB.subjects, TeacherDB.is_primary,
+        TeacherDB.prefers_period_zero, TeacherDB.photo, TeacherDB.availability
+    )).mappings().all()
+    classes = db.execute(select(ClassGroupDB.id, ClassGroupDB.name, ClassGroupDB.excluded_subjects)).mappings().all()
+    plan = db.execute(select(
+        teachingPlanDB.class_id, teachingPlanDB.subject_id, teachingPlanDB.teacher_id, teachingPlanDB.hours_per_week
+    ).order_by(teachingPlanDB.id)).mappings().all()
+
+    return {
+        "subjects": [dict(s) for s in subjects],
+        "teachers": [{**t, "subjects": t["subjects"] or []} for t in teachers],
+        "classes": [{**c, "excluded_subjects": c["excluded_subjects"] or []} for c in classes],
+        "plan": [dict(p) for p in plan],
+    }
+
+
+# --- Schedules and their versions ---
+
+# Every SNAPSHOT_INTERVAL-th version is stored in full, so rebuilding any version
+# reads one snapshot plus at most SNAPSHOT_INTERVAL - 1 deltas.
+SNAPSHOT_INTERVAL = 10
+
+
+def lesson_rows(schedule_id: int, version_id: Optional[int], keys: List[LessonKey], op: int = 0) -> List[Dict[str, Any]]:
+    return [
+        {
+            "schedule_id": schedule_id,
+            "version_id": version_id,
+            "op": op,
+            "class_id": k[0],
+            "subject_id": k[1],
+            "teacher_id": k[2],
+            "day": DAY_INDEX[k[3]],
+            "period": k[4],
+        }
+        for k in keys
+    ]
+
+
+def row_to_key(row) -> LessonKey:
+    return (row[0], row[1], row[2], DAYS[row[3]], row[4])
+
+
+def insert_version(db: Session, schedule_id: int, version: int, label: Optional[str], is_snapshot: bool,
+                   lesson_count: int, rows: List[Tuple[List[LessonKey], int]]) -> ScheduleVersionDB:
+    """Creates a version header and bulk inserts its lesson rows as (keys, op) groups."""
+    record = ScheduleVersionDB(
+        schedule_id=schedule_id,
+        version=version,
+        label=label,
+        is_snapshot=is_snapshot,
+        lesson_count=lesson_count,
+        created_at=utc_timestamp(),
+    )
+    db.add(record)
+    db.flush()  # Assigns record.id
+    for keys, op in rows:
+        db.bulk_insert_mappings(LessonDB, lesson_rows(schedule_id, record.id, keys, op))
+    return record
+
+
+def save_schedule(db: Session, lessons: List[Dict[str, Any]], name: Optional[str] = None, school_id: Optional[str] = None) -> int:
+    schedule = ScheduleDB(
+        name=name or "Original Schedule",
+        school_id=school_id,
+        lesson_count=len(lessons),
+        head_version=1,
+        created_at=utc_timestamp(),
+    )
+    db.add(schedule)
+    db.flush()  # Assigns schedule.id
+    insert_version(db, schedule.id, 1, name, True, len(lessons), [([lesson_key(l) for l in lessons], 0)])
+    db.commit()
+    return schedule.id
+
+
+def schedule_info(schedule) -> Dict[str, Any]:
+    return {
+        "id": schedule.id,
+        "name": schedule.name,
+        "school_id": schedule.school_id,
+        "lesson_count": schedule.lesson_count,
+        "head_version": schedule.head_version or 1,
+        "created_at": schedule.created_at,
+    }
+
+
+def version_info(version) -> Dict[str, Any]:
+    return {
+        "version": version.version,
+        "label": version.label,
+        "is_snapshot": version.is_snapshot,
+        "lesson_count": version.lesson_count,
+        "created_at": version.created_at,
+    }
+
+
+def list_schedules(db: Session, school_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Schedule headers, newest first (served by ix_schedules_school_created)."""
+    query = select(
+        ScheduleDB.id, ScheduleDB.name, ScheduleDB.school_id, ScheduleDB.lesson_count,
+        ScheduleDB.head_version, ScheduleDB.created_at
+    )
+    if school_id is not None:
+        query = query.where(ScheduleDB.school_id == school_id)
+    rows = db.execute(query.order_by(ScheduleDB.created_at.desc()).limit(limit)).all()
+    return [schedule_info(r) for r in rows]
+
+
+def version_chains(db: Session, targets: Dict[int, int]) -> Dict[int, List[int]]:
+    """For each schedule_id -> version, the version row ids to replay: the latest snapshot up to the target, then its deltas."""
+    rows = db.execute(
+        select(ScheduleVersionDB.schedule_id, ScheduleVersionDB.id, ScheduleVersionDB.version, ScheduleVersionDB.is_snapshot)
+        .where(ScheduleVersionDB.schedule_id.in_(list(targets)))
+        .order_by(ScheduleVersionDB.schedule_id, ScheduleVersionDB.version)
+    ).all()
+    chains = {}
+    for schedule_id, version_id, version, is_snapshot in rows:
+        if version > targets[schedule_id]:
+            continue
+        if is_snapshot:
+            chains[schedule_id] = [version_id]
+        else:
+            chains.setdefault(schedule_id, []).append(version_id)
+    return chains
+
+
+def reconstruct_versions(db: Session, targets: Dict[int, int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Rebuilds the lessons of many (schedule_id -> version) pairs with a single lessons query."""
+    indexes = {schedule_id: Counter() for schedule_id in targets}
+    if not targets:
+        return {}
+
+    chains = version_chains(db, targets)
+    version_ids = [version_id for chain in chains.values() for version_id in chain]
+    # Schedules saved before versioning keep their rows without a version
+    unversioned = [schedule_id for schedule_id in targets if schedule_id not in chains]
+
+    conditions = []
+    if version_ids:
+        conditions.append(LessonDB.version_id.in_(version_ids))
+    if unversioned:
+        conditions.append(and_(LessonDB.schedule_id.in_(unversioned), LessonDB.version_id.is_(None)))
+    if conditions:
+        rows = db.execute(
+            select(LessonDB.schedule_id, LessonDB.op, *LESSON_COLUMNS)
+            .where(or_(*conditions))
+            .order_by(LessonDB.version_id, LessonDB.id)
+        ).all()
+        for row in rows:
+            key = row_to_key(row[2:])
+            if row[1] < 0:
+                apply_delta(indexes[row[0]], (), (key,))
+            else:
+                indexes[row[0]][key] += 1
+
+    # Saved before the lessons table existed: the lessons are only in the JSON column
+    legacy = [schedule_id for schedule_id in unversioned if not indexes[schedule_id]]
+    if legacy:
+        for schedule_id, lessons in db.execute(select(ScheduleDB.id, ScheduleDB.lessons).where(ScheduleDB.id.in_(legacy))).all():
+            indexes[schedule_id].update(lesson_key(l) for l in lessons or ())
+
+    return {schedule_id: expand_index(index) for schedule_id, index in indexes.items()}
+
+
+def load_schedules(db: Session, schedule_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Loads the head version of many schedules."""
+    heads = {schedule_id: 1 for schedule_id in schedule_ids}
+    if schedule_ids:
+        for schedule_id, head in db.execute(
+            select(ScheduleDB.id, ScheduleDB.head_version).where(ScheduleDB.id.in_(schedule_ids))
+        ).all():
+            heads[schedule_id] = head or 1
+    return reconstruct_versions(db, heads)
+
+
+def load_schedule(db: Session, schedule_id: int) -> Optional[Dict[str, Any]]:
+    schedule = db.get(ScheduleDB, schedule_id)
+    if schedule is None:
+        return None
+    return {**schedule_info(schedule), "lessons": load_schedules(db, [schedule_id])[schedule_id]}
+
+
+def ensure_base_version(db: Session, schedule: ScheduleDB):
+    """Turns the lessons of a schedule saved before versioning into its version 1 snapshot."""
+    if db.execute(select(ScheduleVersionDB.id).where(ScheduleVersionDB.schedule_id == schedule.id).limit(1)).first():
+        return
+    record = insert_version(db, schedule.id, 1, schedule.name, True, schedule.lesson_count or 0, [])
+    adopted = db.execute(
+        update(LessonDB)
+        .where(LessonDB.schedule_id == schedule.id, LessonDB.version_id.is_(None))
+        .values(version_id=record.id, op=0)
+    ).rowcount
+    if not adopted and schedule.lessons:
+        # Saved before the lessons table existed
+        legacy = [lesson_key(l) for l in schedule.lessons]
+        db.bulk_insert_mappings(LessonDB, lesson_rows(schedule.id, record.id, legacy))
+        record.lesson_count = len(legacy)
+    schedule.head_version = 1
+
+
+def add_schedule_version(db: Session, schedule_id: int, lessons: List[Dict[str, Any]], label: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Appends a version holding only the lesson delta against the current head.
+    Falls back to a full snapshot every SNAPSHOT_INTERVAL versions or when the delta
+    would not be smaller than the schedule itself.
+    """
+    schedule = db.get(ScheduleDB, schedule_id)
+    if schedule is None:
+        return None
+    ensure_base_version(db, schedule)
+    db.flush()
+
+    head = schedule.head_version or 1
+    current = reconstruct_versions(db, {schedule_id: head})[schedule_id]
+    added, removed = compute_delta(current, lessons)
+
+    last_snapshot = db.execute(
+        select(func.max(ScheduleVersionDB.version))
+        .where(ScheduleVersionDB.schedule_id == schedule_id, ScheduleVersionDB.is_snapshot.is_(True))
+    ).scalar() or 1
+    is_snapshot = head + 1 - last_snapshot >= SNAPSHOT_INTERVAL or len(added) + len(removed) >= len(lessons)
+
+    if is_snapshot:
+        rows = [([lesson_key(l) for l in lessons], 0)]
+    else:
+        rows = [(added, 1), (removed, -1)]
+    record = insert_version(db, schedule_id, head + 1, label, is_snapshot, len(lessons), rows)
+
+    schedule.head_version = head + 1
+    schedule.lesson_count = len(lessons)
+    db.commit()
+    return {**version_info(record), "added": len(added), "removed": len(removed)}
+
+
+def list_versions(db: Session, schedule_id: int) -> List[Dict[str, Any]]:
+    rows = db.execute(
+        select(ScheduleVersionDB)
+        .where(ScheduleVersionDB.schedule_id == schedule_id)
+        .order_by(ScheduleVersionDB.version)
+    ).scalars().all()
+    return [version_info(r) for r in rows]
+
+
+def load_versions(db: Session, schedule_id: int, versions: List[int]) -> Optional[Dict[int, List[Dict[str, Any]]]]:
+    """Lessons of the given versions of one schedule, or None if any of them does not exist."""
+    known = {v["version"] for v in list_versions(db, schedule_id)}
+    if not known and db.get(ScheduleDB, schedule_id) is not None:
+        known = {1}  # Saved before versioning
+    if any(v not in known for v in versions):
+        return None
+    return {v: reconstruct_versions(db, {schedule_id: v})[schedule_id] for v in versions}
+
+
+def save_solve_stats(db: Session, passes: List[Dict[str, Any]], status: str, strategy: str, school_id: Optional[str] = None,
+                     lesson_count: int = 0) -> int:
+    record = SolveStatsDB(
+        school_id=school_id,
+        strategy=strategy,
+        status=status,
+        lesson_count=lesson_count,
+        wall_time=round(sum(p.get("wall_time") or 0 for p in passes), 3),
+        passes=passes,
+        created_at=utc_timestamp(),
+    )
+    db.add(record)
+    db.commit()
+    return record.id
+
+
+def list_solve_stats(db: Session, school_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Solve statistics, newest first (served by ix_solve_stats_school_created)."""
+    query = select(SolveStatsDB)
+    if school_id is not None:
+        query = query.where(SolveStatsDB.school_id == school_id)
+    rows = db.execute(query.order_by(SolveStatsDB.created_at.desc(), SolveStatsDB.id.desc()).limit(limit)).scalars()
+    return [
+        {"id": r.id, "school_id": r.school_id, "strategy": r.strategy, "status": r.status, "lesson_count": r.lesson_count,
+         "wall_time": r.wall_time, "passes": r.passes or [], "created_at": r.created_at}
+        for r in rows
+    ]
+
+
+def ping(db: Session):
+    db.execute(text("SELECT 1"))
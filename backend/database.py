@@ -1,12 +1,33 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, JSON
+import os
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, SmallInteger, Float, String, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./school_scheduler.db"
+SQLALCHEMY_DATABASE_URL = os.environ.get("SCHEDULER_DATABASE_URL", "sqlite:///./school_scheduler.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Applied to every new SQLite connection.
+# WAL lets readers (/api/data, schedule loads) run while a schedule is being written.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",   # Safe with WAL, avoids an fsync per transaction
+    "cache_size": -32000,      # 32 MB page cache
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,    # 256 MB memory-mapped reads
+}
+
+def create_db_engine(url: str):
+    db_engine = create_engine(url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(db_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return db_engine
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -21,6 +42,7 @@ class TeacherDB(Base):
     __tablename__ = "teachers"
     id = Column(String, primary_key=True)
     name = Column(String)
+    subjects = Column(JSON, default=[])
     is_primary = Column(Boolean, default=False)
     prefers_period_zero = Column(Boolean, default=False)
     photo = Column(String, nullable=True)
@@ -35,14 +57,84 @@ class ClassGroupDB(Base):
 class teachingPlanDB(Base):
     __tablename__ = "teaching_plan"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    class_id = Column(String, ForeignKey("classes.id"))
+    class_id = Column(String, ForeignKey("classes.id"), index=True)
     subject_id = Column(String, ForeignKey("subjects.id"))
-    teacher_id = Column(String, ForeignKey("teachers.id"))
+    teacher_id = Column(String, ForeignKey("teachers.id"), index=True)
     hours_per_week = Column(Integer)
 
 class ScheduleDB(Base):
     __tablename__ = "schedules"
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, default="Original Schedule")
-    lessons = Column(JSON)  # List of lessons as JSON
-    created_at = Column(String) # Simple timestamp
+    school_id = Column(String, nullable=True)
+    lessons = Column(JSON, nullable=True)  # Legacy: whole schedule as one JSON blob, see LessonDB
+    lesson_count = Column(Integer, default=0) # Of the head version
+    head_version = Column(Integer, default=1)
+    created_at = Column(String, index=True) # ISO timestamp (sorts lexicographically)
+
+    __table_args__ = (Index("ix_schedules_school_created", "school_id", "created_at"),)
+
+class ScheduleVersionDB(Base):
+    """
+    A saved revision of a schedule. Snapshot versions store every lesson,
+    the others store only the lessons added/removed since the previous version.
+    """
+    __tablename__ = "schedule_versions"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    schedule_id = Column(Integer, ForeignKey("schedules.id"))
+    version = Column(Integer)
+    label = Column(String, nullable=True)
+    is_snapshot = Column(Boolean, default=False)
+    lesson_count = Column(Integer, default=0)
+    created_at = Column(String)
+
+    __table_args__ = (Index("ix_schedule_versions_schedule_version", "schedule_id", "version", unique=True),)
+
+class LessonDB(Base):
+    """One row per scheduled lesson (or lesson delta). Day is stored as its index (0 = Mon)."""
+    __tablename__ = "lessons"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    schedule_id = Column(Integer, ForeignKey("schedules.id"), index=True)
+    version_id = Column(Integer, ForeignKey("schedule_versions.id"), nullable=True, index=True)
+    op = Column(SmallInteger, default=0) # 0 = snapshot row, 1 = added, -1 = removed
+    class_id = Column(String)
+    subject_id = Column(String)
+    teacher_id = Column(String)
+    day = Column(SmallInteger)
+    period = Column(SmallInteger)
+
+class SolveStatsDB(Base):
+    """Model size and search statistics of one /api/generate run, one entry per solver pass in `passes`."""
+    __tablename__ = "solve_stats"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    school_id = Column(String, nullable=True)
+    strategy = Column(String)
+    status = Column(String)         # success / conflict / error of the whole run
+    lesson_count = Column(Integer)  # Lessons in the plan (model size driver)
+    wall_time = Column(Float)       # Sum over the passes, seconds
+    passes = Column(JSON)
+    created_at = Column(String)     # ISO timestamp
+
+    __table_args__ = (Index("ix_solve_stats_school_created", "school_id", "created_at"),)
+
+def init_db(bind=engine):
+    """Creates missing tables, then adds columns and indexes introduced after a database was first created."""
+    Base.metadata.create_all(bind=bind)
+
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def call_with_session(fn, *args, **kwargs):
+    """Runs fn(db, *args, **kwargs) with a short-lived session (used from the database thread pool)."""
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
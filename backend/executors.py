@@ -0,0 +1,155 @@
+"""
+The API's executors: solver and large-job process pools, probe, file and database thread pools,
+and the progress queues solver processes report through.
+"""
+import asyncio
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Optional
+
+from logic.queues import drain
+
+# Solves are CPU bound and run in worker processes so they never hold the GIL of the API process.
+# Database calls are short blocking I/O and get their own small thread pool, so they are not
+# queued behind solves in Starlette's default threadpool.
+SOLVER_WORKERS = int(os.environ.get("SCHEDULER_SOLVER_WORKERS", "0")) or None  # None = one per core
+DB_WORKERS = int(os.environ.get("SCHEDULER_DB_WORKERS", "4"))
+# Requests whose estimated model is large (see logic/admission.py) run on their own small pool,
+# so a few of them cannot take the memory of every solver process at once
+LARGE_JOB_WORKERS = int(os.environ.get("SCHEDULER_LARGE_JOB_WORKERS", "1"))
+# Feasibility probes take at most a few seconds and must not wait behind queued generations.
+# They run on threads: CP-SAT releases the GIL while it searches, and nothing is pickled.
+PROBE_WORKERS = int(os.environ.get("SCHEDULER_PROBE_WORKERS", "2"))
+# Checkpoint files (gzip + pickle) are read on their own threads, not the database pool
+FILE_WORKERS = int(os.environ.get("SCHEDULER_FILE_WORKERS", "2"))
+
+_solver_executor: Optional[ProcessPoolExecutor] = None
+_db_executor: Optional[ThreadPoolExecutor] = None
+_large_job_executor: Optional[ProcessPoolExecutor] = None
+_probe_executor: Optional[ThreadPoolExecutor] = None
+_file_executor: Optional[ThreadPoolExecutor] = None
+_manager = None
+
+
+def get_solver_executor() -> ProcessPoolExecutor:
+    global _solver_executor
+    if _solver_executor is None:
+        _solver_executor = ProcessPoolExecutor(max_workers=SOLVER_WORKERS)
+    return _solver_executor
+
+
+def get_large_job_executor() -> ProcessPoolExecutor:
+    global _large_job_executor
+    if _large_job_executor is None:
+        _large_job_executor = ProcessPoolExecutor(max_workers=LARGE_JOB_WORKERS)
+    return _large_job_executor
+
+
+def get_probe_executor() -> ThreadPoolExecutor:
+    global _probe_executor
+    if _probe_executor is None:
+        _probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="probe")
+    return _probe_executor
+
+
+def get_file_executor() -> ThreadPoolExecutor:
+    global _file_executor
+    if _file_executor is None:
+        _file_executor = ThreadPoolExecutor(max_workers=FILE_WORKERS, thread_name_prefix="file")
+    return _file_executor
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+    return _db_executor
+
+
+def solver_pool_size() -> int:
+    return SOLVER_WORKERS or os.cpu_count() or 1
+
+
+async def run_solver(fn, *args, **kwargs):
+    """Runs a picklable, module-level function in the solver process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_solver_executor(), partial(fn, *args, **kwargs))
+
+
+async def run_large_job(fn, *args, **kwargs):
+    """Like run_solver, on the large-job lane."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_large_job_executor(), partial(fn, *args, **kwargs))
+
+
+async def run_probe(fn, *args, **kwargs):
+    """Runs a short, time-capped solver call (feasibility probe) on the probe threads."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_probe_executor(), partial(fn, *args, **kwargs))
+
+
+async def run_db(fn, *args, **kwargs):
+    """Runs a blocking database function in the database thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), partial(fn, *args, **kwargs))
+
+
+async def run_file(fn, *args, **kwargs):
+    """Runs blocking file I/O (checkpoint reads) in the file thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_file_executor(), partial(fn, *args, **kwargs))
+
+
+def run_isolated(fn, *args, **kwargs):
+    """
+    Runs fn in a fresh child process and returns its result, or None if the process died
+    (a native solver abort). Used by the offline tools, so one crash does not end a sweep.
+    """
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(fn, *args, **kwargs).result()
+        except BrokenProcessPool:
+            return None
+
+
+def progress_queue():
+    """A queue that solver processes can write to (the manager process is started on first use)."""
+    global _manager
+    if _manager is None:
+        _manager = multiprocessing.Manager()
+    return _manager.Queue()
+
+
+class QueueProgress:
+    """Picklable progress_callback forwarding (progress, message) from a solver process to a progress_queue()."""
+
+    def __init__(self, target):
+        self.target = target
+
+    def __call__(self, progress, message):
+        self.target.put((progress, message))
+
+
+def shutdown_executors():
+    global _solver_executor, _db_executor, _large_job_executor, _probe_executor, _file_executor, _manager
+    if _solver_executor is not None:
+        _solver_executor.shutdown(wait=False, cancel_futures=True)
+        _solver_executor = None
+    if _large_job_executor is not None:
+        _large_job_executor.shutdown(wait=False, cancel_futures=True)
+        _large_job_executor = None
+    if _probe_executor is not None:
+        _probe_executor.shutdown(wait=False)
+        _probe_executor = None
+    if _file_executor is not None:
+        _file_executor.shutdown(wait=False)
+        _file_executor = None
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=False)
+        _db_executor = None
+    if _manager is not None:
+        _manager.shutdown()
+        _manager = None
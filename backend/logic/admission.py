@@ -0,0 +1,80 @@
+"""
+Admission control before any model is built. The model size is estimated from the plan in
+milliseconds, from the teacher-feasible slots of every plan row in periods 0-7 (the largest
+cascade pass); memory is scaled from it with factors measured on generate_data.py schools.
+Requests over the large-job limit go to the API's large-job lane; requests over the hard limits
+are rejected, routed to the decomposition strategy or queued on the large-job lane, depending
+on SCHEDULER_OVERSIZE_POLICY.
+"""
+import os
+from typing import Dict, Any, Optional
+from models import ScheduleRequest
+from .context import ProblemContext, build_context
+from .engine import feasible_periods
+
+# PuLP's model per lesson variable and memory per model variable, measured on 1 to 4
+# generate_data.py schools with one search worker
+PULP_FACTORS = {"variables": 2.5, "constraints": 1.6}
+MEMORY_KB_PER_VARIABLE = {"cp-sat": 2.5, "pulp": 3.5}
+BASE_MEMORY_MB = 30  # Interpreter, OR-Tools and PuLP imports
+
+MAX_MODEL_VARIABLES = int(os.environ.get("SCHEDULER_MAX_MODEL_VARIABLES", "1000000"))
+MAX_MODEL_MEMORY_MB = int(os.environ.get("SCHEDULER_MAX_MODEL_MEMORY_MB", "2048"))
+LARGE_JOB_MEMORY_MB = int(os.environ.get("SCHEDULER_LARGE_JOB_MEMORY_MB", "512"))
+OVERSIZE_POLICY = os.environ.get("SCHEDULER_OVERSIZE_POLICY", "reject")  # "reject", "decompose" or "queue"
+
+# Strategies that never build a model of the whole timetable
+SMALL_MODEL_STRATEGIES = {"greedy", "local_search", "decomposition"}
+ESTIMATE_PERIODS = list(range(0, 8))
+
+
+def estimate_model_size(ctx: ProblemContext, solver: str = "cp-sat") -> Dict[str, Any]:
+    """
+    CP-SAT counts follow build_cp_model: a lesson variable per feasible slot, a busy indicator per
+    class slot, four day-bound variables per class day; one count constraint per plan row, one
+    at-most-one per teacher slot, one link per busy indicator and two bounds per class-day period.
+    """
+    domains = {}
+    for t_id in ctx.teacher_requests:
+        masks = feasible_periods(ctx, t_id, ESTIMATE_PERIODS)
+        domains[t_id] = {(d, p) for d in range(len(ctx.days)) for p in masks[d]}
+    lesson_vars = sum(len(domains[req.teacher_id]) for req in ctx.requests)
+    class_slots = sum(len(set().union(*(domains[ctx.requests[i].teacher_id] for i in indexes))) for indexes in ctx.class_requests.values())
+    class_days = len(ctx.class_requests) * len(ctx.days)
+
+    variables = lesson_vars + class_slots + 4 * class_days
+    constraints = len(ctx.requests) + sum(len(slots) for slots in domains.values()) + class_slots + class_days * (4 + 2 * len(ESTIMATE_PERIODS))
+    if solver == "pulp":
+        variables = max(variables, int(lesson_vars * PULP_FACTORS["variables"]))
+        constraints = max(constraints, int(lesson_vars * PULP_FACTORS["constraints"]))
+    return {
+        "solver": solver,
+        "lessons": sum(req.count for req in ctx.requests),
+        "lesson_vars": lesson_vars,
+        "variables": variables,
+        "constraints": constraints,
+        "memory_mb": round(BASE_MEMORY_MB + variables * MEMORY_KB_PER_VARIABLE[solver] / 1024),
+    }
+
+
+def admit(data: ScheduleRequest, ctx: Optional[ProblemContext] = None, policy: Optional[str] = None) -> Dict[str, Any]:
+    """
+    {"decision": "accept" | "large" | "decompose" | "reject", "estimate", "message"}.
+    "large" means: run on the large-job lane where there is one (the API), otherwise as usual.
+    """
+    if data.strategy in SMALL_MODEL_STRATEGIES and data.mode != "repair":
+        return {"decision": "accept", "estimate": None, "message": ""}
+    ctx = ctx or build_context(data)
+    estimate = estimate_model_size(ctx, "pulp" if data.strategy == "pulp" else "cp-sat")
+    policy = policy or OVERSIZE_POLICY
+
+    if estimate["variables"] > MAX_MODEL_VARIABLES or estimate["memory_mb"] > MAX_MODEL_MEMORY_MB:
+        decision = {"reject": "reject", "decompose": "decompose", "queue": "large"}.get(policy, "reject")
+        if decision == "decompose" and data.mode == "repair":
+            decision = "reject"  # Repairs keep the current timetable; there is no decomposed repair
+        message = (f"• Задача завелика: оцінка моделі {estimate['variables']} змінних і ~{estimate['memory_mb']} МБ пам'яті "
+                   f"(ліміт {MAX_MODEL_VARIABLES} змінних / {MAX_MODEL_MEMORY_MB} МБ). Оберіть стратегію decomposition або зменшіть план.")
+        return {"decision": decision, "estimate": estimate, "message": message}
+    if estimate["memory_mb"] > LARGE_JOB_MEMORY_MB:
+        return {"decision": "large", "estimate": estimate, "message": ""}
+    return {"decision": "accept", "estimate": estimate, "message": ""}
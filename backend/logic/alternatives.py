@@ -0,0 +1,126 @@
+"""
+Several distinct timetables from one search. CP-SAT keeps one model and, after each solution,
+adds a diversity cut: at least MIN_CHANGED_SHARE of the lessons must sit in a different slot
+than in every timetable found so far. Each further solve is hinted with the best timetable,
+so it only has to find a nearby different one.
+"""
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+from ortools.sat.python import cp_model
+from models import ScheduleRequest
+from .context import ProblemContext, build_context
+from .engine import build_cp_model, read_schedule
+from .solver_profiles import solver_profile
+from .analyzer import analyze_violations
+from .schedule_diff import compute_delta, schedule_hash, lesson_key
+
+ALTERNATIVE_TIME_LIMIT = 5.0  # Per additional timetable
+MIN_CHANGED_SHARE = 0.1       # Alternatives differ from each other in at least 10% of lessons
+
+
+def changed_lessons(first: List[Dict[str, Any]], second: List[Dict[str, Any]]) -> int:
+    """Lessons of `second` that are not in the same slot in `first`."""
+    added, _ = compute_delta(first, second)
+    return len(added)
+
+
+def min_changed(lessons: List[Any]) -> int:
+    """Lessons that have to move for a timetable to count as different (of the movable `lessons`)."""
+    return max(1, int(len(lessons) * MIN_CHANGED_SHARE))
+
+
+def ortools_alternatives(data: ScheduleRequest, periods: List[int], strict: bool, count: int, first: List[Dict[str, Any]],
+                         ctx: Optional[ProblemContext] = None, time_limit: Optional[float] = None,
+                         first_objective: Optional[float] = None) -> Tuple[Optional[float], List[Tuple[float, List[Dict[str, Any]]]]]:
+    """
+    The objective of `first` and up to `count - 1` further (objective, schedule) solutions of the same
+    model, best first, each at least min_changed() of the unpinned lessons away from `first` and from each other.
+    `time_limit` (seconds) bounds all solves together; the search stops with what it found.
+    Pass `first_objective` when it is known from the solve that produced `first`: it is otherwise
+    computed by fixing the model to `first`, and is None if `first` is no solution of the model
+    (e.g. after optimize_period_zero moved lessons in a way the model forbids).
+    """
+    started = time.perf_counter()
+    deadline = started + time_limit if time_limit is not None else None
+    ctx = ctx or build_context(data)
+    # Same weights as the cascade pass, so the objectives are comparable
+    built = build_cp_model(ctx, periods, strict=strict, hint=first, penalties=solver_profile(ctx).get("penalties"))
+    model = built.model
+    # Interchangeable requests (same class, subject and teacher) share a slot expression,
+    # so a permutation of identical lessons does not count as a different timetable
+    slot_vars = defaultdict(list)
+    for (r_idx, d, p), var in built.x.items():
+        req = built.requests[r_idx]
+        slot_vars[(req.class_id, req.subject_id, req.teacher_id, ctx.days[d], p)].append(var)
+
+    # Pinned lessons have no variables and can never move, so the cut only counts the free ones
+    pinned = set(ctx.pinned)
+
+    def free_lessons(schedule: List[Dict[str, Any]]) -> List[Tuple]:
+        return [key for key in map(lesson_key, schedule) if key not in pinned]
+
+    def exclude(schedule: List[Dict[str, Any]]):
+        free = free_lessons(schedule)
+        kept = [var for key in free for var in slot_vars.get(key, ())]
+        model.Add(sum(kept) <= len(free) - min_changed(free))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = ALTERNATIVE_TIME_LIMIT if deadline is None else max(0.05, min(ALTERNATIVE_TIME_LIMIT, time_limit))
+    if data.solver_workers: solver.parameters.num_workers = data.solver_workers
+
+    if first_objective is None:
+        # Objective of the primary timetable: the model with every variable fixed to the hint
+        solver.parameters.fix_variables_to_their_hinted_value = True
+        first_objective = solver.ObjectiveValue() if solver.Solve(model) in [cp_model.OPTIMAL, cp_model.FEASIBLE] else None
+        solver.parameters.fix_variables_to_their_hinted_value = False
+    solver.parameters.repair_hint = True
+
+    if not free_lessons(first):
+        return first_objective, []
+    exclude(first)
+
+    found = []
+    while len(found) < count - 1:
+        if deadline is not None:
+            if deadline - time.perf_counter() <= 0: break
+            solver.parameters.max_time_in_seconds = min(ALTERNATIVE_TIME_LIMIT, deadline - time.perf_counter())
+        if solver.Solve(model) not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            break
+        schedule = read_schedule(built, solver, ctx)
+        found.append((solver.ObjectiveValue(), schedule))
+        exclude(schedule)
+    print(f"Alternatives: {len(found)} further timetable(s) in {time.perf_counter() - started:.2f}s")
+    return first_objective, sorted(found, key=lambda item: item[0])
+
+
+def distinct_elites(candidates: List[Tuple[float, List[Dict[str, Any]]]], first: List[Dict[str, Any]], count: int) -> List[Tuple[float, List[Dict[str, Any]]]]:
+    """Best-first candidates (score, schedule; higher is better) that are min_changed() apart from `first` and each other."""
+    chosen = [first]
+    picked = []
+    seen = {schedule_hash(first)}
+    for score, schedule in sorted(candidates, key=lambda item: item[0], reverse=True):
+        if len(picked) >= count - 1: break
+        fingerprint = schedule_hash(schedule)
+        if fingerprint in seen: continue
+        seen.add(fingerprint)
+        if all(changed_lessons(other, schedule) >= min_changed(schedule) for other in chosen):
+            chosen.append(schedule)
+            picked.append((score, schedule))
+    return picked
+
+
+def describe_alternatives(data: ScheduleRequest, ctx: ProblemContext, primary: List[Dict[str, Any]], primary_objective: Optional[float],
+                          others: List[Tuple[float, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """The `alternatives` result entry: the primary timetable first, then the others in the order given (best first)."""
+    entries = [(primary_objective, primary)] + others
+    return [
+        {
+            "rank": rank,
+            "objective": objective,
+            "changed_lessons": changed_lessons(primary, schedule),
+            "violations": analyze_violations(schedule, data, ctx),
+            "schedule": schedule,
+        }
+        for rank, (objective, schedule) in enumerate(entries, start=1)
+    ]
@@ -1,11 +1,13 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from models import ScheduleRequest
+from .context import ProblemContext, build_context
 
-def analyze_violations(schedule: List[Dict[str, Any]], data: ScheduleRequest) -> List[str]:
+def analyze_violations(schedule: List[Dict[str, Any]], data: ScheduleRequest, ctx: Optional[ProblemContext] = None) -> List[str]:
     violations = []
-    class_names = {c.id: c.name for c in data.classes}
-    teacher_names = {t.id: t.name for t in data.teachers}
-    subject_names = {s.id: s.name for s in data.subjects}
+    ctx = ctx or build_context(data)
+    class_names = ctx.class_names
+    teacher_names = ctx.teacher_names
+    subject_names = ctx.subject_names
     
     plan_map = {}
     for p in data.plan:
@@ -96,5 +98,26 @@ def analyze_violations(schedule: List[Dict[str, Any]], data: ScheduleRequest) ->
             t_name = teacher_names.get(t_id, t_id)
             class_list = ", ".join([class_names.get(c, c) for c in class_ids])
             violations.append(f"• Вчитель {t_name} ({day}, урок {period}): одночасно в класах {class_list}")
-    
+
+    # Pinned lessons must be in place, and no lesson may sit in a slot forbidden for it
+    placed = {}
+    for l in schedule:
+        key = (l["class_id"], l["subject_id"], l["teacher_id"], l["day"], l["period"])
+        placed[key] = placed.get(key, 0) + 1
+    for key in ctx.pinned:
+        if placed.get(key, 0):
+            placed[key] -= 1
+        else:
+            c_id, s_id, _, day, period = key
+            violations.append(f"• Клас {class_names.get(c_id, c_id)}, предмет {subject_names.get(s_id, s_id)}: закріплений урок ({day}, урок {period}) не на місці")
+    request_by_key = {(req.class_id, req.subject_id, req.teacher_id): r_idx for r_idx, req in enumerate(ctx.requests)}
+    for l in schedule:
+        r_idx = request_by_key.get((l["class_id"], l["subject_id"], l["teacher_id"]))
+        masks = ctx.forbidden.get(r_idx)
+        d = ctx.day_index.get(l["day"])
+        if masks and d is not None and 0 <= l["period"] and masks[d] >> l["period"] & 1:
+            c_name = class_names.get(l["class_id"], l["class_id"])
+            s_name = subject_names.get(l["subject_id"], l["subject_id"])
+            violations.append(f"• Клас {c_name}, предмет {s_name} ({l['day']}, урок {l['period']}): урок у забороненому слоті")
+
     return violations
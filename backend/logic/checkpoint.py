@@ -0,0 +1,58 @@
+"""
+On-disk checkpoints of long genetic runs: the request, every island's population, RNG states
+and counters, and the best timetable so far, as a gzip-compressed pickle. Files are replaced
+atomically, so a crash while writing leaves the previous checkpoint intact.
+"""
+import gzip
+import os
+import pickle
+import re
+import time
+from typing import Dict, Any, Optional
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 30.0  # Seconds between checkpoint writes during a run
+CHECKPOINT_SUFFIX = ".ckpt.gz"
+CHECKPOINT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def checkpoint_dir() -> str:
+    return os.environ.get("SCHEDULER_CHECKPOINT_DIR", "checkpoints")
+
+
+def checkpoint_path(checkpoint_id: str) -> str:
+    """File of a checkpoint id; ids are restricted so they cannot point outside checkpoint_dir()."""
+    if not CHECKPOINT_ID_PATTERN.match(checkpoint_id or ""):
+        raise ValueError(f"Invalid checkpoint id: {checkpoint_id!r}")
+    return os.path.join(checkpoint_dir(), checkpoint_id + CHECKPOINT_SUFFIX)
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    state = dict(state, version=CHECKPOINT_VERSION, saved_at=time.time())
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """The saved state, or None if there is no checkpoint at `path`."""
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {state.get('version')} in {path}")
+    return state
+
+
+def checkpoint_summary(state: Dict[str, Any]) -> Dict[str, Any]:
+    """What the API reports about a checkpoint (without the populations)."""
+    return {
+        "best_score": state.get("best_score"),
+        "lessons": len(state.get("best") or []),
+        "islands": len(state.get("islands") or {}),
+        "stats": state.get("stats", {}),
+        "saved_at": state.get("saved_at"),
+    }
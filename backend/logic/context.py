@@ -0,0 +1,172 @@
+"""
+ProblemContext: the ids, indexes, availability masks and solver requests every pipeline stage
+derives from a ScheduleRequest, built once per request.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+from models import ScheduleRequest
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri")
+GRADE_PATTERN = re.compile(r'^(\d+)')
+
+
+class LessonRequest(NamedTuple):
+    """One plan row that the solvers have to place `count` times per week."""
+    index: int
+    class_id: str
+    subject_id: str
+    teacher_id: str
+    count: int
+    class_idx: int
+    subject_idx: int
+    teacher_idx: int
+
+
+def class_grade(name: str) -> Optional[int]:
+    match = GRADE_PATTERN.match(name)
+    return int(match.group(1)) if match else None
+
+
+def is_primary(grade: Optional[int]) -> bool:
+    """Grades 1-4: taught by primary teachers and not scheduled by the solvers."""
+    return grade is not None and 1 <= grade <= 4
+
+
+@dataclass(frozen=True)
+class ProblemContext:
+    """
+    Everything the pipeline stages derive from a ScheduleRequest, computed once per request.
+    Only tuples, frozensets and plain dicts of those, so it pickles cheaply for worker processes.
+    Treat it as read-only.
+    """
+    days: Tuple[str, ...]
+    day_index: Dict[str, int]
+
+    # Interned ids: position in these tuples is the integer id
+    class_ids: Tuple[str, ...]
+    teacher_ids: Tuple[str, ...]
+    subject_ids: Tuple[str, ...]
+    class_index: Dict[str, int]
+    teacher_index: Dict[str, int]
+    subject_index: Dict[str, int]
+
+    class_names: Dict[str, str]
+    teacher_names: Dict[str, str]
+    subject_names: Dict[str, str]
+
+    teacher_subjects: Dict[str, FrozenSet[str]]
+    teacher_is_primary: Dict[str, bool]
+    teacher_prefers_zero: Dict[str, bool]
+    # Per teacher, one bitmask per weekday: bit p set = period p is blocked
+    teacher_blocked: Dict[str, Tuple[int, ...]]
+
+    class_grades: Dict[str, Optional[int]]
+    primary_classes: FrozenSet[str]  # Grades 1-4 (see is_primary): not scheduled by the solvers
+
+    # Active plan rows of the scheduled (non-primary) classes and indexes into them
+    requests: Tuple[LessonRequest, ...]
+    teacher_requests: Dict[str, Tuple[int, ...]]
+    class_requests: Dict[str, Tuple[int, ...]]
+
+    # ScheduleRequest.pinned_lessons as lesson keys, and per request the forbidden periods per weekday (bitmasks)
+    pinned: Tuple[Tuple[str, str, str, str, int], ...]
+    forbidden: Dict[int, Tuple[int, ...]]
+
+    def is_blocked(self, teacher_id: str, day: int, period: int) -> bool:
+        masks = self.teacher_blocked.get(teacher_id)
+        return bool(masks and masks[day] >> period & 1)
+
+    def blocked_count(self, teacher_id: str) -> int:
+        return sum(bin(mask).count("1") for mask in self.teacher_blocked.get(teacher_id, ()))
+
+    def is_primary_grade(self, class_id: str) -> bool:
+        return is_primary(self.class_grades.get(class_id))
+
+
+ALL_PERIODS_MASK = (1 << 9) - 1  # Periods 0-8
+
+
+def availability_masks(availability: Optional[dict]) -> Tuple[int, ...]:
+    masks = [0] * len(DAYS)
+    for day, periods in (availability or {}).items():
+        if day not in DAYS:
+            continue
+        for p in periods:
+            if 0 <= p <= 8:  # Periods no solver uses are ignored, as unknown days are
+                masks[DAYS.index(day)] |= 1 << p
+    return tuple(masks)
+
+
+def forbidden_masks(data: ScheduleRequest, requests: List[LessonRequest], teacher_requests: Dict[str, List[int]],
+                    class_requests: Dict[str, List[int]]) -> Dict[int, Tuple[int, ...]]:
+    masks = {}
+    for rule in data.forbidden_slots or ():
+        if rule.day not in DAYS:
+            continue
+        if rule.class_id is not None:
+            candidates = class_requests.get(rule.class_id, ())
+        elif rule.teacher_id is not None:
+            candidates = teacher_requests.get(rule.teacher_id, ())
+        else:
+            candidates = range(len(requests))
+        bits = ALL_PERIODS_MASK if rule.period is None else 1 << rule.period
+        for idx in candidates:
+            req = requests[idx]
+            if (rule.teacher_id or req.teacher_id) != req.teacher_id or (rule.subject_id or req.subject_id) != req.subject_id:
+                continue
+            day_masks = masks.setdefault(idx, [0] * len(DAYS))
+            day_masks[DAYS.index(rule.day)] |= bits
+    return {idx: tuple(m) for idx, m in masks.items()}
+
+
+def build_context(data: ScheduleRequest) -> ProblemContext:
+    class_ids = tuple(c.id for c in data.classes)
+    teacher_ids = tuple(t.id for t in data.teachers)
+    subject_ids = tuple(s.id for s in data.subjects)
+    class_index = {c: i for i, c in enumerate(class_ids)}
+    teacher_index = {t: i for i, t in enumerate(teacher_ids)}
+    subject_index = {s: i for i, s in enumerate(subject_ids)}
+
+    class_names = {c.id: c.name for c in data.classes}
+    class_grades = {c.id: class_grade(c.name) for c in data.classes}
+    primary_classes = frozenset(c for c, grade in class_grades.items() if is_primary(grade))
+
+    requests = []
+    teacher_requests, class_requests = {}, {}
+    for plan in data.plan:
+        if plan.hours_per_week <= 0 or plan.class_id in primary_classes:
+            continue
+        # Unknown ids are reported by validate_workloads; solvers only see known ones
+        idx = len(requests)
+        requests.append(LessonRequest(
+            idx, plan.class_id, plan.subject_id, plan.teacher_id, plan.hours_per_week,
+            class_index.get(plan.class_id, -1), subject_index.get(plan.subject_id, -1), teacher_index.get(plan.teacher_id, -1)
+        ))
+        teacher_requests.setdefault(plan.teacher_id, []).append(idx)
+        class_requests.setdefault(plan.class_id, []).append(idx)
+
+    return ProblemContext(
+        days=DAYS,
+        day_index={d: i for i, d in enumerate(DAYS)},
+        class_ids=class_ids,
+        teacher_ids=teacher_ids,
+        subject_ids=subject_ids,
+        class_index=class_index,
+        teacher_index=teacher_index,
+        subject_index=subject_index,
+        class_names=class_names,
+        teacher_names={t.id: t.name for t in data.teachers},
+        subject_names={s.id: s.name for s in data.subjects},
+        teacher_subjects={t.id: frozenset(t.subjects) for t in data.teachers},
+        teacher_is_primary={t.id: t.is_primary for t in data.teachers},
+        teacher_prefers_zero={t.id: t.prefers_period_zero for t in data.teachers},
+        teacher_blocked={t.id: availability_masks(t.availability) for t in data.teachers},
+        class_grades=class_grades,
+        primary_classes=primary_classes,
+        requests=tuple(requests),
+        teacher_requests={t: tuple(idx) for t, idx in teacher_requests.items()},
+        class_requests={c: tuple(idx) for c, idx in class_requests.items()},
+        pinned=tuple((l.class_id, l.subject_id, l.teacher_id, l.day, l.period) for l in data.pinned_lessons or ()),
+        forbidden=forbidden_masks(data, requests, teacher_requests, class_requests),
+    )
@@ -0,0 +1,211 @@
+"""
+Two-stage hierarchical solver:
+1. Day assignment: how many lessons of each request go to each weekday
+   (small integer model, respects per-day teacher/class capacity, balances the week).
+2. Period sequencing: five independent per-day models placing those lessons into periods,
+   solved in parallel processes. A day that cannot be sequenced feeds a no-good cut
+   back into stage 1, which then proposes a different day assignment.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from ortools.sat.python import cp_model
+from models import ScheduleRequest
+from .context import ProblemContext, build_context
+from .engine import feasible_periods
+
+DAY_STAGE_TIME_LIMIT = 10.0
+PERIOD_STAGE_TIME_LIMIT = 5.0
+FEEDBACK_ROUNDS = 8
+
+SPREAD_PENALTY = 100      # Per lesson above the even split of a subject over the week
+CLASS_BALANCE_PENALTY = 10  # Per lesson between a class's busiest and lightest day
+
+
+def solve_day_assignment(ctx: ProblemContext, periods: List[int], domains: Dict[str, List[List[int]]],
+                         cuts: List[Tuple[int, Tuple[int, ...]]], time_limit: float, workers: Optional[int]) -> Optional[List[List[int]]]:
+    """Stage 1: y[r][d] = lessons of request r on day d, excluding the day vectors in `cuts`."""
+    model = cp_model.CpModel()
+    requests = ctx.requests
+    y = [
+        [model.NewIntVar(0, min(req.count, len(domains[req.teacher_id][d])), f'y_{r}_{d}') for d in range(5)]
+        for r, req in enumerate(requests)
+    ]
+    objective_terms = []
+
+    for r, req in enumerate(requests):
+        model.Add(sum(y[r]) == req.count)
+        even_share = -(-req.count // 5)  # ceil
+        for d in range(5):
+            excess = model.NewIntVar(0, req.count, f'spread_{r}_{d}')
+            model.Add(excess >= y[r][d] - even_share)
+            objective_terms.append(SPREAD_PENALTY * excess)
+
+    for t, r_indices in ctx.teacher_requests.items():
+        for d in range(5):
+            model.Add(sum(y[r][d] for r in r_indices) <= len(domains[t][d]))
+
+    for c, r_indices in ctx.class_requests.items():
+        loads = [sum(y[r][d] for r in r_indices) for d in range(5)]
+        busiest = model.NewIntVar(0, len(periods), f'max_load_{c}')
+        lightest = model.NewIntVar(0, len(periods), f'min_load_{c}')
+        for load in loads:
+            model.Add(load <= len(periods))
+            model.Add(busiest >= load)
+            model.Add(lightest <= load)
+        objective_terms.append(CLASS_BALANCE_PENALTY * (busiest - lightest))
+
+    # No-good cuts: a day vector whose period sequencing was infeasible
+    for d, vector in cuts:
+        differs = []
+        for r, value in enumerate(vector):
+            same = model.NewBoolVar(f'cut_{d}_{r}_{len(differs)}')
+            model.Add(y[r][d] == value).OnlyEnforceIf(same)
+            model.Add(y[r][d] != value).OnlyEnforceIf(same.Not())
+            differs.append(same.Not())
+        model.AddBoolOr(differs)
+
+    model.Minimize(sum(objective_terms))
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    if workers: solver.parameters.num_workers = workers
+    if solver.Solve(model) not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return None
+    return [[solver.Value(y[r][d]) for d in range(5)] for r in range(len(requests))]
+
+
+def sequence_day(day: int, lessons: List[Tuple[int, str, str, int]], teacher_periods: Dict[str, List[int]],
+                 periods: List[int], prefers_zero: Dict[str, bool], strict: bool, time_limit: float,
+                 workers: Optional[int]) -> Tuple[int, Optional[List[Tuple[int, int]]]]:
+    """
+    Stage 2 worker (module level for pickling): places (request, class, teacher, count)
+    lessons of one day into periods. Returns (day, [(request, period), ...]) or (day, None).
+    """
+    model = cp_model.CpModel()
+    z = {}
+    teacher_slots, class_slots = {}, {}
+    for r, class_id, teacher_id, count in lessons:
+        slots = []
+        for p in teacher_periods[teacher_id]:
+            var = model.NewBoolVar(f'z_{r}_{p}')
+            z[(r, p)] = var
+            slots.append(var)
+            teacher_slots.setdefault((teacher_id, p), []).append(var)
+            class_slots.setdefault((class_id, p), []).append(var)
+        if len(slots) < count:
+            return day, None
+        model.Add(sum(slots) == count)
+
+    for group in teacher_slots.values():
+        if len(group) > 1: model.AddAtMostOne(group)
+
+    objective_terms = []
+    classes = {class_id for _, class_id, _, _ in lessons}
+    for c in classes:
+        busy = []
+        for p in periods:
+            group = class_slots.get((c, p))
+            if not group: continue
+            b = model.NewBoolVar(f'busy_{c}_{p}')
+            model.Add(sum(group) == b)
+            busy.append((p, b))
+        load = sum(b for _, b in busy)
+        start_p, end_p = model.NewIntVar(min(periods), max(periods), f's_{c}'), model.NewIntVar(min(periods), max(periods), f'e_{c}')
+        for p, b in busy:
+            model.Add(start_p <= p).OnlyEnforceIf(b)
+            model.Add(end_p >= p).OnlyEnforceIf(b)
+        if strict:
+            if 1 in periods: model.Add(start_p == 1)
+            model.Add(end_p - start_p + 1 == load)
+        else:
+            if 1 in periods: objective_terms.append((start_p - 1) * 1000)
+            gaps = model.NewIntVar(0, len(periods), f'g_{c}')
+            model.Add(gaps == (end_p - start_p + 1) - load)
+            objective_terms.append(gaps * 5000)
+
+    if 0 in periods:
+        for (r, p), var in z.items():
+            if p == 0:
+                teacher_id = next(t for rr, _, t, _ in lessons if rr == r)
+                objective_terms.append(var * (-5000 if prefers_zero.get(teacher_id, False) else 10000))
+
+    if objective_terms:
+        model.Minimize(sum(objective_terms))
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    if workers: solver.parameters.num_workers = workers
+    if solver.Solve(model) not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return day, None
+    return day, [(r, p) for (r, p), var in z.items() if solver.Value(var)]
+
+
+def solve_decomposed(data: ScheduleRequest, periods: List[int], ctx: Optional[ProblemContext] = None,
+                     progress_callback=None, time_limit: Optional[float] = None) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+    """With `time_limit` (seconds) every stage solve is capped by the time left, and no round starts after it."""
+    ctx = ctx or build_context(data)
+    requests = ctx.requests
+    if not requests:
+        return [], ""
+
+    domains = {t: feasible_periods(ctx, t, periods) for t in ctx.teacher_requests}
+    cuts = []
+    placements: Dict[int, List[Tuple[int, int]]] = {}
+    solved_vectors: Dict[int, Tuple[int, ...]] = {}
+    day_workers = min(5, os.cpu_count() or 1)
+    # CP-SAT threads per subproblem, so the parallel days do not oversubscribe the cores
+    sub_workers = max(1, (data.solver_workers or os.cpu_count() or 1) // day_workers)
+    started = time.perf_counter()
+    deadline = started + time_limit if time_limit is not None else None
+
+    def stage_limit(limit: float) -> float:
+        return limit if deadline is None else min(limit, deadline - time.perf_counter())
+
+    with ProcessPoolExecutor(max_workers=day_workers) as executor:
+        for round_idx in range(FEEDBACK_ROUNDS + 1):
+            strict = round_idx < FEEDBACK_ROUNDS
+            if stage_limit(DAY_STAGE_TIME_LIMIT) <= 0:
+                return None, "Час вичерпано."
+            assignment = solve_day_assignment(ctx, periods, domains, cuts, stage_limit(DAY_STAGE_TIME_LIMIT), data.solver_workers)
+            if assignment is None:
+                return None, "Неможливо розподілити уроки по днях."
+            if progress_callback:
+                progress_callback(10 + round_idx * 10, f"📅 Розподіл по днях, спроба {round_idx + 1}...")
+
+            # Days already sequenced keep their placements if their day vector did not change
+            jobs = []
+            period_limit = max(stage_limit(PERIOD_STAGE_TIME_LIMIT), 0.1)
+            for d in range(5):
+                vector = tuple(assignment[r][d] for r in range(len(requests)))
+                if solved_vectors.get(d) == vector:
+                    continue
+                day_lessons = [(r, req.class_id, req.teacher_id, vector[r]) for r, req in enumerate(requests) if vector[r] > 0]
+                teacher_periods = {t: domains[t][d] for t in domains}
+                jobs.append((vector, executor.submit(
+                    sequence_day, d, day_lessons, teacher_periods, periods, ctx.teacher_prefers_zero,
+                    strict, period_limit, sub_workers
+                )))
+
+            infeasible = []
+            for vector, job in jobs:
+                d, placed = job.result()
+                if placed is None:
+                    infeasible.append((d, vector))
+                else:
+                    placements[d] = placed
+                    solved_vectors[d] = vector
+
+            print(f"Decomposition round {round_idx + 1}: {5 - len(infeasible)}/5 days sequenced ({'strict' if strict else 'relaxed'})")
+            if not infeasible:
+                break
+            if not strict:
+                return None, "Неможливо розставити уроки в межах дня."
+            cuts.extend(infeasible)
+
+    print(f"Decomposition solved in {time.perf_counter() - started:.2f}s with {len(cuts)} feedback cuts")
+    res = []
+    for d in range(5):
+        for r, p in placements.get(d, []):
+            req = requests[r]
+            res.append({"class_id": req.class_id, "subject_id": req.subject_id, "teacher_id": req.teacher_id, "day": ctx.days[d], "period": p})
+    return res, ""
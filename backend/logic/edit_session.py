@@ -0,0 +1,229 @@
+"""
+Interactive editing of a saved timetable. An EditSession keeps occupancy indexes
+(teacher slot, class slot and class day -> lesson ids) and the current issues per index key,
+so checking or applying a drag-and-drop move only re-evaluates the few keys the move touches
+instead of re-running analyze_violations over the whole schedule.
+"""
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+from models import ScheduleRequest
+from .analyzer import analyze_violations
+from .context import ProblemContext, build_context
+
+MAX_EDIT_SESSIONS = 64        # Least recently used sessions are dropped beyond this
+EDIT_SESSION_TTL = 2 * 3600   # Seconds of inactivity before a session expires
+MAX_PERIOD = 8
+
+IssueKey = Tuple  # ("teacher", t, d, p) | ("class", c, d, p) | ("day", c, d) | ("blocked", lesson_id)
+
+
+class EditSession:
+    """Occupancy indexes of one schedule being edited by hand."""
+
+    def __init__(self, schedule_id: Optional[int], lessons: List[Dict[str, Any]], data: ScheduleRequest, ctx: Optional[ProblemContext] = None):
+        self.schedule_id = schedule_id
+        self.data = data
+        self.ctx = ctx or build_context(data)
+        self.lessons = [dict(l) for l in lessons]  # Position is the lesson id
+        self.teacher_slots = defaultdict(set)      # (teacher_id, day, period) -> lesson ids
+        self.class_slots = defaultdict(set)        # (class_id, day, period) -> lesson ids
+        self.class_days = defaultdict(set)         # (class_id, day) -> lesson ids
+        self.issues: Dict[IssueKey, List[str]] = {}
+        self.moves = 0
+        self.touched = time.time()
+
+        for lesson_id, l in enumerate(self.lessons):
+            self.index(lesson_id)
+        keys = set()
+        for lesson_id in range(len(self.lessons)):
+            keys.update(self.affected_keys(lesson_id))
+        for key in keys:
+            self.refresh(key)
+
+    # --- Indexes ---
+
+    def index(self, lesson_id: int):
+        l = self.lessons[lesson_id]
+        self.teacher_slots[(l["teacher_id"], l["day"], l["period"])].add(lesson_id)
+        self.class_slots[(l["class_id"], l["day"], l["period"])].add(lesson_id)
+        self.class_days[(l["class_id"], l["day"])].add(lesson_id)
+
+    def unindex(self, lesson_id: int):
+        l = self.lessons[lesson_id]
+        self.teacher_slots[(l["teacher_id"], l["day"], l["period"])].discard(lesson_id)
+        self.class_slots[(l["class_id"], l["day"], l["period"])].discard(lesson_id)
+        self.class_days[(l["class_id"], l["day"])].discard(lesson_id)
+
+    def affected_keys(self, lesson_id: int) -> List[IssueKey]:
+        l = self.lessons[lesson_id]
+        return [
+            ("teacher", l["teacher_id"], l["day"], l["period"]),
+            ("class", l["class_id"], l["day"], l["period"]),
+            ("day", l["class_id"], l["day"]),
+            ("blocked", lesson_id),
+        ]
+
+    # --- Issues per key (same wording as analyze_violations) ---
+
+    def key_issues(self, key: IssueKey) -> List[str]:
+        ctx = self.ctx
+        kind = key[0]
+        if kind == "teacher":
+            ids = self.teacher_slots.get(key[1:], ())
+            if len(ids) < 2: return []
+            class_list = ", ".join(ctx.class_names.get(self.lessons[i]["class_id"], self.lessons[i]["class_id"]) for i in sorted(ids))
+            return [f"• Вчитель {ctx.teacher_names.get(key[1], key[1])} ({key[2]}, урок {key[3]}): одночасно в класах {class_list}"]
+        if kind == "class":
+            ids = self.class_slots.get(key[1:], ())
+            if len(ids) < 2: return []
+            subject_list = ", ".join(ctx.subject_names.get(self.lessons[i]["subject_id"], self.lessons[i]["subject_id"]) for i in sorted(ids))
+            return [f"• {ctx.class_names.get(key[1], key[1])} ({key[2]}, урок {key[3]}): одночасно уроки {subject_list}"]
+        if kind == "day":
+            periods = sorted(self.lessons[i]["period"] for i in self.class_days.get(key[1:], ()))
+            c_name = ctx.class_names.get(key[1], key[1])
+            found = []
+            if periods and periods[0] > 1:
+                found.append(f"• {c_name} ({key[2]}): починає з {periods[0]}-го уроку замість 1-го")
+            for a, b in zip(periods, periods[1:]):
+                if b - a > 1:
+                    found.append(f"• {c_name} ({key[2]}): має вікно між {a} та {b} уроками")
+            return found
+        l = self.lessons[key[1]]
+        d = ctx.day_index.get(l["day"])
+        if d is not None and ctx.is_blocked(l["teacher_id"], d, l["period"]):
+            return [f"• Вчитель {ctx.teacher_names.get(l['teacher_id'], l['teacher_id'])} ({l['day']}, урок {l['period']}): недоступний у цей час"]
+        return []
+
+    def refresh(self, key: IssueKey):
+        found = self.key_issues(key)
+        if found:
+            self.issues[key] = found
+        else:
+            self.issues.pop(key, None)
+
+    # --- Moves ---
+
+    def check_lesson(self, lesson_id: int):
+        if not 0 <= lesson_id < len(self.lessons):
+            raise ValueError(f"Unknown lesson id: {lesson_id}")
+
+    def targets(self, lesson_id: int, day: Optional[str], period: Optional[int], swap_with: Optional[int]) -> Dict[int, Tuple[str, int]]:
+        """New (day, period) per lesson id that the edit changes."""
+        self.check_lesson(lesson_id)
+        if swap_with is not None:
+            self.check_lesson(swap_with)
+            first, second = self.lessons[lesson_id], self.lessons[swap_with]
+            return {lesson_id: (second["day"], second["period"]), swap_with: (first["day"], first["period"])}
+        if day not in self.ctx.day_index:
+            raise ValueError(f"Unknown day: {day}")
+        if period is None or not 0 <= period <= MAX_PERIOD:
+            raise ValueError(f"Period must be 0-{MAX_PERIOD}")
+        return {lesson_id: (day, period)}
+
+    def relocate(self, moves: Dict[int, Tuple[str, int]]) -> Dict[int, Tuple[str, int]]:
+        """Moves lessons, keeping the indexes in sync; returns the previous positions."""
+        previous = {}
+        for lesson_id in moves:
+            self.unindex(lesson_id)
+            previous[lesson_id] = (self.lessons[lesson_id]["day"], self.lessons[lesson_id]["period"])
+        for lesson_id, (day, period) in moves.items():
+            self.lessons[lesson_id]["day"], self.lessons[lesson_id]["period"] = day, period
+            self.index(lesson_id)
+        return previous
+
+    def edit(self, lesson_id: int, day: Optional[str] = None, period: Optional[int] = None, swap_with: Optional[int] = None,
+             apply: bool = False) -> Dict[str, Any]:
+        """
+        Evaluates moving a lesson to (day, period), or swapping it with lesson `swap_with`.
+        Only the index keys of the moved lessons' old and new slots are re-evaluated.
+        With apply=False the session is left unchanged.
+        """
+        moves = self.targets(lesson_id, day, period, swap_with)
+        keys = set()
+        for moved in moves:
+            keys.update(self.affected_keys(moved))
+        before = {key: self.issues.get(key, []) for key in keys}
+
+        previous = self.relocate(moves)
+        for moved in moves:
+            keys.update(self.affected_keys(moved))
+        after = {key: self.key_issues(key) for key in keys}
+        before.update({key: self.issues.get(key, []) for key in keys if key not in before})
+
+        old = [msg for key in keys for msg in before[key]]
+        new = [msg for key in keys for msg in after[key]]
+        introduced = [msg for msg in new if msg not in old]
+        resolved = [msg for msg in old if msg not in new]
+
+        if apply:
+            for key in keys:
+                self.refresh(key)
+            self.moves += 1
+        else:
+            self.relocate(previous)
+        self.touched = time.time()
+        return {
+            "allowed": not introduced,
+            "applied": apply,
+            "introduced": introduced,
+            "resolved": resolved,
+            "lessons": [{"id": lesson_id, **self.lessons[lesson_id]} for lesson_id in moves] if apply else [],
+            "violation_count": sum(len(v) for v in self.issues.values()),
+        }
+
+    # --- Whole-session views ---
+
+    def schedule(self) -> List[Dict[str, Any]]:
+        return [dict(l) for l in self.lessons]
+
+    def violations(self) -> List[str]:
+        return [msg for found in self.issues.values() for msg in found]
+
+    def summary(self, with_lessons: bool = False) -> Dict[str, Any]:
+        result = {
+            "schedule_id": self.schedule_id,
+            "lesson_count": len(self.lessons),
+            "moves": self.moves,
+            "violations": self.violations(),
+        }
+        if with_lessons:
+            result["lessons"] = [{"id": i, **l} for i, l in enumerate(self.lessons)]
+        return result
+
+    def full_violations(self) -> List[str]:
+        """The full analyzer report (plan coverage, wrong teachers, ...) of the current state."""
+        return analyze_violations(self.schedule(), self.data, self.ctx)
+
+
+class EditSessionStore:
+    """In-process registry of editing sessions (anything with a `touched` timestamp), least recently used first."""
+
+    def __init__(self, max_sessions: int = MAX_EDIT_SESSIONS, ttl: float = EDIT_SESSION_TTL):
+        self.sessions: "OrderedDict[str, EditSession]" = OrderedDict()
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+
+    def add(self, session: EditSession) -> str:
+        self.expire()
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = session
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id: str) -> Optional[EditSession]:
+        self.expire()
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        return self.sessions.pop(session_id, None) is not None
+
+    def expire(self):
+        cutoff = time.time() - self.ttl
+        for session_id in [s for s, session in self.sessions.items() if session.touched < cutoff]:
+            del self.sessions[session_id]
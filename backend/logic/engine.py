@@ -1,162 +1,321 @@
 import random
+import re
 import time
+from collections import defaultdict
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Tuple
 from ortools.sat.python import cp_model
 from models import ScheduleRequest
 from .constraints import has_gaps, can_move_lesson
+from .context import ProblemContext, LessonRequest, build_context
+from .pins import pin_domains
+from .solver_profiles import solver_profile
 
-def optimize_period_zero(schedule: List[Dict[str, Any]], data: ScheduleRequest) -> List[Dict[str, Any]]:
+def optimize_period_zero(schedule: List[Dict[str, Any]], data: ScheduleRequest, ctx: Optional[ProblemContext] = None) -> List[Dict[str, Any]]:
     if not schedule: return schedule
-    teacher_prefers_zero = {t.id: t.prefers_period_zero for t in data.teachers}
+    ctx = ctx or build_context(data)
+    teacher_prefers_zero = ctx.teacher_prefers_zero
+    # Pinned lessons stay put, and no lesson moves into a slot forbidden for it
+    pinned = {key for key in ctx.pinned if key[4] == 0}
+    request_by_key = {(req.class_id, req.subject_id, req.teacher_id): r_idx for r_idx, req in enumerate(ctx.requests)}
     period_zero_lessons = [l for l in schedule if l["period"] == 0]
     for lesson in period_zero_lessons:
         if teacher_prefers_zero.get(lesson["teacher_id"], False): continue
+        key = (lesson["class_id"], lesson["subject_id"], lesson["teacher_id"])
+        if key + (lesson["day"], 0) in pinned: continue
+        forbidden = ctx.forbidden.get(request_by_key.get(key), (0,) * len(ctx.days))[ctx.day_index.get(lesson["day"], 0)]
         for target_period in range(1, 8):
+            if forbidden >> target_period & 1: continue
             if can_move_lesson(lesson, target_period, schedule):
                 lesson["period"] = target_period
                 break
     return schedule
 
-def ortools_solve(data: ScheduleRequest, periods: List[int], strict: bool = True, fixed_assignments: List[Dict[str, Any]] = None) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+OBJECTIVE_NOISE_WEIGHT = 10  # Well below the gap/start penalties, so noise only breaks ties
+
+STRICT_TIME_LIMIT = 15.0   # Seconds per pass unless a time limit (or profile) says otherwise
+RELAXED_TIME_LIMIT = 30.0
+
+# Objective weights of the relaxed passes; a solver profile may override them (see logic/solver_profiles.py)
+DEFAULT_PENALTIES = {
+    "gap": 5000,                    # Per window in a class day
+    "late_start": 1000,             # Per period a class day starts after period 1
+    "period_zero": 10000,           # Per period-0 lesson
+    "period_zero_preferred": -5000, # Per period-0 lesson of a teacher who prefers it
+}
+
+
+@dataclass
+class CpScheduleModel:
+    """A built CP-SAT timetable model and the handles needed to read a solution back."""
+    model: cp_model.CpModel
+    x: Dict[Tuple[int, int, int], Any]  # (request index, day, period) -> BoolVar, feasible slots only
+    requests: Tuple[LessonRequest, ...]
+    periods: List[int]
+    stats: Dict[str, int] = field(default_factory=dict)
+    assumptions: Dict[int, Any] = field(default_factory=dict)  # Request index -> literal enforcing its lesson count
+    pinned: List[Dict[str, Any]] = field(default_factory=list)  # Lessons placed before solving (no variables)
+    pin_errors: List[str] = field(default_factory=list)  # Pinned lessons impossible in `periods`: the model is infeasible
+
+
+def feasible_periods(ctx: ProblemContext, teacher_id: str, periods: List[int]) -> List[List[int]]:
+    """Per weekday, the periods the teacher is not blocked in (bitmask test per slot)."""
+    masks = ctx.teacher_blocked.get(teacher_id, (0,) * len(ctx.days))
+    return [[p for p in periods if not masks[d] >> p & 1] for d in range(len(ctx.days))]
+
+
+def add_schedule_hint(model: cp_model.CpModel, x: Dict[Tuple[int, int, int], Any], ctx: ProblemContext, schedule: List[Dict[str, Any]]):
+    """Hints 1 for the lesson variables of the schedule's lessons; every other variable is left unhinted."""
+    by_key = defaultdict(list)
+    for r_idx, req in enumerate(ctx.requests):
+        by_key[(req.class_id, req.subject_id, req.teacher_id)].append(r_idx)
+    used = defaultdict(int)
+    hinted = set()
+    for l in schedule:
+        d = ctx.day_index.get(l["day"])
+        for r_idx in by_key.get((l["class_id"], l["subject_id"], l["teacher_id"]), ()):
+            if used[r_idx] < ctx.requests[r_idx].count and (r_idx, d, l["period"]) in x:
+                used[r_idx] += 1
+                hinted.add((r_idx, d, l["period"]))
+                break
+    for key in hinted:
+        model.AddHint(x[key], 1)
+
+
+def build_cp_model(ctx: ProblemContext, periods: List[int], strict: bool = True, fixed_assignments: List[Dict[str, Any]] = None, hint: List[Dict[str, Any]] = None,
+                   objective_noise: Optional[int] = None, objective: bool = True, assumptions: bool = False,
+                   penalties: Optional[Dict[str, int]] = None) -> CpScheduleModel:
+    """
+    Builds the timetable model. Lesson variables exist only for (request, day, period)
+    triples the teacher is available for, and busy indicators only where a lesson can occur.
+    `hint` is a (possibly partial) schedule passed to CP-SAT as a solution hint.
+    `objective_noise` seeds small random per-slot costs, so different seeds lead to different optima.
+    Pinned lessons (ctx.pinned and `fixed_assignments`) and forbidden slots reduce the domains
+    before any variable is created (see logic/pins.py).
+    objective=False builds only the hard constraints (feasibility checks).
+    assumptions=True guards each request's lesson count with an assumption literal, so an
+    infeasible model reports which requests clash (SufficientAssumptionsForInfeasibility).
+    `penalties` overrides entries of DEFAULT_PENALTIES.
+    """
+    weights = {**DEFAULT_PENALTIES, **(penalties or {})}
     model = cp_model.CpModel()
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri"]
-    day_map = {d: i for i, d in enumerate(days)}
-    class_names = {c.id: c.name for c in data.classes}
-    teacher_availabilities = {t.id: t.availability or {} for t in data.teachers}
-    teacher_prefers_zero = {t.id: t.prefers_period_zero for t in data.teachers}
-    
-    requests = []
-    
-    def check_is_primary(name: str) -> bool:
-        import re
-        match = re.match(r'^(\d+)', name)
-        if match:
-            return int(match.group(1)) < 5
-        return False
-
-    for plan in data.plan:
-        if plan.hours_per_week > 0:
-            c_name = class_names.get(plan.class_id, "")
-            if check_is_primary(c_name): continue
-            requests.append({"class_id": plan.class_id, "teacher_id": plan.teacher_id, "subject_id": plan.subject_id, "count": plan.hours_per_week})
-
-    x, class_busy, teacher_busy = {}, {}, {}
-    for c in [c.id for c in data.classes]:
-        for d in range(5):
-            for p in periods: class_busy[(c, d, p)] = model.NewBoolVar(f'c_busy_{c}_{d}_{p}')
-    for t in [t.id for t in data.teachers]:
-        for d in range(5):
-            for p in periods: teacher_busy[(t, d, p)] = model.NewBoolVar(f't_busy_{t}_{d}_{p}')
+    days = ctx.days
+    teacher_prefers_zero = ctx.teacher_prefers_zero
+    requests = ctx.requests
 
+    # Pinned lessons get no variables; their slots are closed for the other requests
+    pins = pin_domains(ctx, periods, fixed_assignments)
+    if pins.dropped:
+        # A timetable without a pinned lesson is no answer: keep the model, but make it infeasible
+        print(f"📌 {len(pins.dropped)} pinned lesson(s) impossible in periods {periods[0]}-{periods[-1]}")
+        model.AddBoolOr([])
+
+    x = {}
+    teacher_slots, class_slots = defaultdict(list), defaultdict(list)
+    teacher_domains = {}
+    assumption_literals = {}
     for r_idx, req in enumerate(requests):
+        if req.teacher_id not in teacher_domains:
+            teacher_domains[req.teacher_id] = feasible_periods(ctx, req.teacher_id, periods)
+        domain = teacher_domains[req.teacher_id]
+        slots = []
         for d in range(5):
-            for p in periods:
-                x[(r_idx, d, p)] = model.NewBoolVar(f'lesson_{r_idx}_{d}_{p}')
-                model.AddImplication(x[(r_idx, d, p)], class_busy[(req["class_id"], d, p)])
-                model.AddImplication(x[(r_idx, d, p)], teacher_busy[(req["teacher_id"], d, p)])
-                if p in teacher_availabilities.get(req["teacher_id"], {}).get(days[d], []): model.Add(x[(r_idx, d, p)] == 0)
-        model.Add(sum(x[(r_idx, d, p)] for d in range(5) for p in periods) == req["count"])
-
-    # Enforce fixed assignments (for mutation/repair)
-    if fixed_assignments:
-        # Group fixed assignments by (class, subject, teacher) to handle multiples
-        from collections import defaultdict
-        fixed_map = defaultdict(list)
-        for f in fixed_assignments:
-            key = (f["class_id"], f["subject_id"], f["teacher_id"])
-            if f["day"] in day_map:
-                fixed_map[key].append((day_map[f["day"]], f["period"]))
-
-        # For each request type, enforce that specific slots are taken
-        for r_idx, req in enumerate(requests):
-            key = (req["class_id"], req["subject_id"], req["teacher_id"])
-            if key in fixed_map:
-                # This is a bit complex: we have N requests for this key, and M fixed slots.
-                # Simplification: if we have fixed slots for this type, enforce them.
-                # But since all requests of same type are identical, any of them can fill the slot.
-                # However, we simply need to ensure that *someone* fills these slots.
-                # Actually, strictly enforcing x[r_idx, d, p] == 1 might conflict if multiple r_idx share same key.
-                # Better approach: Pre-process constraints globally.
-                pass 
-        
-        # Proper enforcement:
-        # Iterate over all specific fixed slots (class, day, period) -> implies class_busy
-        # We need to find *which* r_idx corresponds to that fixed slot.
-        # Since r_idx are fungible for same (c, s, t), we can greedily assign them.
-        
-        assigned_indices = set()
-        
-        for f in fixed_assignments:
-            if f["day"] not in day_map: continue
-            d_idx = day_map[f["day"]]
-            p_idx = f["period"]
-            
-            # Find a free Request that matches this assignment
-            found = False
-            for r_idx, req in enumerate(requests):
-                if r_idx in assigned_indices: continue
-                if (req["class_id"] == f["class_id"] and 
-                    req["teacher_id"] == f["teacher_id"] and 
-                    req["subject_id"] == f["subject_id"]):
-                    
-                    if (r_idx, d_idx, p_idx) in x:
-                        model.Add(x[(r_idx, d_idx, p_idx)] == 1)
-                        assigned_indices.add(r_idx)
-                        found = True
-                        break
-            # If not found, it might be a conflict or invalid fix, strictly speaking we should ignore or log
-    
-    for t in [t.id for t in data.teachers]:
-        for d in range(5):
-            for p in periods:
-                relevant = [x[(r_idx, d, p)] for r_idx, req in enumerate(requests) if req["teacher_id"] == t]
-                if relevant:
-                    model.Add(sum(relevant) <= 1)
-                    model.Add(teacher_busy[(t, d, p)] == sum(relevant))
+            for p in domain[d]:
+                if not pins.is_open(r_idx, d, p): continue
+                var = model.NewBoolVar(f'lesson_{r_idx}_{d}_{p}')
+                x[(r_idx, d, p)] = var
+                slots.append(var)
+                teacher_slots[(req.teacher_id, d, p)].append(var)
+                class_slots[(req.class_id, d, p)].append(var)
+        if not slots and not pins.remaining[r_idx]: continue
+        count = model.Add(cp_model.LinearExpr.Sum(slots) == pins.remaining[r_idx])
+        if assumptions:
+            literal = model.NewBoolVar(f'count_{r_idx}')
+            count.OnlyEnforceIf(literal)
+            assumption_literals[r_idx] = literal
 
-    for c in [c.id for c in data.classes]:
-        for d in range(5):
-            for p in periods:
-                relevant = [x[(r_idx, d, p)] for r_idx, req in enumerate(requests) if req["class_id"] == c]
-                if relevant:
-                    model.Add(sum(relevant) <= 1)
-                    model.Add(class_busy[(c, d, p)] == sum(relevant))
+    for group in teacher_slots.values():
+        if len(group) > 1:
+            model.AddAtMostOne(group)
+
+    # class_busy: the single lesson literal, or an indicator where several lessons compete for the slot
+    # (1 where a lesson is pinned)
+    class_busy = {}
+    for (c, d), bits in pins.class_pinned.items():
+        for p in periods:
+            if bits >> p & 1: class_busy[(c, d, p)] = 1
+    for (c, d, p), group in class_slots.items():
+        if len(group) == 1:
+            class_busy[(c, d, p)] = group[0]
+        else:
+            busy = model.NewBoolVar(f'c_busy_{c}_{d}_{p}')
+            model.Add(sum(group) == busy)
+            class_busy[(c, d, p)] = busy
 
     objective_terms = []
-    for c in [c.id for c in data.classes]:
+    for c in ctx.class_requests:
+        if not strict and not objective: break  # Without compactness rules the day bounds only feed the objective
         for d in range(5):
-            day_load = sum(class_busy[(c, d, p)] for p in periods)
+            day_busy = [(p, class_busy[(c, d, p)]) for p in periods if (c, d, p) in class_busy]
+            if not day_busy: continue
+            day_load = sum(b for _, b in day_busy)
             has_lessons = model.NewBoolVar(f'has_lessons_{c}_{d}')
             model.Add(day_load > 0).OnlyEnforceIf(has_lessons)
             model.Add(day_load == 0).OnlyEnforceIf(has_lessons.Not())
             start_p, end_p = model.NewIntVar(min(periods), max(periods), f's_{c}_{d}'), model.NewIntVar(min(periods), max(periods), f'e_{c}_{d}')
-            for p in periods:
-                model.Add(start_p <= p).OnlyEnforceIf(class_busy[(c, d, p)])
-                model.Add(end_p >= p).OnlyEnforceIf(class_busy[(c, d, p)])
+            for p, busy in day_busy:
+                if isinstance(busy, int):  # Pinned
+                    model.Add(start_p <= p)
+                    model.Add(end_p >= p)
+                    continue
+                model.Add(start_p <= p).OnlyEnforceIf(busy)
+                model.Add(end_p >= p).OnlyEnforceIf(busy)
             if strict:
                 if 1 in periods: model.Add(start_p == 1).OnlyEnforceIf(has_lessons)
                 model.Add(end_p - start_p + 1 == day_load).OnlyEnforceIf(has_lessons)
             else:
-                if 1 in periods: objective_terms.append((start_p - 1) * 1000)
+                if 1 in periods: objective_terms.append((start_p - 1) * weights["late_start"])
                 gaps = model.NewIntVar(0, 8, f'g_{c}_{d}')
                 model.Add(gaps == (end_p - start_p + 1) - day_load).OnlyEnforceIf(has_lessons)
                 model.Add(gaps == 0).OnlyEnforceIf(has_lessons.Not())
-                objective_terms.append(gaps * 5000)
-    
-    if 0 in periods:
-        for r_idx, req in enumerate(requests):
-            for d in range(5):
-                if (r_idx, d, 0) in x:
-                    objective_terms.append(x[(r_idx, d, 0)] * (-5000 if teacher_prefers_zero.get(req["teacher_id"], False) else 10000))
-
-    model.Minimize(sum(objective_terms))
+                objective_terms.append(gaps * weights["gap"])
+
+    if 0 in periods and objective:
+        for (r_idx, d, p), var in x.items():
+            if p == 0:
+                objective_terms.append(var * weights["period_zero_preferred" if teacher_prefers_zero.get(requests[r_idx].teacher_id, False) else "period_zero"])
+
+    if objective_noise is not None and objective:
+        noise = random.Random(objective_noise)
+        objective_terms.extend(noise.randint(0, OBJECTIVE_NOISE_WEIGHT) * var for var in x.values())
+
+    if objective:
+        model.Minimize(sum(objective_terms))
+    if assumption_literals:
+        model.AddAssumptions(list(assumption_literals.values()))
+
+    if hint:
+        add_schedule_hint(model, x, ctx, hint)
+
+    full_size = len(requests) * len(days) * len(periods)
+    stats = {
+        "lesson_vars": len(x),
+        "lesson_vars_eliminated": full_size - len(x),
+        "pinned_lessons": len(pins.pinned),
+        # The unreduced model also had one busy indicator per class and per teacher slot
+        "busy_vars": sum(1 for busy in class_busy.values() if not isinstance(busy, int)),
+        "busy_vars_eliminated": (len(ctx.class_ids) + len(ctx.teacher_ids)) * len(days) * len(periods) - sum(1 for busy in class_busy.values() if not isinstance(busy, int)),
+    }
+    return CpScheduleModel(model=model, x=x, requests=requests, periods=periods, stats=stats, assumptions=assumption_literals,
+                           pinned=pins.pinned_lessons(ctx), pin_errors=pins.dropped)
+
+
+def read_schedule(built: CpScheduleModel, solver: cp_model.CpSolver, ctx: ProblemContext) -> List[Dict[str, Any]]:
+    res = [dict(l) for l in built.pinned]
+    for (r_idx, d, p), var in built.x.items():
+        if solver.Value(var):
+            req = built.requests[r_idx]
+            res.append({"class_id": req.class_id, "subject_id": req.subject_id, "teacher_id": req.teacher_id, "day": ctx.days[d], "period": p})
+    return res
+
+
+def presolved_size(solve_log: str) -> Tuple[Optional[int], Optional[int]]:
+    """(variables, constraints) of the "Presolved optimization model" section of a CP-SAT log, or (None, None)."""
+    start = solve_log.find("Presolved optimization model")
+    if start < 0:
+        return None, None
+    variables, constraints = None, 0
+    for line in solve_log[start:].splitlines()[1:]:
+        match = re.match(r"#(\w+): ([\d']+)", line)
+        if not match:
+            if line.startswith("  -"): continue  # Variable domain breakdown
+            break
+        count = int(match.group(2).replace("'", ""))
+        if match.group(1) == "Variables": variables = count
+        else: constraints += count
+    return variables, constraints
+
+
+def apply_parameters(solver: cp_model.CpSolver, params: Dict[str, Any]):
+    """Sets SatParameters fields by name; enum values are given by name (e.g. "FIXED_SEARCH")."""
+    if not params: return
+    text = " ".join(f"{name}: {str(value).lower() if isinstance(value, bool) else value}" for name, value in params.items())
+    if not solver.parameters.merge_text_format(text):
+        raise ValueError(f"Invalid CP-SAT parameters: {params}")
+
+
+def keep_solve_log(solver: cp_model.CpSolver):
+    """Keeps the search log in the response (not stdout): the presolved model size is only reported there."""
+    solver.parameters.log_search_progress = True
+    solver.parameters.log_to_stdout = False
+    solver.parameters.log_to_response = True
+
+
+def response_stats(model: cp_model.CpModel, solver: cp_model.CpSolver, status: int) -> Dict[str, Any]:
+    """Model size before and after presolve plus the search statistics of one CP-SAT solve."""
+    proto = model.Proto()
+    response = solver.ResponseProto()
+    presolved_vars, presolved_constraints = presolved_size(response.solve_log)
+    stats = {
+        "solver": "cp-sat",
+        "status": solver.StatusName(status),
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "presolved_variables": presolved_vars,
+        "presolved_constraints": presolved_constraints,
+        "conflicts": response.num_conflicts,
+        "branches": response.num_branches,
+        "objective": None,
+        "best_bound": None,
+        "gap": None,
+        "wall_time": round(response.wall_time, 3),
+        "user_time": round(response.user_time, 3),
+        "deterministic_time": round(response.deterministic_time, 3),
+    }
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) and model.has_objective():
+        objective, bound = response.objective_value, response.best_objective_bound
+        stats.update(objective=objective, best_bound=bound, gap=round(abs(objective - bound) / max(1.0, abs(objective)), 4))
+    return stats
+
+
+def solve_stats(built: CpScheduleModel, solver: cp_model.CpSolver, status: int) -> Dict[str, Any]:
+    return dict(response_stats(built.model, solver, status), lesson_vars=built.stats["lesson_vars"], pinned_lessons=built.stats["pinned_lessons"])
+
+
+def ortools_solve(data: ScheduleRequest, periods: List[int], strict: bool = True, fixed_assignments: List[Dict[str, Any]] = None, ctx: Optional[ProblemContext] = None, hint: List[Dict[str, Any]] = None, time_limit: Optional[float] = None,
+                  random_seed: Optional[int] = None, objective_noise: Optional[int] = None, stats: Optional[Dict[str, Any]] = None,
+                  export_path: Optional[str] = None, profile: Optional[Dict[str, Any]] = None) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+    """
+    Solves one CP-SAT pass. If `stats` is given, it is filled with solve_stats() (the solver log
+    is then kept in memory). With `export_path` the built model is written there as a text proto.
+    `profile` (parameters and penalties) defaults to the tuned profile of the problem's size bucket;
+    explicit arguments and data.solver_workers take precedence over its parameters.
+    """
+    ctx = ctx or build_context(data)
+    profile = solver_profile(ctx) if profile is None else profile
+    params = profile.get("params") or {}
+    built = build_cp_model(ctx, periods, strict=strict, fixed_assignments=fixed_assignments, hint=hint, objective_noise=objective_noise,
+                           penalties=profile.get("penalties"))
+    print(f"CP-SAT model: {built.stats['lesson_vars']} lesson vars ({built.stats['lesson_vars_eliminated']} eliminated), "
+          f"{built.stats['busy_vars']} busy vars ({built.stats['busy_vars_eliminated']} eliminated)")
+    if export_path:
+        built.model.ExportToFile(export_path)
+
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 15.0 if strict else 30.0
-    if solver.Solve(model) in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-        res = []
-        for r_idx, req in enumerate(requests):
-            for d in range(5):
-                for p in periods:
-                    if solver.Value(x[(r_idx, d, p)]): res.append({"class_id": req["class_id"], "subject_id": req["subject_id"], "teacher_id": req["teacher_id"], "day": days[d], "period": p})
-        return res, ""
+    solver.parameters.max_time_in_seconds = STRICT_TIME_LIMIT if strict else RELAXED_TIME_LIMIT
+    apply_parameters(solver, params)
+    if time_limit: solver.parameters.max_time_in_seconds = time_limit
+    if data.solver_workers: solver.parameters.num_workers = data.solver_workers
+    # The greedy hint may break strict rules; without repair, CP-SAT stalls trying to complete it
+    if hint and "repair_hint" not in params: solver.parameters.repair_hint = True
+    if random_seed is not None: solver.parameters.random_seed = random_seed
+    if stats is not None:
+        keep_solve_log(solver)
+    status = solver.Solve(built.model)
+    if stats is not None:
+        stats.update(solve_stats(built, solver, status), time_limit=solver.parameters.max_time_in_seconds, profile=profile.get("name"))
+    if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return read_schedule(built, solver, ctx), ""
+    if built.pin_errors:
+        return None, "Помилка закріплених уроків:\n" + "\n".join(built.pin_errors)
     return None, "Неможливо знайти рішення."
@@ -0,0 +1,146 @@
+"""
+Quick "is this plan schedulable at all?" probe. Cheap capacity checks run first. Then a
+greedy timetable (milliseconds) is tried as a witness, and only if it is incomplete CP-SAT
+looks for any timetable (no objective, stop at the first solution, greedy result as hint).
+This runs first for the relaxed model the last cascade pass uses (periods 0-7, gaps allowed)
+and then, with the time left, for the strict model (periods 1-7, compact days). An infeasible
+relaxed model is re-solved with one assumption literal per plan row to name the clashing rows.
+"""
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from ortools.sat.python import cp_model
+from models import ScheduleRequest
+from .context import ProblemContext, build_context
+from .engine import build_cp_model, feasible_periods
+from .greedy import greedy_schedule, is_compact
+from .preprocessor import validate_workloads
+
+FEASIBILITY_TIME_LIMIT = 2.0
+MAX_FEASIBILITY_TIME_LIMIT = 10.0
+MIN_CORE_TIME_LIMIT = 0.5  # The conflicting rows are worth a short overrun of the budget
+MAX_CORE_REASONS = 10
+
+RELAXED_PERIODS = list(range(0, 8))
+STRICT_PERIODS = list(range(1, 8))
+
+STATUS_NAMES = {
+    cp_model.OPTIMAL: "feasible",
+    cp_model.FEASIBLE: "feasible",
+    cp_model.INFEASIBLE: "infeasible",
+    cp_model.MODEL_INVALID: "unknown",
+    cp_model.UNKNOWN: "unknown",
+}
+
+
+def capacity_conflicts(ctx: ProblemContext, periods: List[int]) -> Tuple[List[str], Dict[str, set]]:
+    """Teachers with more lessons than free slots, and classes with more lessons than slots any of their teachers can take."""
+    reasons, offenders = [], {"teachers": set(), "classes": set()}
+    teacher_slots = {}
+    for t_id, indexes in ctx.teacher_requests.items():
+        domain = feasible_periods(ctx, t_id, periods)
+        teacher_slots[t_id] = {(d, p) for d in range(len(ctx.days)) for p in domain[d]}
+        load = sum(ctx.requests[i].count for i in indexes)
+        if load > len(teacher_slots[t_id]):
+            offenders["teachers"].add(t_id)
+            reasons.append(f"• Вчитель {ctx.teacher_names.get(t_id, t_id)}: {load} уроків, але вільних слотів лише {len(teacher_slots[t_id])}")
+
+    for c_id, indexes in ctx.class_requests.items():
+        usable = set().union(*(teacher_slots[ctx.requests[i].teacher_id] for i in indexes))
+        load = sum(ctx.requests[i].count for i in indexes)
+        if load > len(usable):
+            offenders["classes"].add(c_id)
+            reasons.append(f"• Клас {ctx.class_names.get(c_id, c_id)}: {load} уроків, але вчителі класу разом вільні лише в {len(usable)} слотах")
+    return reasons, offenders
+
+
+def probe(ctx: ProblemContext, periods: List[int], strict: bool, time_limit: float, workers: Optional[int] = None,
+          assumptions: bool = False, hint: Optional[List[Dict[str, Any]]] = None) -> Tuple[int, Any, cp_model.CpSolver]:
+    built = build_cp_model(ctx, periods, strict=strict, hint=hint, objective=False, assumptions=assumptions)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(time_limit, 0.05)
+    solver.parameters.stop_after_first_solution = True
+    if workers: solver.parameters.num_workers = workers
+    if hint: solver.parameters.repair_hint = True
+    return solver.Solve(built.model), built, solver
+
+
+def search(ctx: ProblemContext, periods: List[int], strict: bool, deadline: float, workers: Optional[int], checks: Dict[str, str]) -> int:
+    """A greedy witness if it is complete (and compact for strict), else a hinted CP-SAT probe until `deadline`."""
+    name = "strict" if strict else "relaxed"
+    witness, unplaced = greedy_schedule(ctx, periods)
+    if not unplaced and (not strict or is_compact(witness)):
+        checks[name], checks[name + "_witness"] = "feasible", "greedy"
+        return cp_model.FEASIBLE
+    status, _, _ = probe(ctx, periods, strict, deadline - time.perf_counter(), workers=workers, hint=witness)
+    checks[name] = STATUS_NAMES.get(status, "unknown")
+    if checks[name] == "feasible": checks[name + "_witness"] = "cp-sat"
+    return status
+
+
+def conflicting_requests(ctx: ProblemContext, time_limit: float) -> List[int]:
+    """Request indexes whose lesson counts cannot all be met (a sufficient, not necessarily minimal, set)."""
+    # Cores are reported reliably by the sequential search
+    status, built, solver = probe(ctx, RELAXED_PERIODS, False, time_limit, workers=1, assumptions=True)
+    if status != cp_model.INFEASIBLE:
+        return []
+    literal_to_request = {literal.Index(): r_idx for r_idx, literal in built.assumptions.items()}
+    return sorted(literal_to_request[i] for i in solver.SufficientAssumptionsForInfeasibility() if i in literal_to_request)
+
+
+def describe_offenders(ctx: ProblemContext, teacher_ids, class_ids) -> Dict[str, List[Dict[str, str]]]:
+    return {
+        "teachers": [{"id": t, "name": ctx.teacher_names.get(t, t)} for t in sorted(teacher_ids)],
+        "classes": [{"id": c, "name": ctx.class_names.get(c, c)} for c in sorted(class_ids)],
+    }
+
+
+def check_feasibility(data: ScheduleRequest, time_limit: float = FEASIBILITY_TIME_LIMIT, ctx: Optional[ProblemContext] = None) -> Dict[str, Any]:
+    """
+    {"status": "feasible" | "infeasible" | "unknown", "level": "strict" | "relaxed" | None,
+     "reasons", "teachers", "classes", "checks", "elapsed"}. "strict" means a gap-free
+    timetable in periods 1-7 exists; "relaxed" that some timetable exists but no gap-free one
+    was found (checks["strict"] says whether it was ruled out or the budget ran out).
+    """
+    started = time.perf_counter()
+    deadline = started + min(time_limit, MAX_FEASIBILITY_TIME_LIMIT)
+    ctx = ctx or build_context(data)
+    checks = {}
+
+    def result(status, level=None, reasons=(), teachers=(), classes=()):
+        return {
+            "status": status,
+            "level": level,
+            "reasons": list(reasons),
+            **describe_offenders(ctx, teachers, classes),
+            "checks": checks,
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
+
+    errors = validate_workloads(data, ctx)
+    checks["validation"] = "failed" if errors else "passed"
+    if errors:
+        return result("infeasible", reasons=errors)
+
+    reasons, offenders = capacity_conflicts(ctx, RELAXED_PERIODS)
+    checks["capacity"] = "failed" if reasons else "passed"
+    if reasons:
+        return result("infeasible", reasons=reasons, teachers=offenders["teachers"], classes=offenders["classes"])
+
+    status = search(ctx, RELAXED_PERIODS, False, deadline, data.solver_workers, checks)
+    if status == cp_model.INFEASIBLE:
+        core = conflicting_requests(ctx, max(deadline - time.perf_counter(), MIN_CORE_TIME_LIMIT))
+        rows = [ctx.requests[i] for i in core]
+        reasons = ["• Ці уроки неможливо розмістити разом: " + ", ".join(
+            f"{ctx.class_names.get(r.class_id, r.class_id)} / {ctx.subject_names.get(r.subject_id, r.subject_id)} ({ctx.teacher_names.get(r.teacher_id, r.teacher_id)})"
+            for r in rows[:MAX_CORE_REASONS]
+        ) + (f" та ще {len(rows) - MAX_CORE_REASONS}" if len(rows) > MAX_CORE_REASONS else "")] if rows else []
+        return result("infeasible", reasons=reasons, teachers={r.teacher_id for r in rows}, classes={r.class_id for r in rows})
+    if checks["relaxed"] != "feasible":
+        return result("unknown")
+
+    remaining = deadline - time.perf_counter()
+    if remaining <= 0:
+        checks["strict"] = "skipped"
+        return result("feasible", level="relaxed")
+    search(ctx, STRICT_PERIODS, True, deadline, data.solver_workers, checks)
+    return result("feasible", level="strict" if checks["strict"] == "feasible" else "relaxed")
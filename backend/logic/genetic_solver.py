@@ -2,39 +2,129 @@ import random
 import time
 import copy
 import os
-from typing import List, Dict, Any, Tuple
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+from dataclasses import dataclass
+from typing import List, Dict, Any, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from models import ScheduleRequest
 from .engine import ortools_solve
+from .context import ProblemContext, build_context
+from .greedy import greedy_schedule, greedy_solve, is_compact, window_count
+from .schedule_diff import schedule_hash
+from .queues import drain
+from .checkpoint import CHECKPOINT_INTERVAL, save_checkpoint
 
-def initial_population_worker(data: ScheduleRequest) -> List[Dict[str, Any]]:
+SEED_TIME_LIMIT = 5.0  # Perturbed-objective seeding solves optimize noise, so they get a short budget
+MIGRATION_INTERVAL = 2  # Generations between elite migrations to the next island
+CLASS_GAP_PENALTY = 1000    # Class windows/late starts: crossover children can have them
+MISSING_LESSON_PENALTY = 5000
+
+# The strict -> relaxed -> emergency cascade seeding and mutation run
+CASCADE_PASSES = [(list(range(1, 8)), True), (list(range(1, 8)), False), (list(range(0, 8)), False)]
+
+
+def pass_time_limit(deadline: Optional[float], passes_left: int) -> Optional[float]:
+    """An even share of the time left until `deadline` (time.time()) per remaining pass; None without a deadline."""
+    return None if deadline is None else (deadline - time.time()) / passes_left
+
+
+def schedule_fitness(schedule: List[Dict[str, Any]], ctx: Optional[ProblemContext] = None) -> float:
+    """
+    Fitness score (higher is better). Penalizes:
+    - Gaps/Windows for teachers (Heavy penalty)
+    - Period 0 usage (Heavy penalty)
+    - Class windows and late starts, and lessons missing from the plan (with ctx)
+    """
+    if not schedule: return float('-inf')
+
+    score = 0.0
+
+    # Pre-process for fast lookup
+    teacher_slots = {}
+    class_days = {}
+    for l in schedule:
+        t_key = (l["teacher_id"], l["day"])
+        if t_key not in teacher_slots: teacher_slots[t_key] = []
+        teacher_slots[t_key].append(l["period"])
+        c_key = (l["class_id"], l["day"])
+        class_days[c_key] = class_days.get(c_key, 0) | 1 << l["period"]
+
+    # 1. Teacher Gaps (Windows)
+    for t_day, periods in teacher_slots.items():
+        periods.sort()
+        if not periods: continue
+
+        # Check for gaps
+        for i in range(len(periods) - 1):
+            gap = periods[i+1] - periods[i] - 1
+            if gap > 0:
+                score -= (gap * 50)  # Huge penalty for windows
+
+        # Check for isolated lessons (optional)
+        if len(periods) == 1:
+            score -= 10
+
+    # 2. Period 0 Usage
+    period_zero_count = sum(1 for l in schedule if l["period"] == 0)
+    if period_zero_count > 0:
+        score -= (period_zero_count * 200) # Significant penalty to prefer 1-7 range
+
+    # 3. Class windows / late starts (strict solves never produce them)
+    for mask in class_days.values():
+        first = (mask & -mask).bit_length() - 1
+        score -= CLASS_GAP_PENALTY * (window_count(mask) + max(0, first - 1))
+
+    # 4. Lessons missing from the plan
+    if ctx is not None:
+        missing = sum(req.count for req in ctx.requests) - len(schedule)
+        score -= MISSING_LESSON_PENALTY * max(0, missing)
+
+    return score
+
+def initial_population_worker(data: ScheduleRequest, ctx: Optional[ProblemContext] = None, seed: Optional[int] = None,
+                              deadline: Optional[float] = None) -> List[Dict[str, Any]]:
     """
     Worker function to generate a single initial schedule.
-    Tries strategies from strict to relaxed.
+    The seed picks one of three variants, so a population covers different parts of the search space:
+    - seed % 3 == 0: the seeded greedy construction itself, when it places every lesson;
+    - seed % 3 == 1: CP-SAT with that random seed, hinted with the seeded greedy timetable;
+    - seed % 3 == 2: the same, with a seeded random perturbation of the objective.
+    A greedy timetable that already meets the strict rules is always used directly.
+    Without a seed, the CP-SAT passes go from strict to relaxed as before.
+    With a `deadline` (time.time()) the passes share the time left, and the ones past it are skipped.
     """
-    # 1. Try Strict (1-7)
-    res, _ = ortools_solve(data, list(range(1, 8)), strict=True)
-    if res: return res
-    
-    # 2. Try Relaxed (1-7) - allows gaps/windows
-    res, _ = ortools_solve(data, list(range(1, 8)), strict=False)
-    if res: return res
-    
-    # 3. Try Emergency (0-7) - allows period 0
-    res, _ = ortools_solve(data, list(range(0, 8)), strict=False)
-    return res
+    ctx = ctx or build_context(data)
+    variant = seed % 3 if seed is not None else None
+    hint, error = greedy_solve(data, list(range(1, 8)), ctx=ctx, seed=seed)
+    if not error and (is_compact(hint) or variant == 0): return hint
+
+    if variant == 2:
+        time_limit = pass_time_limit(deadline, len(CASCADE_PASSES) + 1)
+        if time_limit is not None and time_limit <= 0: return None
+        res, _ = ortools_solve(data, list(range(1, 8)), strict=True, ctx=ctx, hint=hint, time_limit=min(SEED_TIME_LIMIT, time_limit or SEED_TIME_LIMIT),
+                               random_seed=seed, objective_noise=seed)
+        if res: return res
 
+    # Strict (1-7), then relaxed (1-7, allows gaps/windows), then emergency (0-7, allows period 0)
+    for k, (periods, strict) in enumerate(CASCADE_PASSES):
+        time_limit = pass_time_limit(deadline, len(CASCADE_PASSES) - k)
+        if time_limit is not None and time_limit <= 0: return None
+        res, _ = ortools_solve(data, periods, strict=strict, ctx=ctx, hint=hint, time_limit=time_limit, random_seed=seed)
+        if res: return res
+    return None
 
-def mutate_schedule(data: ScheduleRequest, schedule: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+def mutate_schedule(data: ScheduleRequest, schedule: List[Dict[str, Any]], ctx: Optional[ProblemContext] = None,
+                    strength: Optional[float] = None, time_limit: Optional[float] = None) -> List[Dict[str, Any]]:
     """
     LNS (Large Neighborhood Search) Mutation (Standalone for pickling):
-    1. Keep X% of the schedule fixed.
+    1. Keep X% of the schedule fixed (X = 1 - strength; random 10-40% unassigned by default).
     2. Unassign the rest.
-    3. Re-solve using OR-Tools to fill the gaps.
+    3. Re-solve using OR-Tools to fill the gaps (the passes share time_limit, if given).
     """
     if not schedule: return None
     
-    mutation_strength = random.uniform(0.1, 0.4) # Unassign 10-40% of lessons
+    mutation_strength = strength if strength is not None else random.uniform(0.1, 0.4) # Unassign 10-40% of lessons
     num_to_keep = int(len(schedule) * (1 - mutation_strength))
     
     # Randomly select lessons to keep (Fixed Assignments)
@@ -43,153 +133,354 @@ def mutate_schedule(data: ScheduleRequest, schedule: List[Dict[str, Any]]) -> Li
     else:
         fixed_assignments = []
     
-    # Re-solve with these fixed constraints
-    # Try strict first
-    new_schedule, _ = ortools_solve(data, list(range(1, 8)), strict=True, fixed_assignments=fixed_assignments)
-    if new_schedule: return new_schedule
-    
-    # Try diagnostic (relaxed 1-7)
-    new_schedule, _ = ortools_solve(data, list(range(1, 8)), strict=False, fixed_assignments=fixed_assignments)
-    if new_schedule: return new_schedule
+    # Re-solve with these fixed constraints: strict, then diagnostic (relaxed 1-7), then emergency (relaxed 0-7)
+    deadline = time.time() + time_limit if time_limit is not None else None
+    for k, (periods, strict) in enumerate(CASCADE_PASSES):
+        pass_limit = pass_time_limit(deadline, len(CASCADE_PASSES) - k)
+        if pass_limit is not None and pass_limit <= 0: break
+        new_schedule, _ = ortools_solve(data, periods, strict=strict, fixed_assignments=fixed_assignments, ctx=ctx, time_limit=pass_limit)
+        if new_schedule: return new_schedule
+
+    return schedule # Return original if mutation failed completely
+
+
+class AdaptiveStrength:
+    """
+    Mutation strength tuned online by the 1/5 success rule: after every WINDOW mutations,
+    strength grows if more than a fifth of them improved on their parent and shrinks otherwise.
+    """
+    WINDOW = 10
+    FACTOR = 1.25
+    MIN, MAX = 0.05, 0.6
+
+    def __init__(self, strength: float = 0.25):
+        self.strength = strength
+        self.trials = self.successes = 0
+
+    def sample(self, rng: random.Random) -> float:
+        return min(self.MAX, max(self.MIN, rng.uniform(0.75, 1.25) * self.strength))
+
+    def record(self, improved: bool):
+        self.trials += 1
+        self.successes += improved
+        if self.trials == self.WINDOW:
+            factor = self.FACTOR if self.successes / self.trials > 0.2 else 1 / self.FACTOR
+            self.strength = min(self.MAX, max(self.MIN, self.strength * factor))
+            self.trials = self.successes = 0
+
+
+def crossover(ctx: ProblemContext, first: List[Dict[str, Any]], second: List[Dict[str, Any]], rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    Class-wise or day-wise recombination. The child keeps a random subset of classes (or days)
+    from the first parent and the rest from the second; lessons that clash or exceed the plan are
+    dropped and the missing ones are re-placed by the greedy constructor (conflict repair).
+    """
+    if rng.random() < 0.5:
+        classes = {c for c in ctx.class_requests if rng.random() < 0.5}
+        child = [l for l in first if l["class_id"] in classes] + [l for l in second if l["class_id"] not in classes]
+    else:
+        days = {d for d in ctx.days if rng.random() < 0.5}
+        child = [l for l in first if l["day"] in days] + [l for l in second if l["day"] not in days]
+    periods = list(range(0 if any(l["period"] == 0 for l in child) else 1, 8))
+    res, _ = greedy_schedule(ctx, periods, seed=rng.randrange(1 << 30), fixed=child)
+    return res
+
+
+@dataclass
+class IslandConfig:
+    """Per-island run settings (picklable)."""
+    size: int
+    generations: Optional[int]         # None = until the deadline or stagnation
+    mutation_rate: float
+    seed: int
+    deadline: Optional[float] = None   # time.time() at which the island stops
+    stagnation_limit: Optional[int] = None  # Evaluations without improvement before the island stops
+    snapshots: bool = False            # Attach the island state to every status report (for checkpoints)
+    state: Optional[Dict[str, Any]] = None  # Island state from a checkpoint to continue from
+
+
+def island_worker(data: ScheduleRequest, ctx: ProblemContext, island: int, config: IslandConfig,
+                  inbox, outbox, status) -> Tuple[Optional[List[Dict[str, Any]]], float, Dict[str, Any], List[Tuple[float, List[Dict[str, Any]]]]]:
+    """
+    Evolves one sub-population in its own process, without waiting for the other islands.
+    Every MIGRATION_INTERVAL generations its best individual goes to `outbox` (the next island's inbox)
+    and migrants from `inbox` replace the worst individuals.
+    Reports (island, generation, best score, evaluations, state or None) to `status`;
+    returns (best, score, stats, final scored population).
+    """
+    rng = random.Random(config.seed)
+    random.seed(config.seed)  # mutate_schedule draws from the module RNG
+    fitness = lambda s: schedule_fitness(s, ctx)
+    strength = AdaptiveStrength()
+    started = time.time()
+    size = config.size
+
+    # Canonical hashes of every individual seen: duplicates are never evaluated or bred again
+    seen = set()
+    duplicates = 0
+
+    def is_new(schedule) -> bool:
+        nonlocal duplicates
+        fingerprint = schedule_hash(schedule)
+        if fingerprint in seen:
+            duplicates += 1
+            return False
+        seen.add(fingerprint)
+        return True
+
+    previous = config.state or {}
+    if previous:
+        # Continue a checkpointed island: its population, RNGs, step size and counters
+        scored = sorted(previous["population"], key=lambda item: item[0], reverse=True)[:size]
+        seen.update(previous.get("seen", ()))
+        if previous.get("rng"): rng.setstate(previous["rng"])
+        if previous.get("module_rng"): random.setstate(previous["module_rng"])
+        strength.strength = previous.get("strength", strength.strength)
+        evaluations, duplicates = previous.get("evaluations", 0), previous.get("duplicates", 0)
+    else:
+        population = []
+        for k in range(size):
+            # Seeding stops at the deadline once there is someone to evolve
+            if population and config.deadline and time.time() >= config.deadline: break
+            p = initial_population_worker(data, ctx, config.seed + k, deadline=config.deadline)
+            if p and is_new(p): population.append(p)
+        scored = sorted(((fitness(p), p) for p in population), key=lambda item: item[0], reverse=True)
+        evaluations = len(scored)
+    if not scored:
+        return None, float('-inf'), {"evaluations": 0, "duplicates": duplicates}, []
+    generations_before = previous.get("generations", 0)
+    elapsed_before = previous.get("elapsed", 0.0)
+    best_score, last_improvement = scored[0][0], evaluations + duplicates
+    gen = 0
+    migrants_sent = migrants_received = 0
+
+    def snapshot() -> Optional[Dict[str, Any]]:
+        if not config.snapshots: return None
+        return {
+            "population": scored, "seen": list(seen), "rng": rng.getstate(), "module_rng": random.getstate(),
+            "strength": strength.strength, "evaluations": evaluations, "duplicates": duplicates,
+            "generations": generations_before + gen, "elapsed": elapsed_before + time.time() - started,
+        }
+
+    status.put((island, generations_before, best_score, evaluations, snapshot()))
+
+    stop_reason = "generations"
+    while config.generations is None or gen < config.generations:
+        if config.deadline and time.time() >= config.deadline:
+            stop_reason = "time_budget"
+            break
+        # Duplicates count as attempts, so a population that only reproduces itself also stagnates
+        if config.stagnation_limit and evaluations + duplicates - last_improvement >= config.stagnation_limit:
+            stop_reason = "stagnation"
+            break
+
+        children = []
+        for _ in range(size):
+            if config.deadline and time.time() >= config.deadline: break
+            if len(scored) > 1 and rng.random() >= config.mutation_rate:
+                (_, first), (_, second) = rng.sample(scored, 2)
+                child = crossover(ctx, first, second, rng)
+                if not child or not is_new(child): continue
+                children.append((fitness(child), child))
+            else:
+                parent_score, parent = rng.choice(scored)
+                time_limit = config.deadline - time.time() if config.deadline else None
+                child = mutate_schedule(data, parent, ctx, strength=strength.sample(rng), time_limit=time_limit)
+                if not child or not is_new(child):
+                    strength.record(False)
+                    continue
+                child_score = fitness(child)
+                strength.record(child_score > parent_score)
+                children.append((child_score, child))
+            evaluations += 1
+        scored = sorted(scored + children, key=lambda item: item[0], reverse=True)[:size]
+        gen += 1
+
+        if outbox is not None and gen % MIGRATION_INTERVAL == 0:
+            outbox.put(scored[0][1])
+            migrants_sent += 1
+            migrants = [(fitness(m), m) for m in drain(inbox) if is_new(m)]
+            migrants_received += len(migrants)
+            if migrants:
+                scored = sorted(scored[:max(1, size - len(migrants))] + migrants, key=lambda item: item[0], reverse=True)[:size]
+
+        if scored[0][0] > best_score:
+            best_score, last_improvement = scored[0][0], evaluations + duplicates
+        status.put((island, generations_before + gen, scored[0][0], evaluations, snapshot()))
+
+    elapsed = time.time() - started
+    stats = {
+        "generations": generations_before + gen,
+        "evaluations": evaluations,
+        "session_evaluations": evaluations - previous.get("evaluations", 0),
+        "duplicates": duplicates,
+        "elapsed": round(elapsed, 3),
+        "mutation_strength": round(strength.strength, 3),
+        "migrants_sent": migrants_sent,
+        "migrants_received": migrants_received,  # New individuals only; repeated ones count as duplicates
+        "stop_reason": stop_reason,
+    }
+    return scored[0][1], scored[0][0], stats, scored
+
+
+def resumed_island_states(state: Dict[str, Any], islands: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Island states for this run from a checkpoint. With the same island count each island continues
+    exactly; otherwise the saved individuals are dealt round-robin to the new islands (fresh RNGs).
+    """
+    saved = [state["islands"][i] for i in sorted(state.get("islands", {}))]
+    if len(saved) == islands:
+        return saved
+    individuals = sorted((item for s in saved for item in s["population"]), key=lambda item: item[0], reverse=True)
+    seen = [h for s in saved for h in s.get("seen", ())]
+    dealt = [{"population": individuals[i::islands], "seen": seen} for i in range(islands)]
+    return [d if d["population"] else None for d in dealt]
 
-    # Try emergency (relaxed 0-7)
-    new_schedule, _ = ortools_solve(data, list(range(0, 8)), strict=False, fixed_assignments=fixed_assignments)
-    
-    return new_schedule if new_schedule else schedule # Return original if mutation failed completely
 
 class GeneticSolver:
 
-    def __init__(self, data: ScheduleRequest, population_size: int = 6, generations: int = 3, mutation_rate: float = 0.5, progress_callback=None):
+    def __init__(self, data: ScheduleRequest, population_size: int = 6, generations: Optional[int] = 3, mutation_rate: float = 0.5, progress_callback=None, ctx: Optional[ProblemContext] = None,
+                 time_budget: Optional[float] = None, stagnation_limit: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None, resume_state: Optional[Dict[str, Any]] = None):
         self.data = data
+        self.ctx = ctx or build_context(data)
         self.population_size = population_size
-        self.generations = generations
+        # None = run until time_budget or stagnation
+        self.generations = generations if generations is not None or time_budget or stagnation_limit else 3
         self.mutation_rate = mutation_rate
+        self.time_budget = time_budget
+        self.stagnation_limit = stagnation_limit
         self.best_solution = None
         self.best_score = float('-inf')
         self.progress_callback = progress_callback
+        self.stats: Dict[str, Any] = {}
+        self.final_population: List[Tuple[float, List[Dict[str, Any]]]] = []  # (score, schedule) of every island at the end
+        self.checkpoint_path = checkpoint_path  # Written every CHECKPOINT_INTERVAL seconds and at the end
+        self.resume_state = resume_state  # A loaded checkpoint to continue from
 
     def calculate_fitness(self, schedule: List[Dict[str, Any]]) -> float:
-        """
-        Calculates a fitness score (higher is better).
-        Penalizes:
-        - Gaps/Windows for teachers (Heavy penalty)
-        - Period 0 usage (Heavy penalty)
-        - Uneven daily distribution
-        """
-        if not schedule: return float('-inf')
-        
-        score = 0.0
-        
-        # Pre-process for fast lookup
-        teacher_slots = {}
-        for l in schedule:
-            t_key = (l["teacher_id"], l["day"])
-            if t_key not in teacher_slots: teacher_slots[t_key] = []
-            teacher_slots[t_key].append(l["period"])
-
-        # 1. Teacher Gaps (Windows)
-        for t_day, periods in teacher_slots.items():
-            periods.sort()
-            if not periods: continue
-            
-            # Check for gaps
-            for i in range(len(periods) - 1):
-                gap = periods[i+1] - periods[i] - 1
-                if gap > 0:
-                    score -= (gap * 50)  # Huge penalty for windows
-            
-            # Check for isolated lessons (optional)
-            if len(periods) == 1:
-                score -= 10
-
-        # 2. Period 0 Usage
-        period_zero_count = sum(1 for l in schedule if l["period"] == 0)
-        if period_zero_count > 0:
-            score -= (period_zero_count * 200) # Significant penalty to prefer 1-7 range
-
-        return score
+        """Fitness score (higher is better), see schedule_fitness."""
+        return schedule_fitness(schedule, self.ctx)
+
+    def island_layout(self) -> Tuple[int, int]:
+        """(number of islands, individuals per island): one island per core, at least two individuals each."""
+        cores = os.cpu_count() or 4
+        # Limit concurrency on Windows/weak hardware to ensure responsiveness
+        if os.name == 'nt': cores = min(6, cores)
+        islands = max(1, min(cores, self.population_size // 2))
+        return islands, max(2, self.population_size // islands)
 
+    def write_checkpoint(self, island_states: Dict[int, Dict[str, Any]], stats: Dict[str, Any]):
+        populations = [item for s in island_states.values() for item in s["population"]]
+        if not populations: return
+        best_score, best = max(populations, key=lambda item: item[0])
+        save_checkpoint(self.checkpoint_path, {
+            "request": self.data.model_dump(exclude_unset=True), "islands": island_states,
+            "best": best, "best_score": best_score, "stats": stats,
+        })
+        print(f"   💾 Checkpoint saved ({len(island_states)} islands, best score {best_score}) -> {self.checkpoint_path}")
 
+    def progress(self, generations_done: Dict[int, int], islands: int, started: float) -> int:
+        """Progress from 25% to 90% during evolution: by elapsed budget, or by generations done."""
+        if self.time_budget:
+            fraction = (time.time() - started) / self.time_budget
+        elif self.generations:
+            fraction = sum(generations_done.values()) / (islands * self.generations)
+        else:
+            return 25
+        return 25 + int(min(1.0, fraction) * 65)
 
     def evolve(self) -> List[Dict[str, Any]]:
-        print(f"🧬 Starting Genetic Evolution: Pop={self.population_size}, Gens={self.generations}")
+        islands, island_size = self.island_layout()
+        print(f"🧬 Starting Genetic Evolution: Pop={self.population_size}, Gens={self.generations}, Islands={islands}x{island_size}, "
+              f"Budget={self.time_budget}s, Stagnation={self.stagnation_limit}")
         if self.progress_callback:
-            self.progress_callback(5, "⚡ Ініціалізація популяції...")
-        
-        # 1. Initialize Population (Parallel)
-        population = []
-        is_windows = os.name == 'nt'
-        # Limit concurrency on Windows/weak hardware to ensure responsiveness
-        max_workers = min(6, os.cpu_count() or 4) if is_windows else None 
-
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            # Launch N solvers with slightly different params (e.g. different implicit random seeds)
-            futures = [executor.submit(initial_population_worker, self.data) for _ in range(self.population_size)]
-            
-            completed = 0
-            for future in as_completed(futures):
-                try:
-                    sol = future.result()
-                    if sol:
-                        population.append(sol)
-                    completed += 1
-                    # Report progress during initial population generation (5% to 25%)
-                    if self.progress_callback:
-                        progress_val = 5 + int((completed / self.population_size) * 20)
-                        self.progress_callback(progress_val, f"⚡ Генерація початкової популяції: {completed}/{self.population_size}")
-                except Exception as e:
-                    print(f"❌ Worker failed: {e}")
-                    completed += 1
-        
-        if not population:
-            print("❌ Initial population failed to generate any valid schedules.")
-            return None
+            self.progress_callback(5, "⚡ Ініціалізація популяції..." if not self.resume_state else "💾 Відновлення з контрольної точки...")
+
+        started = time.time()
+        deadline = started + self.time_budget if self.time_budget else None
+        resumed = resumed_island_states(self.resume_state, islands) if self.resume_state else [None] * islands
+        previous_stats = (self.resume_state or {}).get("stats", {})
+        if self.resume_state:
+            self.best_score = self.resume_state.get("best_score", self.best_score)
+        # Latest state per island: what a checkpoint written now would contain
+        island_states = {i: s for i, s in enumerate(resumed) if s is not None}
+        last_checkpoint = started
+
+        # Islands run asynchronously; the ring of inboxes carries migrants, `status` carries progress
+        manager = multiprocessing.Manager()
+        try:
+            inboxes = [manager.Queue() for _ in range(islands)]
+            status = manager.Queue()
+            base_seed = random.randrange(1 << 30)
+            with ProcessPoolExecutor(max_workers=islands) as executor:
+                pending = {
+                    executor.submit(
+                        island_worker, self.data, self.ctx, i,
+                        IslandConfig(island_size, self.generations, self.mutation_rate, base_seed + i * 1000, deadline, self.stagnation_limit,
+                                     snapshots=self.checkpoint_path is not None, state=resumed[i]),
+                        inboxes[i], inboxes[(i + 1) % islands] if islands > 1 else None, status
+                    )
+                    for i in range(islands)
+                }
+                futures = list(pending)
+                first_generation, generations_done = {}, {}
+                while pending:
+                    _, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    updates = drain(status)
+                    for island, gen, score, evaluations, state in updates:
+                        first_generation.setdefault(island, gen)
+                        generations_done[island] = gen - first_generation[island]
+                        if state is not None:
+                            island_states[island] = state
+                        if score > self.best_score:
+                            self.best_score = score
+                            print(f"   Island {island} generation {gen} NEW Best Score: {score} ({evaluations} evaluations)")
+                    if self.progress_callback and updates:
+                        self.progress_callback(self.progress(generations_done, islands, started), f"🧬 Еволюція: {sum(generations_done.values())} поколінь на {islands} островах, найкращий бал {self.best_score}")
+                    if self.checkpoint_path and island_states and time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                        self.write_checkpoint(island_states, previous_stats)
+                        last_checkpoint = time.time()
 
-        # Sort by fitness
-        population.sort(key=self.calculate_fitness, reverse=True)
-        self.best_solution = population[0]
-        self.best_score = self.calculate_fitness(self.best_solution)
-        print(f"   Generation 0 Best Score: {self.best_score}")
-
-        # 2. Evolution Loop
-        for gen in range(self.generations):
-            if self.progress_callback:
-                # Progress from 25% to 90% during evolution
-                progress_val = 25 + int((gen / self.generations) * 65)
-                self.progress_callback(progress_val, f"🧬 Еволюція: Покоління {gen + 1}/{self.generations}...")
-            # Elitism: keep top 2 strict copies
-            next_gen = population[:2] if len(population) >= 2 else population[:]
-            
-            parents = population[:max(1, len(population)//2)] # Top 50%
-            
-            # Mutation / Breeding
-            with ProcessPoolExecutor(max_workers=max_workers) as executor:
-                future_to_parent = []
-                # Fill the rest of population with mutations
-                while len(next_gen) + len(future_to_parent) < self.population_size:
-                    parent = random.choice(parents)
-                    future_to_parent.append(executor.submit(mutate_schedule, self.data, parent))
-                
-                for future in as_completed(future_to_parent):
+                results, island_stats = [], []
+                for future in futures:
                     try:
-                        child = future.result()
-                        if child:
-                            next_gen.append(child)
+                        solution, score, stats, population = future.result()
                     except Exception as e:
-                        print(f"❌ Mutation failed: {e}")
-            
-            # Evaluate and Sort
-            population = next_gen
-            population.sort(key=self.calculate_fitness, reverse=True)
-            
-            if population:
-                current_best_score = self.calculate_fitness(population[0])
-                if current_best_score > self.best_score:
-                    self.best_score = current_best_score
-                    self.best_solution = population[0]
-                    print(f"   Generation {gen+1} NEW Best Score: {self.best_score}")
-                else:
-                    print(f"   Generation {gen+1} Best Score: {current_best_score}")
+                        print(f"❌ Island failed: {e}")
+                        continue
+                    island_stats.append(stats)
+                    self.final_population.extend(population)
+                    if solution: results.append((score, solution))
+                if results:
+                    self.best_score, self.best_solution = max(results, key=lambda item: item[0])
+        finally:
+            manager.shutdown()
+
+        elapsed = time.time() - started
+        session_evaluations = sum(s.get("session_evaluations", s["evaluations"]) for s in island_stats)
+        evaluations = previous_stats.get("evaluations", 0) + session_evaluations
+        self.stats = {
+            "islands": islands,
+            "generations": sum(s.get("generations", 0) for s in island_stats),
+            "evaluations": evaluations,
+            "evaluations_per_second": round(session_evaluations / elapsed, 2) if elapsed else 0.0,
+            "duplicates_skipped": sum(s.get("duplicates", 0) for s in island_stats),
+            "migrants_sent": sum(s.get("migrants_sent", 0) for s in island_stats),
+            "migrants_received": sum(s.get("migrants_received", 0) for s in island_stats),
+            "elapsed": round(elapsed, 3),
+            "total_elapsed": round(previous_stats.get("total_elapsed", 0.0) + elapsed, 3),
+            "sessions": previous_stats.get("sessions", 0) + 1,
+            "best_score": self.best_score,
+            "stop_reasons": sorted({s["stop_reason"] for s in island_stats if "stop_reason" in s}),
+        }
+        print(f"   Evolution finished: {evaluations} evaluations in {elapsed:.1f}s ({self.stats['evaluations_per_second']}/s)")
+        if self.checkpoint_path and island_states:
+            self.write_checkpoint(island_states, self.stats)
+
+        if self.best_solution is None:
+            print("❌ Initial population failed to generate any valid schedules.")
+            return None
 
         # Final progress update
         if self.progress_callback:
@@ -0,0 +1,180 @@
+"""
+DSatur-style constructive heuristic: lessons are vertices, lessons sharing a teacher or a class
+are adjacent, and (day, period) slots are the colours. The lesson with the fewest free slots left
+(highest saturation) is placed next, into the cheapest free slot. Runs in milliseconds and is
+used as the "greedy" strategy, as a CP-SAT hint and as a genetic population seed.
+"""
+import random
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from models import ScheduleRequest
+from .context import ProblemContext, build_context
+
+SPREAD_COST = 100     # Same subject already taught to the class that day
+CLASS_GAP_COST = 30   # Window in the class day after placement
+LATE_START_COST = 10  # Class day not starting at the first period
+TEACHER_GAP_COST = 5  # Window in the teacher day after placement
+PERIOD_ZERO_COST = 1000
+
+
+def window_count(mask: int) -> int:
+    """Empty periods between the first and the last set bit."""
+    if not mask: return 0
+    low = (mask & -mask).bit_length() - 1
+    return mask.bit_length() - low - bin(mask).count("1")
+
+
+def free_count(masks: List[int]) -> int:
+    return sum(bin(m).count("1") for m in masks)
+
+
+def greedy_schedule(ctx: ProblemContext, periods: List[int], seed: Optional[int] = None,
+                    fixed: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Builds a timetable for ctx.requests. Returns (schedule, unplaced lesson count).
+    Teacher/class clashes and blocked periods never occur; windows are possible.
+    A seed randomizes tie-breaking, so different seeds give different timetables.
+    `fixed` lessons are kept in place (in order; ones that clash, are blocked or exceed
+    the plan are dropped) and only the rest is constructed.
+    """
+    rng = random.Random(seed) if seed is not None else None
+    requests = ctx.requests
+    day_count = len(ctx.days)
+    period_mask = 0
+    for p in periods: period_mask |= 1 << p
+    first_period = 1 if 1 in periods else min(periods)
+
+    teacher_busy = {t: [0] * day_count for t in ctx.teacher_requests}
+    class_busy = {c: [0] * day_count for c in ctx.class_requests}
+    blocked = {t: ctx.teacher_blocked.get(t, (0,) * day_count) for t in ctx.teacher_requests}
+    subject_days = [[0] * day_count for _ in requests]
+    # (teacher or class id, day, period) -> request index of the lesson occupying it
+    teacher_owner, class_owner = {}, {}
+
+    def free_masks(r: int) -> List[int]:
+        req = requests[r]
+        t_busy, c_busy, t_blocked = teacher_busy[req.teacher_id], class_busy[req.class_id], blocked[req.teacher_id]
+        return [period_mask & ~(t_busy[d] | c_busy[d] | t_blocked[d]) for d in range(day_count)]
+
+    def place(r: int, d: int, p: int):
+        req = requests[r]
+        teacher_busy[req.teacher_id][d] |= 1 << p
+        class_busy[req.class_id][d] |= 1 << p
+        teacher_owner[(req.teacher_id, d, p)] = r
+        class_owner[(req.class_id, d, p)] = r
+        subject_days[r][d] += 1
+
+    def unplace(r: int, d: int, p: int):
+        req = requests[r]
+        teacher_busy[req.teacher_id][d] &= ~(1 << p)
+        class_busy[req.class_id][d] &= ~(1 << p)
+        del teacher_owner[(req.teacher_id, d, p)]
+        del class_owner[(req.class_id, d, p)]
+        subject_days[r][d] -= 1
+
+    def slot_cost(r: int, d: int, p: int) -> float:
+        req = requests[r]
+        c_mask = class_busy[req.class_id][d] | 1 << p
+        t_mask = teacher_busy[req.teacher_id][d] | 1 << p
+        cost = SPREAD_COST * subject_days[r][d] + CLASS_GAP_COST * window_count(c_mask) + TEACHER_GAP_COST * window_count(t_mask)
+        if not c_mask >> first_period & 1: cost += LATE_START_COST
+        if p == 0 and not ctx.teacher_prefers_zero.get(req.teacher_id, False): cost += PERIOD_ZERO_COST
+        cost += p * 0.1  # Prefer earlier periods
+        return cost + (rng.random() if rng else 0)
+
+    def relocate(r: int, d: int, p: int) -> bool:
+        """Moves the lesson (r, d, p) to its cheapest other free slot, if it has one."""
+        unplace(r, d, p)
+        best = None
+        for d2, mask in enumerate(free_masks(r)):
+            for p2 in periods:
+                if mask >> p2 & 1 and (d2, p2) != (d, p):
+                    cost = slot_cost(r, d2, p2)
+                    if best is None or cost < best[0]: best = (cost, d2, p2)
+        if best is None:
+            place(r, d, p)
+            return False
+        place(r, best[1], best[2])
+        return True
+
+    def eject_and_place(r: int) -> bool:
+        """One-step repair for a lesson with no free slot: move a single blocker away."""
+        req = requests[r]
+        t_blocked = blocked[req.teacher_id]
+        for d in range(day_count):
+            for p in periods:
+                if t_blocked[d] >> p & 1: continue
+                t_owner = teacher_owner.get((req.teacher_id, d, p))
+                c_owner = class_owner.get((req.class_id, d, p))
+                if t_owner is not None and c_owner is not None: continue
+                if relocate(t_owner if t_owner is not None else c_owner, d, p):
+                    place(r, d, p)
+                    return True
+        return False
+
+    degree = [
+        sum(requests[o].count for o in ctx.teacher_requests[req.teacher_id]) + sum(requests[o].count for o in ctx.class_requests[req.class_id])
+        for req in requests
+    ]
+    remaining = {r: req.count for r, req in enumerate(requests)}
+    if fixed:
+        by_key = {}
+        for r, req in enumerate(requests):
+            by_key.setdefault((req.class_id, req.subject_id, req.teacher_id), []).append(r)
+        for l in fixed:
+            d = ctx.day_index.get(l["day"])
+            p = l["period"]
+            if d is None or p not in periods: continue
+            for r in by_key.get((l["class_id"], l["subject_id"], l["teacher_id"]), ()):
+                if remaining.get(r) and free_masks(r)[d] >> p & 1:
+                    place(r, d, p)
+                    remaining[r] -= 1
+                    if not remaining[r]: del remaining[r]
+                    break
+    free = {r: free_count(free_masks(r)) for r in remaining}
+    unplaced = 0
+
+    while remaining:
+        # Saturation: fewest free slots per lesson still to place; ties go to the most constrained neighbourhood
+        r = min(remaining, key=lambda i: (free[i] - remaining[i], -degree[i], rng.random() if rng else i))
+        best = None
+        for d, mask in enumerate(free_masks(r)):
+            for p in periods:
+                if mask >> p & 1:
+                    cost = slot_cost(r, d, p)
+                    if best is None or cost < best[0]: best = (cost, d, p)
+        if best is not None:
+            place(r, best[1], best[2])
+        elif not eject_and_place(r):
+            unplaced += 1
+
+        remaining[r] -= 1
+        if not remaining[r]: del remaining[r]
+        req = requests[r]
+        for o in set(ctx.teacher_requests[req.teacher_id]) | set(ctx.class_requests[req.class_id]):
+            if o in remaining: free[o] = free_count(free_masks(o))
+
+    schedule = []
+    for (t, d, p), r in teacher_owner.items():
+        req = requests[r]
+        schedule.append({"class_id": req.class_id, "subject_id": req.subject_id, "teacher_id": req.teacher_id, "day": ctx.days[d], "period": p})
+    return schedule, unplaced
+
+
+def is_compact(schedule: List[Dict[str, Any]]) -> bool:
+    """True if every class day starts at period 1 and has no windows (what a strict CP-SAT solve guarantees)."""
+    class_days = {}
+    for l in schedule:
+        key = (l["class_id"], l["day"])
+        class_days[key] = class_days.get(key, 0) | 1 << l["period"]
+    return all(mask & 2 and not window_count(mask) for mask in class_days.values())
+
+
+def greedy_solve(data: ScheduleRequest, periods: List[int], ctx: Optional[ProblemContext] = None, seed: Optional[int] = None) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+    ctx = ctx or build_context(data)
+    started = time.perf_counter()
+    res, unplaced = greedy_schedule(ctx, periods, seed=seed)
+    print(f"Greedy construction: {len(res)} lessons placed, {unplaced} unplaced in {(time.perf_counter() - started) * 1000:.1f}ms")
+    if unplaced:
+        return res, f"Не вдалося розмістити {unplaced} урок(ів)."
+    return res, ""
@@ -0,0 +1,265 @@
+"""
+Simulated annealing over occupancy grids. A timetable is four integer arrays (teacher, class,
+day, period per lesson) plus per teacher-day and class-day bitmask grids. Two moves keep it free
+of clashes and blocked periods: moving a lesson to a free slot, and swapping two lessons of the
+same class. The cost of a day row depends only on its bitmask and is read from a lookup table,
+so a move is scored from the two to four rows it touches. Lessons the start timetable lacks
+are inserted into the cheapest free slot as soon as the moves open one.
+"""
+import math
+import random
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from models import ScheduleRequest
+from .context import ProblemContext, build_context
+from .greedy import greedy_schedule, window_count
+
+# Same measures as analyze_violations (class rules) and GeneticSolver.calculate_fitness (teacher rules)
+CLASS_GAP_COST = 5000
+LATE_START_COST = 1000   # Per period a class day starts after period 1
+TEACHER_GAP_COST = 50
+ISOLATED_LESSON_COST = 10
+PERIOD_ZERO_COST = 200
+
+START_TEMPERATURE = 2000.0
+END_TEMPERATURE = 1.0
+TABU_TENURE = 50          # Iterations a lesson may not return to the slot it just left
+CHECK_EVERY = 2000        # Iterations between clock checks
+PROGRESS_INTERVAL = 0.5   # Seconds between progress_callback calls
+
+
+def row_cost_tables(max_period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Cost of every possible class-day and teacher-day bitmask."""
+    size = 1 << (max_period + 1)
+    class_cost = np.zeros(size, dtype=np.int64)
+    teacher_cost = np.zeros(size, dtype=np.int64)
+    for mask in range(1, size):
+        first = (mask & -mask).bit_length() - 1
+        class_cost[mask] = CLASS_GAP_COST * window_count(mask) + LATE_START_COST * max(0, first - 1)
+        teacher_cost[mask] = TEACHER_GAP_COST * window_count(mask) + (ISOLATED_LESSON_COST if bin(mask).count("1") == 1 else 0)
+    return class_cost, teacher_cost
+
+
+class LocalSearch:
+    """Occupancy grids of one timetable and the moves on them."""
+
+    def __init__(self, ctx: ProblemContext, schedule: List[Dict[str, Any]], periods: List[int], seed: Optional[int] = None):
+        self.ctx = ctx
+        self.periods = periods
+        self.rng = random.Random(seed)
+        self.class_cost, self.teacher_cost = row_cost_tables(max(periods))
+        day_count = len(ctx.days)
+
+        self.teacher_ids = list(ctx.teacher_requests)
+        self.class_ids = list(ctx.class_requests)
+        self.t_index = t_index = {t: i for i, t in enumerate(self.teacher_ids)}
+        self.c_index = c_index = {c: i for i, c in enumerate(self.class_ids)}
+        self.subject_ids = [l["subject_id"] for l in schedule]
+
+        n = len(schedule)
+        self.lesson_teacher = np.array([t_index[l["teacher_id"]] for l in schedule], dtype=np.int64)
+        self.lesson_class = np.array([c_index[l["class_id"]] for l in schedule], dtype=np.int64)
+        self.lesson_day = np.array([ctx.day_index[l["day"]] for l in schedule], dtype=np.int64)
+        self.lesson_period = np.array([l["period"] for l in schedule], dtype=np.int64)
+        # Period-zero cost per lesson, depending on the teacher's preference
+        self.zero_cost = np.array([0 if ctx.teacher_prefers_zero.get(l["teacher_id"], False) else PERIOD_ZERO_COST for l in schedule], dtype=np.int64)
+
+        self.teacher_mask = np.zeros((len(self.teacher_ids), day_count), dtype=np.int64)
+        self.class_mask = np.zeros((len(self.class_ids), day_count), dtype=np.int64)
+        self.blocked = np.array([ctx.teacher_blocked.get(t, (0,) * day_count) for t in self.teacher_ids], dtype=np.int64).reshape(len(self.teacher_ids), day_count)
+        for i in range(n):
+            self.teacher_mask[self.lesson_teacher[i], self.lesson_day[i]] |= 1 << int(self.lesson_period[i])
+            self.class_mask[self.lesson_class[i], self.lesson_day[i]] |= 1 << int(self.lesson_period[i])
+        self.class_lessons = [np.flatnonzero(self.lesson_class == c) for c in range(len(self.class_ids))]
+        self.cost = self.total_cost()
+
+    def total_cost(self) -> int:
+        cost = int(self.class_cost[self.class_mask].sum() + self.teacher_cost[self.teacher_mask].sum())
+        return cost + int(self.zero_cost[self.lesson_period == 0].sum())
+
+    def _shift(self, table: np.ndarray, masks: np.ndarray, row: int, d1: int, p1: int, d2: int, p2: int) -> int:
+        """Cost change of one row moving a lesson from (d1, p1) to (d2, p2)."""
+        if d1 == d2:
+            old = int(masks[row, d1])
+            return int(table[old ^ (1 << p1) ^ (1 << p2)] - table[old])
+        old1, old2 = int(masks[row, d1]), int(masks[row, d2])
+        return int(table[old1 & ~(1 << p1)] - table[old1] + table[old2 | (1 << p2)] - table[old2])
+
+    def _relocate(self, i: int, d: int, p: int):
+        t, c = self.lesson_teacher[i], self.lesson_class[i]
+        d0, p0 = int(self.lesson_day[i]), int(self.lesson_period[i])
+        self.teacher_mask[t, d0] &= ~(1 << p0)
+        self.class_mask[c, d0] &= ~(1 << p0)
+        self.teacher_mask[t, d] |= 1 << p
+        self.class_mask[c, d] |= 1 << p
+        self.lesson_day[i], self.lesson_period[i] = d, p
+
+    def propose_move(self, i: int) -> Optional[Tuple[int, Tuple]]:
+        """Lesson i to a random free slot: (cost delta, move) or None if the slot is taken."""
+        d2, p2 = self.rng.randrange(len(self.ctx.days)), self.rng.choice(self.periods)
+        t, c = int(self.lesson_teacher[i]), int(self.lesson_class[i])
+        if (int(self.teacher_mask[t, d2]) | int(self.blocked[t, d2]) | int(self.class_mask[c, d2])) >> p2 & 1:
+            return None
+        d1, p1 = int(self.lesson_day[i]), int(self.lesson_period[i])
+        delta = self._shift(self.teacher_cost, self.teacher_mask, t, d1, p1, d2, p2) + self._shift(self.class_cost, self.class_mask, c, d1, p1, d2, p2)
+        delta += int(self.zero_cost[i]) * ((p2 == 0) - (p1 == 0))
+        return delta, ("move", i, d2, p2)
+
+    def propose_swap(self, i: int) -> Optional[Tuple[int, Tuple]]:
+        """Lesson i exchanges slots with another lesson of its class; class rows do not change."""
+        lessons = self.class_lessons[self.lesson_class[i]]
+        j = int(lessons[self.rng.randrange(len(lessons))])
+        ti, tj = int(self.lesson_teacher[i]), int(self.lesson_teacher[j])
+        if j == i or ti == tj:
+            return None
+        d1, p1, d2, p2 = int(self.lesson_day[i]), int(self.lesson_period[i]), int(self.lesson_day[j]), int(self.lesson_period[j])
+        if (int(self.teacher_mask[ti, d2]) | int(self.blocked[ti, d2])) >> p2 & 1:
+            return None
+        if (int(self.teacher_mask[tj, d1]) | int(self.blocked[tj, d1])) >> p1 & 1:
+            return None
+        delta = self._shift(self.teacher_cost, self.teacher_mask, ti, d1, p1, d2, p2) + self._shift(self.teacher_cost, self.teacher_mask, tj, d2, p2, d1, p1)
+        delta += (int(self.zero_cost[i]) - int(self.zero_cost[j])) * ((p2 == 0) - (p1 == 0))
+        return delta, ("swap", i, j)
+
+    def apply(self, move: Tuple, delta: int):
+        if move[0] == "move":
+            _, i, d, p = move
+            self._relocate(i, d, p)
+        else:
+            _, i, j = move
+            d1, p1, d2, p2 = int(self.lesson_day[i]), int(self.lesson_period[i]), int(self.lesson_day[j]), int(self.lesson_period[j])
+            ti, tj = self.lesson_teacher[i], self.lesson_teacher[j]
+            self.teacher_mask[ti, d1] &= ~(1 << p1)
+            self.teacher_mask[tj, d2] &= ~(1 << p2)
+            self.teacher_mask[ti, d2] |= 1 << p2
+            self.teacher_mask[tj, d1] |= 1 << p1
+            self.lesson_day[i], self.lesson_period[i] = d2, p2
+            self.lesson_day[j], self.lesson_period[j] = d1, p1
+        self.cost += delta
+
+    def insert(self, r_idx: int) -> bool:
+        """Adds a lesson of request r_idx in the cheapest slot free for its teacher and class; False if there is none."""
+        req = self.ctx.requests[r_idx]
+        t, c = self.t_index[req.teacher_id], self.c_index[req.class_id]
+        zero_cost = 0 if self.ctx.teacher_prefers_zero.get(req.teacher_id, False) else PERIOD_ZERO_COST
+        best = None
+        for d in range(len(self.ctx.days)):
+            t_row, c_row = int(self.teacher_mask[t, d]), int(self.class_mask[c, d])
+            busy = t_row | c_row | int(self.blocked[t, d])
+            for p in self.periods:
+                if busy >> p & 1: continue
+                delta = int(self.teacher_cost[t_row | 1 << p] - self.teacher_cost[t_row] + self.class_cost[c_row | 1 << p] - self.class_cost[c_row])
+                delta += zero_cost if p == 0 else 0
+                if best is None or delta < best[0]:
+                    best = (delta, d, p)
+        if best is None:
+            return False
+        delta, d, p = best
+        i = len(self.subject_ids)
+        self.subject_ids.append(req.subject_id)
+        self.lesson_teacher = np.append(self.lesson_teacher, t)
+        self.lesson_class = np.append(self.lesson_class, c)
+        self.lesson_day = np.append(self.lesson_day, d)
+        self.lesson_period = np.append(self.lesson_period, p)
+        self.zero_cost = np.append(self.zero_cost, zero_cost)
+        self.teacher_mask[t, d] |= 1 << p
+        self.class_mask[c, d] |= 1 << p
+        self.class_lessons[c] = np.append(self.class_lessons[c], i)
+        self.cost += delta
+        return True
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.lesson_day.copy(), self.lesson_period.copy()
+
+    def to_schedule(self, days: np.ndarray, periods: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {"class_id": self.class_ids[c], "subject_id": s, "teacher_id": self.teacher_ids[t], "day": self.ctx.days[d], "period": int(p)}
+            for c, s, t, d, p in zip(self.lesson_class, self.subject_ids, self.lesson_teacher, days, periods)
+        ]
+
+
+def local_search_solve(data: ScheduleRequest, periods: List[int], ctx: Optional[ProblemContext] = None, time_limit: float = 30.0,
+                       progress_callback=None, initial: Optional[List[Dict[str, Any]]] = None,
+                       seed: Optional[int] = None) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Anneals `initial` (default: the greedy timetable) within `time_limit` seconds.
+    Lessons of the plan missing from `initial` are inserted whenever a slot is free for them;
+    the ones still missing at the end are counted in stats["unplaced"].
+    Returns (best schedule, stats); stops early once the cost reaches zero and nothing is missing.
+    """
+    ctx = ctx or build_context(data)
+    if initial is None:
+        initial, _ = greedy_schedule(ctx, periods, seed=seed)
+
+    placed = Counter((l["class_id"], l["subject_id"], l["teacher_id"]) for l in initial)
+    pending = []  # Request index per missing lesson
+    for r_idx, req in enumerate(ctx.requests):
+        key = (req.class_id, req.subject_id, req.teacher_id)
+        taken = min(placed[key], req.count)
+        placed[key] -= taken
+        pending.extend([r_idx] * (req.count - taken))
+    if pending:
+        print(f"Local search: start timetable lacks {len(pending)} lesson(s)")
+
+    search = LocalSearch(ctx, initial, periods, seed=seed)
+
+    def insert_pending() -> bool:
+        inserted = [r_idx for r_idx in pending if search.insert(r_idx)]
+        for r_idx in inserted:
+            pending.remove(r_idx)
+        return bool(inserted)
+
+    insert_pending()
+    if not search.subject_ids:
+        return None, {"iterations": 0, "unplaced": len(pending)}
+    best_cost, best = search.cost, search.snapshot()
+    start_cost = search.cost
+    tabu = {}  # (lesson, day, period) -> iteration until which the slot is tabu for the lesson
+    rng = search.rng
+    started = time.perf_counter()
+    last_progress = started
+    iterations = accepted = 0
+    temperature = START_TEMPERATURE
+
+    while best_cost > 0 or pending:
+        iterations += 1
+        if iterations % CHECK_EVERY == 0:
+            now = time.perf_counter()
+            elapsed = (now - started) / time_limit
+            if elapsed >= 1: break
+            # A placed lesson outweighs any cost, so the best timetable restarts from the current one
+            if pending and insert_pending():
+                best_cost, best = search.cost, search.snapshot()
+            temperature = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** elapsed
+            if progress_callback and now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                progress_callback(5 + int(elapsed * 90), f"🔥 Локальний пошук: штраф {best_cost}")
+
+        i = rng.randrange(len(search.subject_ids))
+        proposal = search.propose_move(i) if rng.random() < 0.5 else search.propose_swap(i)
+        if proposal is None: continue
+        delta, move = proposal
+        if move[0] == "move" and tabu.get((i, move[2], move[3]), 0) > iterations and search.cost + delta >= best_cost:
+            continue  # Tabu unless it would beat the best (aspiration)
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            if move[0] == "move":
+                tabu[(i, int(search.lesson_day[i]), int(search.lesson_period[i]))] = iterations + TABU_TENURE
+            search.apply(move, delta)
+            accepted += 1
+            if search.cost < best_cost:
+                best_cost, best = search.cost, search.snapshot()
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "iterations": iterations,
+        "accepted": accepted,
+        "moves_per_second": int(iterations / elapsed) if elapsed else iterations,
+        "start_cost": start_cost,
+        "best_cost": best_cost,
+        "unplaced": len(pending),
+        "elapsed": round(elapsed, 3),
+    }
+    print(f"Local search: cost {start_cost} -> {best_cost}, {iterations} iterations ({stats['moves_per_second']}/s)")
+    return search.to_schedule(*best), stats
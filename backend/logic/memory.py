@@ -0,0 +1,97 @@
+"""
+Peak memory of one solve. On Linux the kernel's peak-RSS counter (VmHWM) is reset before the
+solve, so the reading belongs to that solve even in long-lived pool workers; elsewhere the
+process-wide ru_maxrss is reported ("peak_rss_scope": "process"). Solvers that run in a child
+process (PuLP's CBC) are measured with children=True from RUSAGE_CHILDREN: its high-water mark
+covers every child ever waited for, so it belongs to this solve only if the solve raised it
+("solver_peak_rss_scope": "solve"; otherwise it is an upper bound, "process").
+SCHEDULER_TRACE_MEMORY=1 also traces the Python heap with tracemalloc: slower, and native solver
+memory only shows up in RSS.
+"""
+import os
+import sys
+import tracemalloc
+from typing import Dict, Any, Optional
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_PYTHON_MEMORY = os.environ.get("SCHEDULER_TRACE_MEMORY") == "1"
+
+
+def status_mb(field: str) -> Optional[float]:
+    """A kB field of /proc/self/status (VmRSS, VmHWM) in MB, or None off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def maxrss_mb(who) -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    return resource.getrusage(who).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def peak_rss_mb() -> Optional[float]:
+    peak = status_mb("VmHWM")
+    if peak is None and resource is not None:
+        peak = maxrss_mb(resource.RUSAGE_SELF)
+    return peak
+
+
+def children_peak_rss_mb() -> Optional[float]:
+    """Largest peak RSS of the child processes waited for so far."""
+    return maxrss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None
+
+
+class MemoryProbe:
+    """
+    `with MemoryProbe(stats):` adds peak_rss_mb, rss_before_mb and peak_rss_scope (and python_peak_mb) to stats;
+    with children=True also solver_peak_rss_mb and solver_peak_rss_scope for a solver running in a child process.
+    """
+
+    def __init__(self, stats: Dict[str, Any], children: bool = False):
+        self.stats = stats
+        self.children = children
+        self.per_solve = False
+        self.tracing = False
+
+    def __enter__(self):
+        self.per_solve = reset_peak_rss()
+        self.rss_before = status_mb("VmRSS")
+        self.children_before = children_peak_rss_mb() if self.children else None
+        if TRACE_PYTHON_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracing = True
+        return self
+
+    def __exit__(self, *exc):
+        peak = peak_rss_mb()
+        self.stats["peak_rss_mb"] = round(peak, 1) if peak is not None else None
+        self.stats["rss_before_mb"] = round(self.rss_before, 1) if self.rss_before is not None else None
+        self.stats["peak_rss_scope"] = "solve" if self.per_solve else "process"
+        if self.children:
+            child_peak = children_peak_rss_mb()
+            self.stats["solver_peak_rss_mb"] = round(child_peak, 1) if child_peak is not None else None
+            self.stats["solver_peak_rss_scope"] = "solve" if child_peak is not None and child_peak > (self.children_before or 0) else "process"
+        if self.tracing:
+            _, python_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stats["python_peak_mb"] = round(python_peak / (1024 * 1024), 1)
+        return False
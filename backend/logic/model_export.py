@@ -0,0 +1,137 @@
+"""
+Model export bundles for offline performance investigation. A request with "export_bundle":
+"<id>" writes the built models of every solver pass to bundle_dir()/<id>/ next to the request
+itself: CP-SAT models as text protos (cp_sat_<pass>.pbtxt, with the greedy hint), PuLP problems
+as MPS (pulp_<pass>.mps), the request as request.json and the run's solver stats as
+manifest.json. replay_bundle.py solves the exported models again under other parameters.
+"""
+import json
+import os
+import re
+import time
+from typing import List, Dict, Any, Optional, Tuple
+import pulp
+from ortools.sat.python import cp_model
+from models import ScheduleRequest
+from .engine import response_stats, keep_solve_log, apply_parameters
+
+BUNDLE_VERSION = 1
+BUNDLE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+REQUEST_FILE = "request.json"
+MANIFEST_FILE = "manifest.json"
+MODEL_SUFFIXES = {"cp_sat": ".pbtxt", "pulp": ".mps"}
+
+
+def bundle_dir() -> str:
+    return os.environ.get("SCHEDULER_BUNDLE_DIR", "bundles")
+
+
+def bundle_path(bundle_id: str) -> str:
+    """Directory of a bundle id; ids are restricted so they cannot point outside bundle_dir()."""
+    if not BUNDLE_ID_PATTERN.match(bundle_id or ""):
+        raise ValueError(f"Invalid bundle id: {bundle_id!r}")
+    return os.path.join(bundle_dir(), bundle_id)
+
+
+def model_file(path: Optional[str], solver: str, pass_name: str) -> Optional[str]:
+    """Where a pass exports its model (None when no bundle is being written)."""
+    return os.path.join(path, f"{solver}_{pass_name}{MODEL_SUFFIXES[solver]}") if path else None
+
+
+def start_bundle(data: ScheduleRequest) -> str:
+    """Creates the bundle directory; re-using an id replaces the earlier run's models and manifest."""
+    path = bundle_path(data.export_bundle)
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        # Otherwise the manifest and a replay would mix passes of different runs
+        if name.endswith(tuple(MODEL_SUFFIXES.values())) or name == MANIFEST_FILE:
+            os.remove(os.path.join(path, name))
+    with open(os.path.join(path, REQUEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(data.model_dump(mode="json", exclude_unset=True, exclude={"export_bundle"}), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def write_manifest(path: str, passes: List[Dict[str, Any]]):
+    """Rewritten after every pass, so a bundle of a run that was killed still has the passes that finished."""
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "saved_at": time.time(),
+        "passes": passes,
+        "models": sorted(f for f in os.listdir(path) if f.endswith(tuple(MODEL_SUFFIXES.values()))),
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def load_bundle(path: str) -> Tuple[Dict[str, Any], ScheduleRequest]:
+    """(manifest, request) of a bundle directory; the manifest is empty if no pass finished."""
+    if not os.path.isdir(path):
+        raise ValueError(f"No bundle at {path}")
+    with open(os.path.join(path, REQUEST_FILE), encoding="utf-8") as f:
+        data = ScheduleRequest(**json.load(f))
+    manifest = {}
+    if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {manifest.get('version')} in {path}")
+    return manifest, data
+
+
+def bundle_models(path: str) -> List[str]:
+    """Model files of a bundle in solve order (CP-SAT cascade passes first, as they ran)."""
+    order = ["strict", "diagnostic", "emergency"]
+    files = [f for f in os.listdir(path) if f.endswith(tuple(MODEL_SUFFIXES.values()))]
+
+    def rank(name):
+        stem = os.path.splitext(name)[0]
+        return next((i for i, p in enumerate(order) if stem.endswith("_" + p)), len(order)), name
+    return [os.path.join(path, f) for f in sorted(files, key=rank)]
+
+
+def parse_param(text: str) -> Tuple[str, Any]:
+    """"name=value" -> (name, value) with value as bool, int, float or str."""
+    name, sep, value = text.partition("=")
+    if not sep or not name:
+        raise ValueError(f"Expected name=value, got {text!r}")
+    if value.lower() in ("true", "false"):
+        return name, value.lower() == "true"
+    for cast in (int, float):
+        try:
+            return name, cast(value)
+        except ValueError:
+            pass
+    return name, value
+
+
+def replay_cp_model(model_path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Solves an exported CP-SAT model with `params` (SatParameters fields, see apply_parameters) and returns its solve stats."""
+    model = cp_model.CpModel()
+    with open(model_path, encoding="utf-8") as f:
+        if not model.Proto().parse_text_format(f.read()):
+            raise ValueError(f"Could not parse CP-SAT model {model_path}")
+    solver = cp_model.CpSolver()
+    # As in ortools_solve: the exported greedy hint may break strict rules
+    if model.Proto().has_solution_hint(): solver.parameters.repair_hint = True
+    apply_parameters(solver, params)
+    keep_solve_log(solver)
+    status = solver.Solve(model)
+    return dict(response_stats(model, solver, status), time_limit=solver.parameters.max_time_in_seconds)
+
+
+def replay_pulp_model(model_path: str, time_limit: Optional[float] = None, threads: Optional[int] = None) -> Dict[str, Any]:
+    """Solves an exported MPS problem with CBC and returns the same fields solve_with_pulp reports."""
+    _, prob = pulp.LpProblem.fromMPS(model_path)
+    started = time.perf_counter()
+    prob.solve(pulp.PULP_CBC_CMD(timeLimit=time_limit, threads=threads, msg=False))
+    status = pulp.LpStatus[prob.status]
+    return {
+        "solver": "pulp-cbc",
+        "status": status,
+        "solution_status": pulp.LpSolution[prob.sol_status],
+        "variables": prob.numVariables(),
+        "constraints": prob.numConstraints(),
+        "objective": pulp.value(prob.objective) if status == "Optimal" else None,
+        "wall_time": round(time.perf_counter() - started, 3),
+        "time_limit": time_limit,
+    }
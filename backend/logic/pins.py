@@ -0,0 +1,83 @@
+"""
+Pinned lessons and forbidden slots as domain reductions. Pinned lessons are placed before a
+model is built: they get no variables, their request needs correspondingly fewer lessons, and
+their teacher and class slots are closed for every other request. Forbidden slots close
+periods per request. Both the CP-SAT and the PuLP builders read the result, so the model
+shrinks with every pinned lesson instead of growing by an x == 1 constraint.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
+from .context import ProblemContext
+
+
+@dataclass
+class PinnedDomains:
+    pinned: List[Tuple[int, int, int]]          # (request index, day, period) placed before solving
+    remaining: List[int]                        # Per request: lessons still to place
+    closed: Dict[int, List[int]]                # Per request with reductions: closed periods per weekday (bitmasks)
+    class_pinned: Dict[Tuple[str, int], int] = field(default_factory=dict)    # (class_id, day) -> pinned periods (bitmask)
+    teacher_pinned: Dict[Tuple[str, int], int] = field(default_factory=dict)  # (teacher_id, day) -> pinned periods (bitmask)
+    dropped: List[str] = field(default_factory=list)  # Pinned lessons that cannot be placed, as messages
+    fixed_dropped: int = 0                            # fixed_assignments that could not be kept (those are only a head start)
+
+    def is_open(self, r_idx: int, day: int, period: int) -> bool:
+        masks = self.closed.get(r_idx)
+        return not (masks and masks[day] >> period & 1)
+
+    def pinned_lessons(self, ctx: ProblemContext) -> List[Dict[str, Any]]:
+        return [
+            {"class_id": ctx.requests[r].class_id, "subject_id": ctx.requests[r].subject_id, "teacher_id": ctx.requests[r].teacher_id,
+             "day": ctx.days[d], "period": p}
+            for r, d, p in self.pinned
+        ]
+
+
+def pin_domains(ctx: ProblemContext, periods: List[int], fixed_assignments: Optional[List[Dict[str, Any]]] = None) -> PinnedDomains:
+    """
+    Resolves ctx.pinned plus `fixed_assignments` (same lesson shape) against the plan rows and
+    derives the reduced domains. Pins for unknown rows, beyond a row's count, outside `periods`,
+    in a blocked or forbidden period, or clashing with an earlier pin are reported in `dropped`:
+    the model must not be solved without them. Such fixed assignments are only counted.
+    """
+    by_key = defaultdict(list)
+    for r_idx, req in enumerate(ctx.requests):
+        by_key[(req.class_id, req.subject_id, req.teacher_id)].append(r_idx)
+    remaining = [req.count for req in ctx.requests]
+    period_set = set(periods)
+    teacher_pinned, class_pinned = defaultdict(int), defaultdict(int)
+    pinned, dropped, fixed_dropped = [], [], 0
+
+    lessons = [(key, True) for key in ctx.pinned] + \
+        [((f["class_id"], f["subject_id"], f["teacher_id"], f["day"], f["period"]), False) for f in fixed_assignments or ()]
+    for (class_id, subject_id, teacher_id, day, period), is_pin in lessons:
+        label = f"{ctx.class_names.get(class_id, class_id)}, {ctx.subject_names.get(subject_id, subject_id)} ({day}, урок {period})"
+        d = ctx.day_index.get(day)
+        r_idx = next((r for r in by_key.get((class_id, subject_id, teacher_id), ()) if remaining[r]), None)
+        reason = None
+        if r_idx is None:
+            reason = "немає відповідного рядка плану або всі його уроки вже закріплені"
+        elif d is None or period not in period_set:
+            reason = "слот поза розкладом"
+        elif ctx.is_blocked(teacher_id, d, period) or ctx.forbidden.get(r_idx, (0,) * len(ctx.days))[d] >> period & 1:
+            reason = "вчитель недоступний або слот заборонений"
+        elif teacher_pinned.get((teacher_id, d), 0) >> period & 1 or class_pinned.get((class_id, d), 0) >> period & 1:
+            reason = "конфліктує з іншим закріпленим уроком"
+        if reason:
+            if is_pin: dropped.append(f"• Закріплений урок {label}: {reason}")
+            else: fixed_dropped += 1
+        else:
+            remaining[r_idx] -= 1
+            teacher_pinned[(teacher_id, d)] |= 1 << period
+            class_pinned[(class_id, d)] |= 1 << period
+            pinned.append((r_idx, d, period))
+
+    closed = {r_idx: list(masks) for r_idx, masks in ctx.forbidden.items()}
+    for (teacher_id, d), bits in teacher_pinned.items():
+        for r_idx in ctx.teacher_requests.get(teacher_id, ()):
+            closed.setdefault(r_idx, [0] * len(ctx.days))[d] |= bits
+    for (class_id, d), bits in class_pinned.items():
+        for r_idx in ctx.class_requests.get(class_id, ()):
+            closed.setdefault(r_idx, [0] * len(ctx.days))[d] |= bits
+    return PinnedDomains(pinned=pinned, remaining=remaining, closed=closed, class_pinned=dict(class_pinned),
+                         teacher_pinned=dict(teacher_pinned), dropped=dropped, fixed_dropped=fixed_dropped)
@@ -0,0 +1,184 @@
+"""
+Live validation of the plan grid. A PlanSession keeps what validate_workloads computes in a
+full pass (per-row errors, the (class, subject) rows seen so far, teacher and class load
+totals) and updates it per edited row, so each keystroke costs a few dictionary updates and
+returns only the messages that appeared or disappeared.
+"""
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+from models import ScheduleRequest, TeachingPlanItem
+from .context import ProblemContext, build_context
+from .preprocessor import EMPTY_PLAN_ERROR, check_plan_row, duplicate_row_error, teacher_load_error, class_load_error
+
+ErrorKey = Tuple  # ("row", row_id) | ("teacher", teacher_id) | ("class", class_id)
+
+
+class PlanSession:
+    """Incrementally validated teaching plan. Row ids are stable: deleted rows leave a hole."""
+
+    def __init__(self, data: ScheduleRequest, ctx: Optional[ProblemContext] = None):
+        self.ctx = ctx or build_context(data)
+        self.teacher_order = [t.id for t in data.teachers]
+        self.rows: Dict[int, TeachingPlanItem] = {}
+        self.next_row_id = 0
+        self.active_rows = 0                # Rows with hours_per_week > 0
+        self.row_state: Dict[int, Tuple[Optional[str], bool]] = {}  # (error, counted) before the duplicate check
+        self.combos = defaultdict(set)      # (class_id, subject_id) -> counted row ids; the smallest one is not a duplicate
+        self.contributions: Dict[int, Tuple[str, str, int]] = {}    # row id -> (teacher, class, hours) added to the loads
+        self.teacher_loads = defaultdict(int)
+        self.class_loads = defaultdict(int)
+        self.errors: Dict[ErrorKey, str] = {}
+        self.edits = 0
+        self.touched = time.time()
+
+        for plan in data.plan:
+            self.change(None, plan, set())
+        for t_id in self.teacher_order:
+            self.refresh(("teacher", t_id))
+        for c_id in list(self.class_loads):
+            self.refresh(("class", c_id))
+
+    # --- Row bookkeeping ---
+
+    def row_combo(self, row_id: int) -> Optional[Tuple[str, str]]:
+        if row_id not in self.rows or not self.row_state[row_id][1]:
+            return None
+        plan = self.rows[row_id]
+        return (plan.class_id, plan.subject_id)
+
+    def change(self, row_id: Optional[int], plan: Optional[TeachingPlanItem], touched: set) -> int:
+        """Sets (plan given) or deletes (plan None) a row; collects the affected error keys in `touched`."""
+        if row_id is None:
+            row_id = self.next_row_id
+        self.next_row_id = max(self.next_row_id, row_id + 1)
+
+        rows = {row_id}
+        old_combo = self.row_combo(row_id)
+        if old_combo:
+            self.combos[old_combo].discard(row_id)
+            rows |= self.combos[old_combo]
+        if row_id in self.rows and self.rows[row_id].hours_per_week > 0:
+            self.active_rows -= 1
+
+        if plan is None:
+            self.rows.pop(row_id, None)
+            self.row_state.pop(row_id, None)
+        else:
+            self.rows[row_id] = plan
+            self.row_state[row_id] = check_plan_row(plan, self.ctx)
+            if plan.hours_per_week > 0:
+                self.active_rows += 1
+            new_combo = self.row_combo(row_id)
+            if new_combo:
+                self.combos[new_combo].add(row_id)
+                rows |= self.combos[new_combo]
+
+        for r in rows:
+            self.recount(r, touched)
+        return row_id
+
+    def recount(self, row_id: int, touched: set):
+        """Re-derives one row's error and load contribution from its state and its combo group."""
+        error, contribution = None, None
+        if row_id in self.rows:
+            plan = self.rows[row_id]
+            error, counted = self.row_state[row_id]
+            combo = self.row_combo(row_id)
+            if combo and row_id != min(self.combos[combo]):
+                error = duplicate_row_error(plan, self.ctx)
+            elif counted:
+                contribution = (plan.teacher_id, plan.class_id, plan.hours_per_week)
+
+        old = self.contributions.get(row_id)
+        if old != contribution:
+            if old:
+                self.teacher_loads[old[0]] -= old[2]
+                self.class_loads[old[1]] -= old[2]
+                touched.update((("teacher", old[0]), ("class", old[1])))
+                del self.contributions[row_id]
+            if contribution:
+                self.teacher_loads[contribution[0]] += contribution[2]
+                self.class_loads[contribution[1]] += contribution[2]
+                touched.update((("teacher", contribution[0]), ("class", contribution[1])))
+                self.contributions[row_id] = contribution
+        self.set_error(("row", row_id), error)
+        touched.add(("row", row_id))
+
+    def set_error(self, key: ErrorKey, error: Optional[str]):
+        if error:
+            self.errors[key] = error
+        else:
+            self.errors.pop(key, None)
+
+    def refresh(self, key: ErrorKey):
+        if key[0] == "teacher":
+            self.set_error(key, teacher_load_error(key[1], self.teacher_loads.get(key[1], 0), self.ctx))
+        elif key[0] == "class":
+            self.set_error(key, class_load_error(key[1], self.class_loads.get(key[1], 0), self.ctx))
+
+    # --- Edits ---
+
+    def visible(self, keys) -> List[str]:
+        """Messages of `keys` as validate_workloads would report them."""
+        if not self.active_rows:
+            return [EMPTY_PLAN_ERROR]
+        return [self.errors[key] for key in keys if key in self.errors]
+
+    def edit(self, changes: List[Tuple[Optional[int], Optional[TeachingPlanItem]]]) -> Dict[str, Any]:
+        """
+        Applies (row_id, plan) changes: row_id None adds a row, plan None deletes it.
+        Returns the messages added and removed, and the loads that changed.
+        """
+        for row_id, plan in changes:
+            if row_id is not None and row_id not in self.rows:
+                raise ValueError(f"Unknown plan row: {row_id}")
+
+        was_empty = not self.active_rows
+        old_errors = dict(self.errors)
+        touched = set()
+        row_ids = [self.change(row_id, plan, touched) for row_id, plan in changes]
+        for key in touched:
+            self.refresh(key)
+
+        if was_empty or not self.active_rows:
+            before_msgs = [EMPTY_PLAN_ERROR] if was_empty else list(old_errors.values())
+            after_msgs = self.errors_list()
+        else:
+            before_msgs = [old_errors[key] for key in touched if key in old_errors]
+            after_msgs = self.visible(touched)
+        self.edits += 1
+        self.touched = time.time()
+        return {
+            "row_ids": row_ids,
+            "added": [msg for msg in after_msgs if msg not in before_msgs],
+            "removed": [msg for msg in before_msgs if msg not in after_msgs],
+            "teacher_loads": {t: self.teacher_loads.get(t, 0) for t in sorted({k[1] for k in touched if k[0] == "teacher"})},
+            "class_loads": {c: self.class_loads.get(c, 0) for c in sorted({k[1] for k in touched if k[0] == "class"})},
+            "error_count": len(self.errors) if self.active_rows else 1,
+        }
+
+    # --- Whole-session views ---
+
+    def errors_list(self) -> List[str]:
+        if not self.active_rows:
+            return [EMPTY_PLAN_ERROR]
+        rows = [self.errors[("row", r)] for r in sorted(self.rows) if ("row", r) in self.errors]
+        teachers = [self.errors[("teacher", t)] for t in self.teacher_order if ("teacher", t) in self.errors]
+        classes = [msg for key, msg in self.errors.items() if key[0] == "class"]
+        return rows + teachers + classes
+
+    def plan(self) -> List[TeachingPlanItem]:
+        return [self.rows[r] for r in sorted(self.rows)]
+
+    def summary(self, with_rows: bool = False) -> Dict[str, Any]:
+        result = {
+            "row_count": len(self.rows),
+            "edits": self.edits,
+            "errors": self.errors_list(),
+            "teacher_loads": {t: load for t, load in self.teacher_loads.items() if load},
+            "class_loads": {c: load for c, load in self.class_loads.items() if load},
+        }
+        if with_rows:
+            result["rows"] = [{"id": r, **self.rows[r].model_dump()} for r in sorted(self.rows)]
+        return result
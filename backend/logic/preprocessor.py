@@ -1,98 +1,102 @@
-from typing import List, Dict, Any
-from models import ScheduleRequest
+from typing import List, Dict, Any, Optional, Tuple
+from models import ScheduleRequest, TeachingPlanItem
+from .context import ProblemContext, build_context
 
-def validate_workloads(data: ScheduleRequest) -> List[str]:
+MAX_WEEKLY_SLOTS = 40
+EMPTY_PLAN_ERROR = "• План порожній: немає жодного уроку для розподілу"
+
+
+def check_plan_row(plan: TeachingPlanItem, ctx: ProblemContext) -> Tuple[Optional[str], bool]:
+    """
+    (error, counted) for one plan row, ignoring duplicates: counted rows are valid and add
+    their hours to the teacher and class loads (unless they duplicate an earlier row).
+    """
+    class_name = ctx.class_names.get(plan.class_id, f"ID: {plan.class_id}")
+    subject_name = ctx.subject_names.get(plan.subject_id, f"ID: {plan.subject_id}")
+
+    if plan.hours_per_week < 0:
+        return f"• Клас '{class_name}', предмет '{subject_name}': від'ємна кількість годин ({plan.hours_per_week})", False
+    if plan.hours_per_week != int(plan.hours_per_week):
+        return f"• Клас '{class_name}', предмет '{subject_name}': дробова кількість годин ({plan.hours_per_week})", False
+    if plan.hours_per_week <= 0:
+        return None, False
+    if plan.subject_id not in ctx.subject_names:
+        return f"• Клас '{class_name}': невідомий предмет (ID: {plan.subject_id})", False
+    if plan.class_id not in ctx.class_names:
+        return f"• Предмет '{subject_name}': невідомий клас (ID: {plan.class_id})", False
+    if plan.teacher_id not in ctx.teacher_names:
+        if plan.teacher_id == "":
+            return f"• Клас '{class_name}', предмет '{subject_name}': не вказано вчителя", False
+        return f"• Клас '{class_name}', предмет '{subject_name}': невідомий вчитель (ID: {plan.teacher_id})", False
+
+    teacher_subs = ctx.teacher_subjects.get(plan.teacher_id, frozenset())
+    is_primary = ctx.teacher_is_primary.get(plan.teacher_id, False)
+    can_teach = plan.subject_id in teacher_subs or (is_primary and ctx.is_primary_grade(plan.class_id))
+    if not can_teach:
+        return f"• Клас '{class_name}', предмет '{subject_name}': вчитель {ctx.teacher_names[plan.teacher_id]} не викладає цей предмет", False
+    return None, True
+
+
+def duplicate_row_error(plan: TeachingPlanItem, ctx: ProblemContext) -> str:
+    class_name = ctx.class_names.get(plan.class_id, f"ID: {plan.class_id}")
+    subject_name = ctx.subject_names.get(plan.subject_id, f"ID: {plan.subject_id}")
+    return f"• Клас '{class_name}', предмет '{subject_name}': дублікат в плані"
+
+
+def teacher_load_error(t_id: str, load: int, ctx: ProblemContext) -> Optional[str]:
+    available_slots = MAX_WEEKLY_SLOTS - ctx.blocked_count(t_id)
+    name = ctx.teacher_names.get(t_id, t_id)
+    if load > available_slots:
+        return f"• Вчитель {name} має {load} год/тиждень, але з урахуванням графіка доступно лише {available_slots} слотів"
+    if load > MAX_WEEKLY_SLOTS:
+        return f"• Вчитель {name} має {load} год/тиждень (абсолютний максимум {MAX_WEEKLY_SLOTS})"
+    return None
+
+
+def class_load_error(c_id: str, load: int, ctx: ProblemContext) -> Optional[str]:
+    if load > MAX_WEEKLY_SLOTS:
+        return f"• Клас {ctx.class_names.get(c_id, c_id)} має {load} уроків/тиждень (максимум {MAX_WEEKLY_SLOTS})"
+    return None
+
+
+def validate_workloads(data: ScheduleRequest, ctx: Optional[ProblemContext] = None) -> List[str]:
     errors = []
-    
-    teacher_names = {t.id: t.name for t in data.teachers}
-    class_names = {c.id: c.name for c in data.classes}
-    subject_names = {s.id: s.name for s in data.subjects}
-    teacher_subjects = {t.id: set(t.subjects) for t in data.teachers}
-    teacher_is_primary = {t.id: t.is_primary for t in data.teachers}
-    
+
+    ctx = ctx or build_context(data)
+
     active_plan_items = [p for p in data.plan if p.hours_per_week > 0]
     if not active_plan_items:
-        errors.append("• План порожній: немає жодного уроку для розподілу")
+        errors.append(EMPTY_PLAN_ERROR)
         return errors
-    
+
     seen_combinations = set()
     teacher_loads = {}
     class_loads = {}
-    MAX_WEEKLY_SLOTS = 40
-    
+
     for plan in data.plan:
-        class_name = class_names.get(plan.class_id, f"ID: {plan.class_id}")
-        subject_name = subject_names.get(plan.subject_id, f"ID: {plan.subject_id}")
-        
-        if plan.hours_per_week < 0:
-            errors.append(f"• Клас '{class_name}', предмет '{subject_name}': від'ємна кількість годин ({plan.hours_per_week})")
-            continue
-        
-        if plan.hours_per_week != int(plan.hours_per_week):
-            errors.append(f"• Клас '{class_name}', предмет '{subject_name}': дробова кількість годин ({plan.hours_per_week})")
-            continue
-        
-        if plan.hours_per_week <= 0:
-            continue
-        
-        if plan.subject_id not in subject_names:
-            errors.append(f"• Клас '{class_name}': невідомий предмет (ID: {plan.subject_id})")
-            continue
-        
-        if plan.class_id not in class_names:
-            errors.append(f"• Предмет '{subject_name}': невідомий клас (ID: {plan.class_id})")
-            continue
-        
-        if plan.teacher_id not in teacher_names:
-            if plan.teacher_id == "":
-                errors.append(f"• Клас '{class_name}', предмет '{subject_name}': не вказано вчителя")
-            else:
-                errors.append(f"• Клас '{class_name}', предмет '{subject_name}': невідомий вчитель (ID: {plan.teacher_id})")
+        error, counted = check_plan_row(plan, ctx)
+        if error:
+            errors.append(error)
+        if not counted:
             continue
-        
-        teacher_name = teacher_names[plan.teacher_id]
-        teacher_subs = teacher_subjects.get(plan.teacher_id, set())
-        is_primary = teacher_is_primary.get(plan.teacher_id, False)
-        
-        try:
-            grade = int(class_name.split('-')[0]) if '-' in class_name else int(class_name)
-            is_primary_class = 1 <= grade <= 4
-        except:
-            is_primary_class = False
-        
-        can_teach = plan.subject_id in teacher_subs or (is_primary and is_primary_class)
-        
-        if not can_teach:
-            errors.append(f"• Клас '{class_name}', предмет '{subject_name}': вчитель {teacher_name} не викладає цей предмет")
-            continue
-        
+
         combo = (plan.class_id, plan.subject_id)
         if combo in seen_combinations:
-            errors.append(f"• Клас '{class_name}', предмет '{subject_name}': дублікат в плані")
+            errors.append(duplicate_row_error(plan, ctx))
             continue
         seen_combinations.add(combo)
-        
+
         teacher_loads[plan.teacher_id] = teacher_loads.get(plan.teacher_id, 0) + plan.hours_per_week
         class_loads[plan.class_id] = class_loads.get(plan.class_id, 0) + plan.hours_per_week
-    
+
     for t in data.teachers:
-        t_id = t.id
-        load = teacher_loads.get(t_id, 0)
-        blocked_count = 0
-        if t.availability:
-            for day_slots in t.availability.values():
-                blocked_count += len(day_slots)
-        available_slots = MAX_WEEKLY_SLOTS - blocked_count
-        if load > available_slots:
-            name = teacher_names.get(t_id, t_id)
-            errors.append(f"• Вчитель {name} має {load} год/тиждень, але з урахуванням графіка доступно лише {available_slots} слотів")
-        elif load > MAX_WEEKLY_SLOTS:
-            name = teacher_names.get(t_id, t_id)
-            errors.append(f"• Вчитель {name} має {load} год/тиждень (абсолютний максимум {MAX_WEEKLY_SLOTS})")
-    
+        error = teacher_load_error(t.id, teacher_loads.get(t.id, 0), ctx)
+        if error:
+            errors.append(error)
+
     for c_id, load in class_loads.items():
-        if load > MAX_WEEKLY_SLOTS:
-            name = class_names.get(c_id, c_id)
-            errors.append(f"• Клас {name} має {load} уроків/тиждень (максимум {MAX_WEEKLY_SLOTS})")
-    
+        error = class_load_error(c_id, load, ctx)
+        if error:
+            errors.append(error)
+
     return errors
@@ -1,8 +1,13 @@
 import pulp
+import time
+from collections import defaultdict
 from typing import List, Dict, Any, Optional, Tuple
 from models import ScheduleRequest
+from logic.context import ProblemContext, build_context
+from logic.pins import pin_domains
 
-def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = True, timeout: int = 30) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = True, timeout: int = 30, ctx: Optional[ProblemContext] = None,
+                    stats: Optional[Dict[str, Any]] = None, export_path: Optional[str] = None) -> Tuple[Optional[List[Dict[str, Any]]], str]:
     """
     Solves the scheduling problem using the PuLP library (MIP).
     
@@ -11,42 +16,33 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
         periods: List of available periods (e.g., [1,2,3,4,5,6,7])
         strict: If True, enforces stricter constraints
         timeout: Maximum time in seconds for solver to run
+        ctx: Precomputed problem context (built from data if omitted)
+        stats: Filled with the model size, status, objective and solve time if given
+        export_path: Write the built problem there as MPS before solving
     """
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+    ctx = ctx or build_context(data)
+    days = ctx.days
     day_indices = range(5)
     
     # 1. Prepare Data
-    class_names = {c.id: c.name for c in data.classes}
-    teacher_availabilities = {t.id: t.availability or {} for t in data.teachers}
-    teacher_prefers_zero = {t.id: t.prefers_period_zero for t in data.teachers}
-    
-    requests = []
-    
-    def check_is_primary(name: str) -> bool:
-        import re
-        match = re.match(r'^(\d+)', name)
-        if match:
-            return int(match.group(1)) < 5
-        return False
-
-    for plan in data.plan:
-        if plan.hours_per_week > 0:
-            c_name = class_names.get(plan.class_id, "")
-            # Skip primary classes as per original logic if needed, 
-            # though usually we want to schedule everyone. 
-            # blindly following original engine.py logic:
-            if check_is_primary(c_name): continue
-            
-            requests.append({
-                "class_id": plan.class_id, 
-                "teacher_id": plan.teacher_id, 
-                "subject_id": plan.subject_id, 
-                "count": plan.hours_per_week
-            })
+    # Primary classes are skipped, as in engine.py (see ProblemContext.requests)
+    teacher_prefers_zero = ctx.teacher_prefers_zero
+    requests = ctx.requests
 
     if not requests:
         return [], "No lessons to schedule."
 
+    # Pinned lessons and forbidden slots shrink the domains (see logic/pins.py)
+    pins = pin_domains(ctx, periods)
+    if pins.dropped:
+        return None, "Помилка закріплених уроків:\n" + "\n".join(pins.dropped)
+    pinned_periods = defaultdict(int)  # (request index, day) -> pinned periods (bitmask)
+    for r_idx, d, p in pins.pinned:
+        pinned_periods[(r_idx, d)] |= 1 << p
+
+    def pinned_at(mask_by_day: Dict, owner: str, d: int, p: int) -> bool:
+        return bool(mask_by_day.get((owner, d), 0) >> p & 1)
+
     # 2. Define Problem
     prob = pulp.LpProblem("SchoolSchedule", pulp.LpMinimize)
 
@@ -58,12 +54,9 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     possible_slots = []
     for r_idx, req in enumerate(requests):
         for d in day_indices:
-            day_name = days[d]
-            teacher_unavailable = teacher_availabilities.get(req["teacher_id"], {}).get(day_name, [])
-            
             for p in periods:
-                # Hard Constraint: Availability
-                if p in teacher_unavailable:
+                # Hard Constraint: Availability (and pinned/forbidden slots)
+                if ctx.is_blocked(req.teacher_id, d, p) or not pins.is_open(r_idx, d, p):
                     continue
                 
                 x[(r_idx, d, p)] = pulp.LpVariable(f"x_{r_idx}_{d}_{p}", 0, 1, pulp.LpBinary)
@@ -73,13 +66,15 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
 
     # C1. Plan Fulfillment: Each request must be scheduled exactly 'count' times
     for r_idx, req in enumerate(requests):
-        prob += pulp.lpSum([x[(r_idx, d, p)] for d in day_indices for p in periods if (r_idx, d, p) in x]) == req["count"], f"Count_Req_{r_idx}"
+        slots = [x[(r_idx, d, p)] for d in day_indices for p in periods if (r_idx, d, p) in x]
+        if slots or pins.remaining[r_idx]:
+            prob += pulp.lpSum(slots) == pins.remaining[r_idx], f"Count_Req_{r_idx}"
 
     # C2. Teacher Conflict: A teacher can only teach 1 lesson at a time
-    teacher_ids = set(t.id for t in data.teachers)
+    teacher_ids = ctx.teacher_ids
     for t_id in teacher_ids:
         # Get all request indices for this teacher
-        t_req_indices = [i for i, r in enumerate(requests) if r["teacher_id"] == t_id]
+        t_req_indices = ctx.teacher_requests.get(t_id, ())
         if not t_req_indices: continue
         
         for d in day_indices:
@@ -90,9 +85,9 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
                     prob += pulp.lpSum(vars_in_slot) <= 1, f"Teacher_{t_id}_{d}_{p}"
 
     # C3. Class Conflict: A class can only have 1 lesson at a time
-    class_ids = set(c.id for c in data.classes)
+    class_ids = ctx.class_ids
     for c_id in class_ids:
-        c_req_indices = [i for i, r in enumerate(requests) if r["class_id"] == c_id]
+        c_req_indices = ctx.class_requests.get(c_id, ())
         if not c_req_indices: continue
         
         for d in day_indices:
@@ -109,7 +104,7 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     teacher_period_usage = {}
     
     for t_id in teacher_ids:
-        t_req_indices = [i for i, r in enumerate(requests) if r["teacher_id"] == t_id]
+        t_req_indices = ctx.teacher_requests.get(t_id, ())
         if not t_req_indices:
             continue
         
@@ -122,7 +117,9 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
                 # active = 1 if teacher has ANY lesson at this period
                 lessons_at_p = [x[(r_idx, d, p)] for r_idx in t_req_indices if (r_idx, d, p) in x]
                 
-                if lessons_at_p:
+                if pinned_at(pins.teacher_pinned, t_id, d, p):
+                    prob += active_var == 1, f"Active_{t_id}_{d}_{p}"
+                elif lessons_at_p:
                     prob += active_var >= pulp.lpSum(lessons_at_p), f"Active_{t_id}_{d}_{p}"
                     # Since we now enforce <= 1 lesson per teacher per slot, this max constraint is redundant but safe
                     # prob += active_var <= len(lessons_at_p) * pulp.lpSum(lessons_at_p), f"ActiveMax_{t_id}_{d}_{p}"
@@ -135,7 +132,7 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     for (r_idx, d, p), var in x.items():
         req = requests[r_idx]
         if p == 0:
-            if teacher_prefers_zero.get(req["teacher_id"], False):
+            if teacher_prefers_zero.get(req.teacher_id, False):
                 objective_terms.append(-10 * var)
             else:
                 objective_terms.append(1000 * var)
@@ -147,7 +144,7 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     main_periods = sorted([p for p in periods if p > 0])
     if main_periods:
         for c_id in class_ids:
-            c_req_indices = [i for i, r in enumerate(requests) if r["class_id"] == c_id]
+            c_req_indices = ctx.class_requests.get(c_id, ())
             if not c_req_indices: continue
             for d in day_indices:
                 day_active_vars = {}
@@ -155,7 +152,9 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
                     c_active_var = pulp.LpVariable(f"c_active_{c_id}_{d}_{p}", 0, 1, pulp.LpBinary)
                     day_active_vars[p] = c_active_var
                     lessons_at_p = [x[(r_idx, d, p)] for r_idx in c_req_indices if (r_idx, d, p) in x]
-                    if lessons_at_p:
+                    if pinned_at(pins.class_pinned, c_id, d, p):
+                         prob += c_active_var == 1, f"C_Active_{c_id}_{d}_{p}"
+                    elif lessons_at_p:
                          prob += c_active_var == pulp.lpSum(lessons_at_p), f"C_Active_{c_id}_{d}_{p}"
                     else:
                          prob += c_active_var == 0, f"C_Active_Zero_{c_id}_{d}_{p}"
@@ -181,7 +180,7 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     # GAP PENALTY for TEACHERS
     GAP_PENALTY = 300  
     for t_id in teacher_ids:
-        t_req_indices = [i for i, r in enumerate(requests) if r["teacher_id"] == t_id]
+        t_req_indices = ctx.teacher_requests.get(t_id, ())
         if not t_req_indices: continue
         for d in day_indices:
             for p in periods[:-2]:
@@ -195,9 +194,9 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     # TEACHER COMPACTNESS (METHODOLOGICAL DAYS SUPPORT)
     DAYS_OFF_BONUS = 500
     for t_id in teacher_ids:
-         t_req_indices = [i for i, r in enumerate(requests) if r["teacher_id"] == t_id]
+         t_req_indices = ctx.teacher_requests.get(t_id, ())
          if not t_req_indices: continue
-         total_load = sum(requests[r]["count"] for r in t_req_indices)
+         total_load = sum(requests[r].count for r in t_req_indices)
          if total_load < 30: 
              for d in day_indices:
                  day_used_var = pulp.LpVariable(f"t_day_used_{t_id}_{d}", 0, 1, pulp.LpBinary)
@@ -214,14 +213,13 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     # For each (subject, class) pair, penalize uneven distribution across weekdays
     DISTRIBUTION_PENALTY = 100
     
-    from collections import defaultdict
     subject_class_pairs = defaultdict(list)
     for r_idx, req in enumerate(requests):
-        subject_class_pairs[(req["subject_id"], req["class_id"])].append(r_idx)
+        subject_class_pairs[(req.subject_id, req.class_id)].append(r_idx)
     
     for (s_id, c_id), req_indices in subject_class_pairs.items():
         # Calculate total lessons for this subject+class
-        total_lessons = sum(requests[r]["count"] for r in req_indices)
+        total_lessons = sum(requests[r].count for r in req_indices)
         ideal_per_day = total_lessons / 5.0  # 5 days
         
         for d in day_indices:
@@ -229,7 +227,7 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
             day_count_var = pulp.LpVariable(f"daycount_{s_id}_{c_id}_{d}", 0, total_lessons, pulp.LpInteger)
             
             actual_on_day = pulp.lpSum([x[(r_idx, d, p)] for r_idx in req_indices 
-                                        for p in periods if (r_idx, d, p) in x])
+                                        for p in periods if (r_idx, d, p) in x]) + sum(bin(pinned_periods.get((r_idx, d), 0)).count("1") for r_idx in req_indices)
             
             prob += day_count_var == actual_on_day, f"DayCount_{s_id}_{c_id}_{d}"
             
@@ -249,7 +247,7 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     
     class_subject_reqs = defaultdict(lambda: defaultdict(list))
     for r_idx, req in enumerate(requests):
-        class_subject_reqs[req["class_id"]][req["subject_id"]].append(r_idx)
+        class_subject_reqs[req.class_id][req.subject_id].append(r_idx)
     
     for c_id, subjects_dict in class_subject_reqs.items():
         for s_id, req_indices in subjects_dict.items():
@@ -263,7 +261,8 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
                     consecutive_sum = pulp.lpSum([x[(r_idx, d, pp)] 
                                                  for r_idx in req_indices 
                                                  for pp in [p, p+1, p+2]
-                                                 if (r_idx, d, pp) in x])
+                                                 if (r_idx, d, pp) in x]) + sum(
+                        bin(pinned_periods.get((r_idx, d), 0) & (7 << p)).count("1") for r_idx in req_indices)
                     
                     # If sum >= 3, we have 3 consecutive (bad)
                     # Penalty = 200 * (consecutive_sum - 2) if > 2, else 0
@@ -276,7 +275,7 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     OVERLOAD_PENALTY = 300
     
     for c_id in class_ids:
-        c_req_indices = [i for i, r in enumerate(requests) if r["class_id"] == c_id]
+        c_req_indices = ctx.class_requests.get(c_id, ())
         if not c_req_indices:
             continue
         
@@ -284,7 +283,7 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
             daily_total = pulp.lpSum([x[(r_idx, d, p)] 
                                      for r_idx in c_req_indices 
                                      for p in periods 
-                                     if (r_idx, d, p) in x])
+                                     if (r_idx, d, p) in x]) + bin(pins.class_pinned.get((c_id, d), 0)).count("1")
             
             # Penalty if > 7 lessons
             overload = pulp.LpVariable(f"overload_{c_id}_{d}", 0)
@@ -297,11 +296,11 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     PREFERENCE_PENALTY = 50
     
     # Map subject names
-    subject_names = {s.id: s.name for s in data.subjects}
+    subject_names = ctx.subject_names
     HARD_SUBJECTS_KEYWORDS = ["Математика", "Фізика", "Хімія", "Біологія", "Алгебра", "Геометрія"]
     
     for r_idx, req in enumerate(requests):
-        s_name = subject_names.get(req["subject_id"], "")
+        s_name = subject_names.get(req.subject_id, "")
         is_hard_subject = any(keyword in s_name for keyword in HARD_SUBJECTS_KEYWORDS)
         
         if is_hard_subject:
@@ -331,21 +330,37 @@ def solve_with_pulp(data: ScheduleRequest, periods: List[int], strict: bool = Tr
     
     # Prefer CBC
     solver = pulp.PULP_CBC_CMD(timeLimit=timeout, msg=False)
+    if export_path:
+        prob.writeMPS(export_path)
+    started = time.perf_counter()
     prob.solve(solver)
 
     # 7. Extract Results
     status = pulp.LpStatus[prob.status]
     print(f"PuLP Solution Status: {status}")
+    if stats is not None:
+        stats.update({
+            "solver": "pulp-cbc",
+            "status": status,
+            "solution_status": pulp.LpSolution[prob.sol_status],
+            "variables": prob.numVariables(),
+            "constraints": prob.numConstraints(),
+            "lesson_vars": len(x),
+            "pinned_lessons": len(pins.pinned),
+            "objective": pulp.value(prob.objective) if status == "Optimal" else None,
+            "wall_time": round(time.perf_counter() - started, 3),
+            "time_limit": timeout,
+        })
 
     if status in ["Optimal", "Feasible"]:
-        res = []
+        res = pins.pinned_lessons(ctx)
         for (r_idx, d, p), var in x.items():
             if var.varValue and var.varValue > 0.5:
                 req = requests[r_idx]
                 res.append({
-                    "class_id": req["class_id"], 
-                    "subject_id": req["subject_id"], 
-                    "teacher_id": req["teacher_id"], 
+                    "class_id": req.class_id, 
+                    "subject_id": req.subject_id, 
+                    "teacher_id": req.teacher_id, 
                     "day": days[d], 
                     "period": p
                 })
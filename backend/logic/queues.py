@@ -0,0 +1,12 @@
+"""Helpers for the multiprocessing queues that carry progress and migrants between processes."""
+import queue
+
+
+def drain(target) -> list:
+    """Everything currently in a queue, without blocking."""
+    items = []
+    while True:
+        try:
+            items.append(target.get_nowait())
+        except queue.Empty:
+            return items
@@ -0,0 +1,205 @@
+"""
+Minimal-perturbation repair of an existing timetable after the plan or a teacher's availability
+changed: only a growing neighbourhood of the affected lessons is re-solved, and moving a kept
+lesson is penalized.
+"""
+import time
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+from ortools.sat.python import cp_model
+from models import ScheduleRequest
+from .context import ProblemContext, build_context, DAYS
+
+# Each attempt gets a short budget; the neighbourhood is widened when it is infeasible
+REPAIR_TIME_LIMIT = 2.0
+MAX_LEVEL = 3  # 0: conflict days, 1: whole week, 2: + neighbouring classes/teachers, 3: everything
+
+MOVE_PENALTY = 1000  # Per existing lesson moved away from its slot
+GAP_PENALTY = 10     # Per window in a class day touched by the repair
+
+
+def required_lessons(ctx: ProblemContext) -> Counter:
+    """(class_id, subject_id, teacher_id) -> weekly count of the lessons the solvers place."""
+    required = Counter()
+    for req in ctx.requests:
+        required[(req.class_id, req.subject_id, req.teacher_id)] += req.count
+    return required
+
+
+def split_current(ctx: ProblemContext, current: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Counter]:
+    """
+    Separates the current schedule into lessons that are still valid (kept) and
+    lessons the change invalidated (dropped), and counts lessons still missing.
+    A lesson is dropped if it is no longer in the plan, its teacher became unavailable,
+    or it collides with an earlier lesson of the same teacher/class.
+    """
+    remaining = required_lessons(ctx)
+    teacher_slots, class_slots = set(), set()
+    kept, dropped = [], []
+
+    for l in current:
+        key = (l["class_id"], l["subject_id"], l["teacher_id"])
+        t_slot = (l["teacher_id"], l["day"], l["period"])
+        c_slot = (l["class_id"], l["day"], l["period"])
+        valid = (
+            remaining[key] > 0
+            and l["day"] in ctx.day_index
+            and not ctx.is_blocked(l["teacher_id"], ctx.day_index[l["day"]], l["period"])
+            and t_slot not in teacher_slots
+            and c_slot not in class_slots
+        )
+        if valid:
+            remaining[key] -= 1
+            teacher_slots.add(t_slot)
+            class_slots.add(c_slot)
+            kept.append(l)
+        else:
+            dropped.append(l)
+
+    missing = +remaining  # Drops zero counts
+    return kept, dropped, missing
+
+
+def neighbourhood(level: int, kept: List[Dict[str, Any]], seed_classes: set, seed_teachers: set, seed_days: set) -> List[Dict[str, Any]]:
+    """Kept lessons that the repair at this level is allowed to move."""
+    if level >= 3:
+        return list(kept)
+
+    classes, teachers = set(seed_classes), set(seed_teachers)
+    days = seed_days if level == 0 and seed_days else set(DAYS)
+    if level == 2:
+        for l in kept:
+            if l["teacher_id"] in seed_teachers: classes.add(l["class_id"])
+            if l["class_id"] in seed_classes: teachers.add(l["teacher_id"])
+
+    return [l for l in kept if l["day"] in days and (l["class_id"] in classes or l["teacher_id"] in teachers)]
+
+
+def solve_neighbourhood(data: ScheduleRequest, ctx: ProblemContext, fixed: List[Dict[str, Any]], free: List[Dict[str, Any]],
+                        missing: Counter, periods: List[int], time_limit: float) -> Optional[List[Dict[str, Any]]]:
+    """
+    Places the free and missing lessons around the fixed ones, keeping as many
+    free lessons in their original slot as possible.
+    """
+    model = cp_model.CpModel()
+    teacher_fixed = {(l["teacher_id"], l["day"], l["period"]) for l in fixed}
+    class_fixed = {(l["class_id"], l["day"], l["period"]) for l in fixed}
+
+    to_place = Counter((l["class_id"], l["subject_id"], l["teacher_id"]) for l in free) + missing
+    origin = {((l["class_id"], l["subject_id"], l["teacher_id"]), l["day"], l["period"]) for l in free}
+
+    x = {}
+    teacher_vars, class_vars = defaultdict(list), defaultdict(list)
+    for key, count in to_place.items():
+        slots = []
+        c_id, _, t_id = key
+        for d, day in enumerate(DAYS):
+            for p in periods:
+                if ctx.is_blocked(t_id, d, p) or (t_id, day, p) in teacher_fixed or (c_id, day, p) in class_fixed:
+                    continue
+                var = model.NewBoolVar(f"r_{len(x)}")
+                x[(key, day, p)] = var
+                slots.append(var)
+                teacher_vars[(t_id, day, p)].append(var)
+                class_vars[(c_id, day, p)].append(var)
+        if len(slots) < count:
+            return None
+        model.Add(sum(slots) == count)
+
+    for group in list(teacher_vars.values()) + list(class_vars.values()):
+        if len(group) > 1:
+            model.AddAtMostOne(group)
+
+    in_place = [var for (key, day, p), var in x.items() if (key, day, p) in origin]
+    objective_terms = [-MOVE_PENALTY * sum(in_place)] if in_place else []
+
+    # Keep the class days touched by the repair compact
+    touched_days = {(c_id, day) for (c_id, day, _) in class_vars}
+    for c_id, day in touched_days:
+        busy = []
+        for p in periods:
+            if (c_id, day, p) in class_fixed:
+                busy.append((p, True))
+            elif (c_id, day, p) in class_vars:
+                b = model.NewBoolVar(f"cb_{c_id}_{day}_{p}")
+                model.Add(sum(class_vars[(c_id, day, p)]) == b)
+                busy.append((p, b))
+        start_p = model.NewIntVar(min(periods), max(periods), f"s_{c_id}_{day}")
+        end_p = model.NewIntVar(min(periods), max(periods), f"e_{c_id}_{day}")
+        has_fixed = any(b is True for _, b in busy)
+        has_lessons = model.NewBoolVar(f"h_{c_id}_{day}")
+        if has_fixed:
+            model.Add(has_lessons == 1)
+        else:
+            model.AddMaxEquality(has_lessons, [b for _, b in busy])
+        load = 0
+        for p, b in busy:
+            if b is True:
+                model.Add(start_p <= p)
+                model.Add(end_p >= p)
+                load += 1
+            else:
+                model.Add(start_p <= p).OnlyEnforceIf(b)
+                model.Add(end_p >= p).OnlyEnforceIf(b)
+                load += b
+        gaps = model.NewIntVar(0, len(periods), f"g_{c_id}_{day}")
+        model.Add(gaps >= (end_p - start_p + 1) - load).OnlyEnforceIf(has_lessons)
+        objective_terms.append(GAP_PENALTY * gaps)
+
+    if objective_terms:
+        model.Minimize(sum(objective_terms))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    if data.solver_workers: solver.parameters.num_workers = data.solver_workers
+    if solver.Solve(model) not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return None
+
+    placed = [
+        {"class_id": key[0], "subject_id": key[1], "teacher_id": key[2], "day": day, "period": p}
+        for (key, day, p), var in x.items() if solver.Value(var)
+    ]
+    return list(fixed) + placed
+
+
+def repair_schedule(data: ScheduleRequest, current: List[Dict[str, Any]], progress_callback=None, ctx: Optional[ProblemContext] = None) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Minimal-perturbation re-solve: keeps every lesson the change does not affect,
+    frees a neighbourhood around the invalidated/missing lessons and widens it
+    step by step until the repair is feasible.
+    """
+    started = time.perf_counter()
+    ctx = ctx or build_context(data)
+    kept, dropped, missing = split_current(ctx, current)
+    info = {"dropped": len(dropped), "missing": sum(missing.values()), "level": None, "freed": 0}
+
+    if not dropped and not missing:
+        info["elapsed"] = round(time.perf_counter() - started, 3)
+        return list(kept), info
+
+    seed_classes = {l["class_id"] for l in dropped} | {key[0] for key in missing}
+    seed_teachers = {l["teacher_id"] for l in dropped} | {key[2] for key in missing}
+    seed_days = {l["day"] for l in dropped if l["day"] in DAYS}
+    if missing:
+        seed_days = set(DAYS)  # New lessons may go to any day
+
+    used_periods = {l["period"] for l in current}
+    periods = sorted(set(range(1, 8)) | {p for p in used_periods if 0 <= p <= 8})
+
+    for level in range(MAX_LEVEL + 1):
+        free = neighbourhood(level, kept, seed_classes, seed_teachers, seed_days)
+        free_ids = {id(l) for l in free}
+        fixed = [l for l in kept if id(l) not in free_ids]
+        if progress_callback:
+            progress_callback(10 + level * 25, f"🔧 Ремонт розкладу: рівень {level}, звільнено {len(free)} уроків...")
+
+        time_limit = REPAIR_TIME_LIMIT if level < MAX_LEVEL else float(data.timeout or 30)
+        result = solve_neighbourhood(data, ctx, fixed, free, missing, periods, time_limit)
+        print(f"Repair level {level}: freed {len(free)}, fixed {len(fixed)} -> {'ok' if result else 'infeasible'}")
+        if result is not None:
+            info.update({"level": level, "freed": len(free)})
+            info["elapsed"] = round(time.perf_counter() - started, 3)
+            return result, info
+
+    info["elapsed"] = round(time.perf_counter() - started, 3)
+    return None, info
@@ -0,0 +1,108 @@
+"""
+Schedules as multisets of lesson keys: canonical hashes, deltas between two schedules (how versions
+are stored) and the moved/added/removed diff the API reports.
+"""
+import hashlib
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Tuple, Iterable
+
+LessonKey = Tuple[str, str, str, str, int]  # (class_id, subject_id, teacher_id, day, period)
+
+
+def lesson_key(lesson: Dict[str, Any]) -> LessonKey:
+    return (lesson["class_id"], lesson["subject_id"], lesson["teacher_id"], lesson["day"], lesson["period"])
+
+
+def key_to_lesson(key: LessonKey) -> Dict[str, Any]:
+    return {"class_id": key[0], "subject_id": key[1], "teacher_id": key[2], "day": key[3], "period": key[4]}
+
+
+def schedule_hash(schedule: Iterable[Dict[str, Any]]) -> str:
+    """Canonical fingerprint: equal for schedules with the same lessons, whatever their order."""
+    digest = hashlib.sha1()
+    for key in sorted(lesson_key(l) for l in schedule):
+        digest.update(repr(key).encode())
+    return digest.hexdigest()
+
+
+def index_schedule(schedule: Iterable[Dict[str, Any]]) -> Counter:
+    """Multiset of lesson keys. Insertion order is kept, so expanding it preserves the schedule order."""
+    return Counter(lesson_key(l) for l in schedule)
+
+
+def expand_index(index: Counter) -> List[Dict[str, Any]]:
+    return [key_to_lesson(key) for key, count in index.items() for _ in range(count)]
+
+
+def compute_delta(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Tuple[List[LessonKey], List[LessonKey]]:
+    """Lessons to add to / remove from `old` to obtain `new`. Linear in the size of both schedules."""
+    old_index, new_index = index_schedule(old), index_schedule(new)
+    added = list((new_index - old_index).elements())
+    removed = list((old_index - new_index).elements())
+    return added, removed
+
+
+def apply_delta(index: Counter, added: Iterable[LessonKey], removed: Iterable[LessonKey]) -> Counter:
+    """Applies a delta in place (used to rebuild a version from its snapshot)."""
+    for key in removed:
+        index[key] -= 1
+        if index[key] <= 0:
+            del index[key]
+    for key in added:
+        index[key] += 1
+    return index
+
+
+def diff_schedules(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Classifies the differences between two schedules:
+    - moved: the same (class, subject, teacher) lesson placed in another slot
+    - added / removed: lessons without a counterpart
+    Pairing is done per (class, subject, teacher) in a single pass, preferring moves within the same day.
+    """
+    added, removed = compute_delta(old, new)
+
+    # (class, subject, teacher) -> day -> removed lessons, so a same-day source is a dict lookup
+    removed_by_lesson = defaultdict(lambda: defaultdict(list))
+    for key in removed:
+        removed_by_lesson[key[:3]][key[3]].append(key)
+
+    moved = []
+    unmatched_added = []
+    for key in added:
+        by_day = removed_by_lesson.get(key[:3])
+        if not by_day:
+            unmatched_added.append(key)
+            continue
+        # Prefer a source slot on the same day (a period swap rather than a day change)
+        day = key[3] if key[3] in by_day else next(reversed(by_day))
+        source = by_day[day].pop()
+        if not by_day[day]:
+            del by_day[day]
+        moved.append({
+            "class_id": key[0], "subject_id": key[1], "teacher_id": key[2],
+            "from": {"day": source[3], "period": source[4]},
+            "to": {"day": key[3], "period": key[4]},
+        })
+    unmatched_removed = [key for by_day in removed_by_lesson.values() for keys in by_day.values() for key in keys]
+
+    by_class = defaultdict(lambda: {"added": 0, "removed": 0, "moved": 0})
+    by_teacher = defaultdict(lambda: {"added": 0, "removed": 0, "moved": 0})
+    for key in unmatched_added:
+        by_class[key[0]]["added"] += 1
+        by_teacher[key[2]]["added"] += 1
+    for key in unmatched_removed:
+        by_class[key[0]]["removed"] += 1
+        by_teacher[key[2]]["removed"] += 1
+    for m in moved:
+        by_class[m["class_id"]]["moved"] += 1
+        by_teacher[m["teacher_id"]]["moved"] += 1
+
+    return {
+        "moved": moved,
+        "added": [key_to_lesson(k) for k in unmatched_added],
+        "removed": [key_to_lesson(k) for k in unmatched_removed],
+        "by_class": dict(by_class),
+        "by_teacher": dict(by_teacher),
+        "unchanged": len(old) - len(removed),
+    }
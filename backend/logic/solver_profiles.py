@@ -0,0 +1,67 @@
+"""
+Tuned solver profiles: CP-SAT parameters and objective penalty weights per problem-size bucket,
+written by tune_solver.py (see logic/tuning.py) and picked by ortools_solve from the number of
+lessons to place. Without a profiles file, or for a bucket it lacks, the built-in defaults apply.
+
+    {"version": 1, "saved_at": ..., "buckets": {"medium": {"name": "full-lp",
+        "params": {"linearization_level": 2}, "penalties": {"gap": 2500}, "score": {...}}}}
+"""
+import json
+import os
+import time
+from typing import Dict, Any, Optional
+from .context import ProblemContext
+
+PROFILES_VERSION = 1
+SIZE_BUCKETS = [("small", 150), ("medium", 400), ("large", None)]  # (name, most lessons to place)
+
+_cache: Dict[str, Any] = {}  # path -> ((mtime, size), buckets); solver processes re-read the file only when it changes
+
+
+def profiles_path() -> str:
+    return os.environ.get("SCHEDULER_SOLVER_PROFILES", "solver_profiles.json")
+
+
+def problem_size(ctx: ProblemContext) -> int:
+    return sum(req.count for req in ctx.requests)
+
+
+def size_bucket(lesson_count: int) -> str:
+    return next(name for name, limit in SIZE_BUCKETS if limit is None or lesson_count <= limit)
+
+
+def load_profiles(path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Bucket name -> profile; empty if there is no (readable) profiles file."""
+    path = path or profiles_path()
+    try:
+        info = os.stat(path)
+    except OSError:
+        return {}
+    version = (info.st_mtime_ns, info.st_size)
+    cached = _cache.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != PROFILES_VERSION:
+            raise ValueError(f"unsupported version {state.get('version')}")
+        buckets = state.get("buckets") or {}
+    except (OSError, ValueError) as e:
+        # A broken profiles file must not break solving: fall back to the defaults
+        print(f"⚠️ Ignoring solver profiles {path}: {e}")
+        buckets = {}
+    _cache[path] = (version, buckets)
+    return buckets
+
+
+def solver_profile(ctx: ProblemContext) -> Dict[str, Any]:
+    """The tuned profile for the size bucket of `ctx`, or {} (defaults)."""
+    return load_profiles().get(size_bucket(problem_size(ctx)), {})
+
+
+def save_profiles(path: str, buckets: Dict[str, Dict[str, Any]]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": PROFILES_VERSION, "saved_at": time.time(), "buckets": buckets}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
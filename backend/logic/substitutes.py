@@ -0,0 +1,161 @@
+"""
+Substitute finder for absent teachers. The index answers "who can take this lesson" with bitmask
+lookups: subject -> qualified teachers, teacher -> busy periods per day (from the schedule) and
+blocked periods (from Teacher.availability). Optionally a tiny CP-SAT model assigns substitutes
+so that nobody is booked twice or takes more than MAX_SUBSTITUTIONS_PER_TEACHER lessons that day.
+"""
+import time
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from ortools.sat.python import cp_model
+from models import Teacher
+from .context import DAYS, availability_masks
+
+MAX_SUBSTITUTIONS_PER_TEACHER = 2
+ASSIGNMENT_TIME_LIMIT = 2.0
+
+QUALIFIED_SCORE = 100     # Teaches the subject: outweighs every other term, so qualified teachers always rank first
+KNOWS_CLASS_SCORE = 20    # Already teaches this class
+ADJACENT_SCORE = 10       # Has a lesson right before or after: no new window
+WINDOW_PENALTY = 15       # Has lessons that day, but not next to this one
+EXTRA_TRIP_PENALTY = 30   # Has no lessons that day at all
+LOAD_PENALTY = 2          # Per lesson already taught that day
+
+
+class SubstituteIndex:
+    """Free-slot index of one schedule."""
+
+    def __init__(self, teachers: Iterable[Teacher], lessons: List[Dict[str, Any]]):
+        self.names = {}
+        self.subjects = {}
+        self.blocked = {}
+        self.subject_teachers = defaultdict(list)
+        for t in teachers:
+            self.names[t.id] = t.name
+            self.subjects[t.id] = set(t.subjects)
+            self.blocked[t.id] = availability_masks(t.availability)
+            for s in t.subjects:
+                self.subject_teachers[s].append(t.id)
+
+        self.busy = defaultdict(int)   # (teacher_id, day index) -> bitmask of taught periods
+        self.day_load = Counter()      # (teacher_id, day index) -> lessons that day
+        self.teacher_classes = defaultdict(set)
+        for l in lessons:
+            if l["day"] not in DAYS: continue
+            key = (l["teacher_id"], DAYS.index(l["day"]))
+            self.busy[key] |= 1 << l["period"]
+            self.day_load[key] += 1
+            self.teacher_classes[l["teacher_id"]].add(l["class_id"])
+
+    def is_free(self, teacher_id: str, day: int, period: int) -> bool:
+        blocked = self.blocked.get(teacher_id, (0,) * len(DAYS))
+        return not ((self.busy[(teacher_id, day)] | blocked[day]) >> period & 1)
+
+    def score(self, teacher_id: str, lesson: Dict[str, Any], day: int) -> Tuple[int, List[str]]:
+        period = lesson["period"]
+        busy = self.busy[(teacher_id, day)]
+        score, reasons = 0, []
+        if lesson["subject_id"] in self.subjects.get(teacher_id, ()):
+            score += QUALIFIED_SCORE
+            reasons.append("веде цей предмет")
+        if lesson["class_id"] in self.teacher_classes[teacher_id]:
+            score += KNOWS_CLASS_SCORE
+            reasons.append("вже працює з класом")
+        if busy & (1 << (period + 1) | (1 << (period - 1) if period > 0 else 0)):
+            score += ADJACENT_SCORE
+            reasons.append("без вікна")
+        elif busy:
+            score -= WINDOW_PENALTY
+            reasons.append("з'явиться вікно")
+        else:
+            score -= EXTRA_TRIP_PENALTY
+            reasons.append("немає уроків у цей день")
+        score -= LOAD_PENALTY * self.day_load[(teacher_id, day)]
+        return score, reasons
+
+    def ranked(self, teacher_ids: Iterable[str], lesson: Dict[str, Any], day: int, absent: set) -> List[Dict[str, Any]]:
+        found = []
+        for teacher_id in teacher_ids:
+            if teacher_id in absent or not self.is_free(teacher_id, day, lesson["period"]):
+                continue
+            score, reasons = self.score(teacher_id, lesson, day)
+            found.append({
+                "teacher_id": teacher_id,
+                "name": self.names[teacher_id],
+                "qualified": lesson["subject_id"] in self.subjects[teacher_id],
+                "score": score,
+                "reasons": reasons,
+            })
+        found.sort(key=lambda c: (-c["score"], c["name"]))
+        return found
+
+    def candidates(self, lesson: Dict[str, Any], day: int, absent: set, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Teachers free in the lesson's slot, best first (at most `limit`). The subject's teachers come
+        from the index and rank above everyone else, so the others are only scanned if too few are free.
+        """
+        qualified = self.subject_teachers.get(lesson["subject_id"], [])
+        found = self.ranked(qualified, lesson, day, absent)
+        if limit is None or len(found) < limit:
+            qualified_ids = set(qualified)
+            found += self.ranked((t for t in self.names if t not in qualified_ids), lesson, day, absent)
+        return found[:limit] if limit is not None else found
+
+
+def assign_substitutes(lessons: List[Dict[str, Any]], candidates: List[List[Dict[str, Any]]]) -> List[Optional[str]]:
+    """
+    One substitute per lesson (where possible) maximizing the total score, with no teacher in two
+    places at once and at most MAX_SUBSTITUTIONS_PER_TEACHER substitutions each.
+    """
+    model = cp_model.CpModel()
+    y = {}
+    by_slot, by_teacher = defaultdict(list), defaultdict(list)
+    objective = []
+    for i, (lesson, options) in enumerate(zip(lessons, candidates)):
+        for c in options:
+            var = model.NewBoolVar(f'y_{i}_{c["teacher_id"]}')
+            y[(i, c["teacher_id"])] = var
+            by_slot[(c["teacher_id"], lesson["period"])].append(var)
+            by_teacher[c["teacher_id"]].append(var)
+            objective.append(var * (1000 + c["score"]))  # Covering a lesson beats any ranking difference
+        model.AddAtMostOne(y[(i, c["teacher_id"])] for c in options)
+    for group in by_slot.values():
+        model.AddAtMostOne(group)
+    for group in by_teacher.values():
+        model.Add(sum(group) <= MAX_SUBSTITUTIONS_PER_TEACHER)
+    model.Maximize(sum(objective))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = ASSIGNMENT_TIME_LIMIT
+    if solver.Solve(model) not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return [None] * len(lessons)
+    assigned = [None] * len(lessons)
+    for (i, teacher_id), var in y.items():
+        if solver.Value(var):
+            assigned[i] = teacher_id
+    return assigned
+
+
+def find_substitutes(teachers: Iterable[Teacher], lessons: List[Dict[str, Any]], absent_ids: List[str], day: str,
+                     limit: int = 5, assign: bool = False) -> Dict[str, Any]:
+    """Ranked substitutes for every lesson the absent teachers have on `day` (and an assignment if asked)."""
+    started = time.perf_counter()
+    day_idx = DAYS.index(day)
+    absent = set(absent_ids)
+    index = SubstituteIndex(teachers, lessons)
+
+    uncovered = sorted((l for l in lessons if l["teacher_id"] in absent and l["day"] == day), key=lambda l: (l["period"], l["class_id"]))
+    # The assignment model picks from every free teacher; a ranking only needs the top `limit`
+    candidates = [index.candidates(l, day_idx, absent, limit=None if assign else limit) for l in uncovered]
+    result = {
+        "day": day,
+        "teacher_ids": list(absent_ids),
+        "lessons": [{"lesson": l, "substitutes": options[:limit]} for l, options in zip(uncovered, candidates)],
+    }
+    if assign:
+        result["assignment"] = [
+            {"lesson": l, "teacher_id": teacher_id, "name": index.names.get(teacher_id) if teacher_id else None}
+            for l, teacher_id in zip(uncovered, assign_substitutes(uncovered, candidates))
+        ]
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
@@ -0,0 +1,112 @@
+"""
+Solver parameter tuning over an instance corpus (driven by tune_solver.py). Every candidate
+(CP-SAT parameters and/or penalty weights) solves every instance the way the OR-Tools cascade
+does: strict pass first, the diagnostic pass if it fails. Results are scored with the default
+penalty weights, so candidates that rescale the penalties are compared on one scale. Per size
+bucket the candidate solving the most instances wins, then the lowest mean cost, then the
+lowest mean time.
+"""
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from models import ScheduleRequest
+from .context import build_context
+from .engine import ortools_solve, DEFAULT_PENALTIES
+from .greedy import greedy_solve, window_count
+from .solver_profiles import problem_size, size_bucket
+
+CANDIDATES = [
+    {"name": "default"},
+    {"name": "fixed-search", "params": {"search_branching": "FIXED_SEARCH"}},
+    {"name": "quick-restart", "params": {"search_branching": "PORTFOLIO_WITH_QUICK_RESTART_SEARCH"}},
+    {"name": "no-lp", "params": {"linearization_level": 0}},
+    {"name": "full-lp", "params": {"linearization_level": 2}},
+    {"name": "no-lns", "params": {"use_lns": False}},
+    {"name": "lns-only", "params": {"use_lns_only": True}},
+    # Penalty scaling: windows vs late starts vs period 0 (see DEFAULT_PENALTIES)
+    {"name": "gaps-x0.5", "penalties": {"gap": DEFAULT_PENALTIES["gap"] // 2}},
+    {"name": "gaps-x2", "penalties": {"gap": DEFAULT_PENALTIES["gap"] * 2}},
+    {"name": "late-start-x3", "penalties": {"late_start": DEFAULT_PENALTIES["late_start"] * 3}},
+]
+
+STRICT_PERIODS = list(range(1, 8))
+
+
+def candidate_grid(candidates: List[Dict[str, Any]], workers: List[Optional[int]]) -> List[Dict[str, Any]]:
+    """Every candidate once per worker count (None keeps the solver default)."""
+    grid = []
+    for candidate in candidates:
+        for w in workers:
+            if w is None:
+                grid.append(candidate)
+            else:
+                grid.append({**candidate, "name": f"{candidate['name']}@{w}w", "params": {**candidate.get("params", {}), "num_workers": w}})
+    return grid
+
+
+def schedule_cost(schedule: List[Dict[str, Any]]) -> int:
+    """Windows, late starts and period-0 lessons priced with DEFAULT_PENALTIES (independent of the candidate's weights)."""
+    class_days = defaultdict(int)
+    for l in schedule:
+        class_days[(l["class_id"], l["day"])] |= 1 << l["period"]
+    cost = 0
+    for mask in class_days.values():
+        taught = mask >> 1 << 1  # Period 0 is priced separately
+        cost += DEFAULT_PENALTIES["gap"] * window_count(taught)
+        if taught: cost += DEFAULT_PENALTIES["late_start"] * ((taught & -taught).bit_length() - 2)
+        if mask & 1: cost += DEFAULT_PENALTIES["period_zero"]
+    return cost
+
+
+def evaluate(data: ScheduleRequest, candidate: Dict[str, Any], time_limit: float) -> Dict[str, Any]:
+    """Strict, then diagnostic pass with the candidate profile (module level, so it can run in a child process)."""
+    ctx = build_context(data)
+    hint, _ = greedy_solve(data, STRICT_PERIODS, ctx=ctx)
+    started = time.perf_counter()
+    for pass_name, strict in (("strict", True), ("diagnostic", False)):
+        schedule, _ = ortools_solve(data, STRICT_PERIODS, strict=strict, ctx=ctx, hint=hint, time_limit=time_limit, profile=candidate)
+        if schedule:
+            return {"solved": True, "pass": pass_name, "cost": schedule_cost(schedule), "wall_time": round(time.perf_counter() - started, 3)}
+    return {"solved": False, "pass": None, "cost": None, "wall_time": round(time.perf_counter() - started, 3)}
+
+
+def tune(instances: List[Tuple[str, ScheduleRequest]], candidates: List[Dict[str, Any]], time_limit: float,
+         runner: Optional[Callable] = None, on_run: Optional[Callable] = None) -> List[Dict[str, Any]]:
+    """
+    One run record per (instance, candidate). `runner(fn, *args)` executes evaluate (e.g. in a
+    child process) and returns None if it crashed; `on_run(record)` reports progress.
+    """
+    runner = runner or (lambda fn, *args: fn(*args))
+    runs = []
+    for label, data in instances:
+        size = problem_size(build_context(data))
+        for candidate in candidates:
+            result = runner(evaluate, data, candidate, time_limit) or {"solved": False, "pass": None, "cost": None, "wall_time": None, "crashed": True}
+            record = {"instance": label, "lessons": size, "bucket": size_bucket(size), "candidate": candidate["name"], **result}
+            runs.append(record)
+            if on_run: on_run(record)
+    return runs
+
+
+def select_profiles(runs: List[Dict[str, Any]], candidates: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """The best candidate per size bucket, as a profile with its score."""
+    by_name = {c["name"]: c for c in candidates}
+    grouped = defaultdict(lambda: defaultdict(list))
+    for run in runs:
+        grouped[run["bucket"]][run["candidate"]].append(run)
+
+    profiles = {}
+    for bucket, per_candidate in grouped.items():
+        scores = {}
+        for name, bucket_runs in per_candidate.items():
+            solved = [r for r in bucket_runs if r["solved"]]
+            scores[name] = {
+                "instances": len(bucket_runs),
+                "solved": len(solved),
+                "mean_cost": round(sum(r["cost"] for r in solved) / len(solved), 1) if solved else None,
+                "mean_time": round(sum(r["wall_time"] for r in solved) / len(solved), 3) if solved else None,
+            }
+        best = min(scores, key=lambda n: (-scores[n]["solved"], scores[n]["mean_cost"] or 0, scores[n]["mean_time"] or 0))
+        candidate = by_name[best]
+        profiles[bucket] = {"name": best, "params": candidate.get("params", {}), "penalties": candidate.get("penalties", {}), "score": scores[best]}
+    return profiles
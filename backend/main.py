@@ -1,19 +1,36 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-from typing import List
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from typing import List, Optional
 import json
 import asyncio
+import time
 
-from models import ScheduleRequest
-from solver import generate_schedule
-from database import SessionLocal, engine, Base, SubjectDB, TeacherDB, ClassGroupDB, ScheduleDB
+from models import ScheduleRequest, BatchScheduleRequest, PlanData, ScheduleSaveRequest, ScheduleVersionRequest, ResumeRequest, SubstituteRequest, Teacher, EditMoveRequest, EditSaveRequest, PlanEditRequest
+from solver import generate_schedule, resume_from_checkpoint
+from logic.checkpoint import checkpoint_path, load_checkpoint, checkpoint_summary
+from logic.schedule_diff import diff_schedules
+from logic.substitutes import find_substitutes
+from logic.edit_session import EditSession, EditSessionStore
+from logic.plan_session import PlanSession
+from logic.feasibility import check_feasibility, FEASIBILITY_TIME_LIMIT, MAX_FEASIBILITY_TIME_LIMIT
+from logic.context import DAYS
+from logic.admission import admit
+from batch import batch_pool_size, prepare_batch, run_batch_job, summarize_batch
+from database import init_db, call_with_session
+from executors import run_solver, run_large_job, run_probe, run_db, run_file, solver_pool_size, progress_queue, QueueProgress, drain, shutdown_executors
+import crud
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables (and migrate older databases)
+init_db()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    shutdown_executors()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,78 +40,312 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def db_call(fn, *args, **kwargs):
+    """Runs a crud function with its own session on the database thread pool."""
+    return await run_db(call_with_session, fn, *args, **kwargs)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "School Scheduler API is running"}
 
+def solver_lane(request: ScheduleRequest):
+    """run_large_job for requests with a large estimated model (milliseconds, nothing is built), run_solver otherwise."""
+    return run_large_job if admit(request)["decision"] == "large" else run_solver
+
+@app.post("/api/estimate")
+async def estimate(request: ScheduleRequest):
+    """Estimated model size and the admission decision /api/generate would make."""
+    return admit(request)
+
 @app.post("/api/generate")
-def generate(request: ScheduleRequest, db: Session = Depends(get_db)):
-    result = generate_schedule(request)
+async def generate(request: ScheduleRequest):
+    result = await solver_lane(request)(generate_schedule, request)
+    if result.get("solver_stats"):
+        # Failed runs are kept too: they are the ones outgrowing the time limits
+        await db_call(crud.save_solve_stats, result["solver_stats"], result["status"], request.strategy or "ortools",
+                      school_id=request.school_id, lesson_count=sum(p.hours_per_week for p in request.plan))
     if result["status"] == "error":
         raise HTTPException(status_code=400, detail=result["message"])
+    if request.save_result:
+        result["schedule_id"] = await db_call(crud.save_schedule, result["schedule"], school_id=request.school_id)
+    return result
+
+@app.post("/api/feasibility")
+async def feasibility(request: ScheduleRequest, time_limit: float = Query(FEASIBILITY_TIME_LIMIT, gt=0, le=MAX_FEASIBILITY_TIME_LIMIT)):
+    """Is the plan schedulable at all? Capacity checks plus a first-solution CP-SAT probe within `time_limit` seconds."""
+    return await run_probe(check_feasibility, request, time_limit=time_limit)
+
+def read_checkpoint_summary(checkpoint_id: str):
+    state = load_checkpoint(checkpoint_path(checkpoint_id))
+    return checkpoint_summary(state) if state is not None else None
+
+@app.get("/api/checkpoints/{checkpoint_id}")
+async def get_checkpoint(checkpoint_id: str):
+    try:
+        summary = await run_file(read_checkpoint_summary, checkpoint_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    return summary
+
+@app.post("/api/checkpoints/{checkpoint_id}/resume")
+async def resume_checkpoint(checkpoint_id: str, request: ResumeRequest):
+    result = await run_solver(
+        resume_from_checkpoint, checkpoint_id,
+        time_budget=request.genetic_time_budget, generations=request.genetic_generations, stagnation_limit=request.genetic_stagnation_limit
+    )
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    if request.save_result:
+        result["schedule_id"] = await db_call(crud.save_schedule, result["schedule"])
     return result
 
 @app.post("/api/generate-stream")
 async def generate_stream(request: ScheduleRequest):
-    # Capture the running loop to use in callbacks from other threads
-    main_loop = asyncio.get_running_loop()
+    async def event_generator():
+        # The solver runs in another process: progress comes back through a manager queue
+        progress = progress_queue()
+        solver_task = asyncio.ensure_future(solver_lane(request)(generate_schedule, request, QueueProgress(progress)))
+
+        while not solver_task.done():
+            await asyncio.wait([solver_task], timeout=0.2)
+            for value, message in drain(progress):
+                yield f"data: {json.dumps({'type': 'progress', 'progress': value, 'message': message})}\n\n"
+
+        try:
+            result = solver_task.result()
+            item = {"type": "result", "data": result}
+        except Exception as e:
+            import traceback
+            print(f"❌ Solver Error: {str(e)}")
+            traceback.print_exc()
+            item = {"type": "error", "message": str(e)}
+        yield f"data: {json.dumps(item)}\n\n"
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+@app.post("/api/generate-batch")
+async def generate_batch(batch: BatchScheduleRequest):
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+
+    pool_size = batch_pool_size(len(batch.requests), batch.max_workers or solver_pool_size())
+    jobs = prepare_batch(batch.requests, pool_size)
 
     async def event_generator():
-        queue = asyncio.Queue()
-
-        def progress_callback(progress, message):
-            # Put progress data into the queue from a synchronous context
-            # Use the captured main_loop to call safely from the solver thread
-            main_loop.call_soon_threadsafe(queue.put_nowait, {"type": "progress", "progress": progress, "message": message})
-
-        # Run generation in a separate thread to not block the event loop
-        async def run_solver():
-            try:
-                # Use run_in_executor for blocking CPU bound task
-                result = await main_loop.run_in_executor(None, generate_schedule, request, progress_callback)
-                await queue.put({"type": "result", "data": result})
-            except Exception as e:
-                import traceback
-                print(f"❌ Solver Error: {str(e)}")
-                traceback.print_exc()
-                await queue.put({"type": "error", "message": str(e)})
-
-        solver_task = asyncio.create_task(run_solver())
-
-        while True:
-            item = await queue.get()
-            yield f"data: {json.dumps(item)}\n\n"
-            if item["type"] in ["result", "error"]:
-                break
-        
-        await solver_task
+        started = time.perf_counter()
+        completed = []
+        # Bounds how many schools of this batch occupy the shared solver pool at once
+        slots = asyncio.Semaphore(pool_size)
+
+        async def run_job(index, req):
+            async with slots:
+                return await run_solver(run_batch_job, index, req)
+
+        tasks = [asyncio.ensure_future(run_job(i, req)) for i, req in enumerate(jobs)]
+        try:
+            for future in asyncio.as_completed(tasks):
+                job = await future
+                completed.append(job)
+                yield f"data: {json.dumps({'type': 'school', 'completed': len(completed), 'total': len(jobs), 'data': job})}\n\n"
+
+            summary = summarize_batch(completed, time.perf_counter() - started)
+            yield f"data: {json.dumps({'type': 'summary', 'data': summary})}\n\n"
+        finally:
+            # Client may disconnect mid-batch: schools still waiting for a slot are not submitted
+            for task in tasks:
+                task.cancel()
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 @app.get("/api/data")
-def get_all_data(db: Session = Depends(get_db)):
-    subjects = db.query(SubjectDB).all()
-    teachers = db.query(TeacherDB).all()
-    classes = db.query(ClassGroupDB).all()
+async def get_all_data():
+    return await db_call(crud.load_plan)
+
+@app.put("/api/plan")
+async def save_plan(data: PlanData):
+    saved = await db_call(
+        crud.save_plan,
+        subjects=[s.model_dump() for s in data.subjects],
+        teachers=[t.model_dump() for t in data.teachers],
+        classes=[c.model_dump() for c in data.classes],
+        plan=[p.model_dump() for p in data.plan],
+    )
+    return {"status": "ok", "saved": saved}
+
+@app.post("/api/schedules")
+async def save_schedule(data: ScheduleSaveRequest):
+    schedule_id = await db_call(crud.save_schedule, [l.model_dump() for l in data.lessons], name=data.name, school_id=data.school_id)
+    return {"id": schedule_id}
+
+def list_schedules_with_lessons(db, school_id, limit, with_lessons):
+    schedules = crud.list_schedules(db, school_id=school_id, limit=limit)
+    if with_lessons:
+        lessons = crud.load_schedules(db, [s["id"] for s in schedules])
+        for s in schedules:
+            s["lessons"] = lessons[s["id"]]
+    return schedules
+
+@app.get("/api/schedules")
+async def list_schedules(
+    school_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    with_lessons: bool = False,
+):
+    return await db_call(list_schedules_with_lessons, school_id, limit, with_lessons)
+
+@app.get("/api/solve-stats")
+async def list_solve_stats(school_id: Optional[str] = None, limit: int = Query(100, ge=1, le=1000)):
+    """Model size and search statistics of earlier /api/generate runs, newest first."""
+    return await db_call(crud.list_solve_stats, school_id=school_id, limit=limit)
+
+@app.get("/api/schedules/{schedule_id}")
+async def get_schedule(schedule_id: int):
+    schedule = await db_call(crud.load_schedule, schedule_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedule
+
+@app.post("/api/schedules/{schedule_id}/versions")
+async def add_schedule_version(schedule_id: int, data: ScheduleVersionRequest):
+    version = await db_call(crud.add_schedule_version, schedule_id, [l.model_dump() for l in data.lessons], label=data.label)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return version
+
+@app.get("/api/schedules/{schedule_id}/versions")
+async def list_schedule_versions(schedule_id: int):
+    return await db_call(crud.list_versions, schedule_id)
+
+@app.get("/api/schedules/{schedule_id}/versions/{version}")
+async def get_schedule_version(schedule_id: int, version: int):
+    lessons = await db_call(crud.load_versions, schedule_id, [version])
+    if lessons is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return {"schedule_id": schedule_id, "version": version, "lessons": lessons[version]}
+
+@app.get("/api/schedules/{schedule_id}/diff")
+async def diff_schedule_versions(schedule_id: int, from_version: int, to_version: int):
+    lessons = await db_call(crud.load_versions, schedule_id, [from_version, to_version])
+    if lessons is None:
+        raise HTTPException(status_code=404, detail="Version not found")
     return {
-        "subjects": subjects,
-        "teachers": teachers,
-        "classes": classes
+        "schedule_id": schedule_id,
+        "from_version": from_version,
+        "to_version": to_version,
+        **diff_schedules(lessons[from_version], lessons[to_version]),
     }
 
+@app.post("/api/schedules/{schedule_id}/substitutes")
+async def schedule_substitutes(schedule_id: int, request: SubstituteRequest):
+    if request.day not in DAYS:
+        raise HTTPException(status_code=400, detail=f"Unknown day: {request.day}")
+    schedule = await db_call(crud.load_schedule, schedule_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    plan = await db_call(crud.load_plan)
+    teachers = [Teacher(**t) for t in plan["teachers"]]
+    args = (teachers, schedule["lessons"], request.teacher_ids, request.day)
+    if request.assign:
+        result = await run_solver(find_substitutes, *args, limit=request.limit, assign=True)
+    else:
+        # The ranking takes milliseconds: only the assignment model goes to the solver pool
+        result = find_substitutes(*args, limit=request.limit)
+    return {"schedule_id": schedule_id, **result}
+
+# Manual edits: sessions live in this process, and checks/moves are cheap enough to run inline
+edit_sessions = EditSessionStore()
+
+def get_edit_session(session_id: str) -> EditSession:
+    session = edit_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Edit session not found")
+    return session
+
+@app.post("/api/schedules/{schedule_id}/edit-sessions")
+async def create_edit_session(schedule_id: int):
+    schedule = await db_call(crud.load_schedule, schedule_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    plan = await db_call(crud.load_plan)
+    session = EditSession(schedule_id, schedule["lessons"], ScheduleRequest(**plan))
+    return {"session_id": edit_sessions.add(session), **session.summary(with_lessons=True)}
+
+@app.get("/api/edit-sessions/{session_id}")
+async def get_edit_session_state(session_id: str, with_lessons: bool = False):
+    return get_edit_session(session_id).summary(with_lessons=with_lessons)
+
+def edit_move(session_id: str, move: EditMoveRequest, apply: bool):
+    session = get_edit_session(session_id)
+    try:
+        return session.edit(move.lesson_id, move.day, move.period, swap_with=move.swap_with, apply=apply)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/edit-sessions/{session_id}/check")
+async def check_edit_move(session_id: str, move: EditMoveRequest):
+    return edit_move(session_id, move, apply=False)
+
+@app.post("/api/edit-sessions/{session_id}/apply")
+async def apply_edit_move(session_id: str, move: EditMoveRequest):
+    return edit_move(session_id, move, apply=True)
+
+@app.post("/api/edit-sessions/{session_id}/save")
+async def save_edit_session(session_id: str, data: EditSaveRequest):
+    session = get_edit_session(session_id)
+    version = await db_call(crud.add_schedule_version, session.schedule_id, session.schedule(), label=data.label)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return version
+
+@app.delete("/api/edit-sessions/{session_id}")
+async def delete_edit_session(session_id: str):
+    if not edit_sessions.remove(session_id):
+        raise HTTPException(status_code=404, detail="Edit session not found")
+    return {"deleted": session_id}
+
+# Live plan validation: like edit sessions, kept in this process and updated inline
+plan_sessions = EditSessionStore()
+
+def get_plan_session(session_id: str) -> PlanSession:
+    session = plan_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Plan session not found")
+    return session
+
+@app.post("/api/plan-sessions")
+async def create_plan_session(data: Optional[PlanData] = None):
+    """Starts validating the posted plan, or the stored one if no body is given."""
+    plan = data.model_dump() if data is not None else await db_call(crud.load_plan)
+    session = PlanSession(ScheduleRequest(**plan))
+    return {"session_id": plan_sessions.add(session), **session.summary(with_rows=True)}
+
+@app.get("/api/plan-sessions/{session_id}")
+async def get_plan_session_state(session_id: str, with_rows: bool = False):
+    return get_plan_session(session_id).summary(with_rows=with_rows)
+
+@app.post("/api/plan-sessions/{session_id}/edits")
+async def edit_plan_session(session_id: str, data: PlanEditRequest):
+    session = get_plan_session(session_id)
+    if any(c.row_id is None and c.item is None for c in data.changes):
+        raise HTTPException(status_code=400, detail="A change needs a row_id, an item or both")
+    try:
+        return session.edit([(c.row_id, c.item) for c in data.changes])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/api/plan-sessions/{session_id}")
+async def delete_plan_session(session_id: str):
+    if not plan_sessions.remove(session_id):
+        raise HTTPException(status_code=404, detail="Plan session not found")
+    return {"deleted": session_id}
+
 # Health check for DB
 @app.get("/api/health")
-def health_check(db: Session = Depends(get_db)):
+async def health_check():
     try:
-        db.execute("SELECT 1")
+        await db_call(crud.ping)
         return {"status": "ok", "database": "connected"}
     except Exception as e:
         return {"status": "error", "database": str(e)}
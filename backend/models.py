@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 class Subject(BaseModel):
     id: str
@@ -27,13 +27,88 @@ class TeachingPlanItem(BaseModel):
     teacher_id: str
     hours_per_week: int
 
+class Lesson(BaseModel):
+    class_id: str
+    subject_id: str
+    teacher_id: str
+    day: str  # "Mon".."Fri"
+    period: int
+
+class ForbiddenSlot(BaseModel):
+    # Lessons matching every given id may not be placed in this slot
+    class_id: Optional[str] = None
+    subject_id: Optional[str] = None
+    teacher_id: Optional[str] = None
+    day: Literal["Mon", "Tue", "Wed", "Thu", "Fri"]
+    period: Optional[int] = Field(None, ge=0, le=8)  # None = the whole day
+
+class PlanData(BaseModel):
+    teachers: List[Teacher]
+    subjects: List[Subject]
+    classes: List[ClassGroup]
+    plan: List[TeachingPlanItem]
+
+class ScheduleSaveRequest(BaseModel):
+    lessons: List[Lesson]
+    name: Optional[str] = None
+    school_id: Optional[str] = None
+
+class ScheduleVersionRequest(BaseModel):
+    lessons: List[Lesson]
+    label: Optional[str] = None
+
 class ScheduleRequest(BaseModel):
     teachers: List[Teacher]
     subjects: List[Subject]
     classes: List[ClassGroup]
     plan: List[TeachingPlanItem]
-    strategy: Optional[str] = "ortools" # "ortools" or "pulp" or "genetic"
+    strategy: Optional[str] = "ortools" # "ortools", "pulp", "genetic", "decomposition", "greedy" or "local_search"
     timeout: Optional[int] = 30
     genetic_population_size: Optional[int] = 8
     genetic_generations: Optional[int] = 3
     genetic_mutation_rate: Optional[float] = 0.4
+    genetic_time_budget: Optional[float] = None # Seconds; with a budget, generations only cap the run if given explicitly
+    genetic_stagnation_limit: Optional[int] = None # Stop an island after this many evaluations without improvement
+    school_id: Optional[str] = None # Identifies the school in batch runs
+    solver_workers: Optional[int] = None # CP-SAT search workers (None = solver default)
+    save_result: Optional[bool] = False # Persist the generated schedule and return its id
+    mode: Optional[str] = "full" # "full" or "repair" (minimal changes to current_schedule)
+    current_schedule: Optional[List[Lesson]] = None
+    num_alternatives: Optional[int] = Field(None, ge=1, le=10) # Return up to this many distinct timetables (ortools and genetic strategies)
+    checkpoint_id: Optional[str] = None # Genetic runs: checkpoint to this id periodically, so the run can be resumed
+    pinned_lessons: Optional[List[Lesson]] = None # Kept exactly in place (ortools and pulp strategies)
+    forbidden_slots: Optional[List[ForbiddenSlot]] = None # Slots the matching lessons must avoid (ortools and pulp strategies)
+    time_budget: Optional[float] = None # Seconds for the OR-Tools cascade with its alternatives, or for decomposition: stages are shortened or skipped to fit
+    export_bundle: Optional[str] = None # Bundle id: write the built models and this request for offline replay (ortools and pulp strategies)
+
+class ResumeRequest(BaseModel):
+    genetic_time_budget: Optional[float] = None # Overrides for the resumed session
+    genetic_generations: Optional[int] = None
+    genetic_stagnation_limit: Optional[int] = None
+    save_result: Optional[bool] = False
+
+class SubstituteRequest(BaseModel):
+    teacher_ids: List[str]  # Absent teachers
+    day: str  # "Mon".."Fri"
+    limit: Optional[int] = 5 # Ranked substitutes returned per lesson
+    assign: Optional[bool] = False # Also pick one substitute per lesson (no double bookings)
+
+class EditMoveRequest(BaseModel):
+    lesson_id: int  # Position of the lesson in the edit session
+    day: Optional[str] = None # Target slot of a move
+    period: Optional[int] = None
+    swap_with: Optional[int] = None # Swap with this lesson instead of moving
+
+class EditSaveRequest(BaseModel):
+    label: Optional[str] = None
+
+class PlanRowChange(BaseModel):
+    row_id: Optional[int] = None # None adds a row
+    item: Optional[TeachingPlanItem] = None # None deletes the row
+
+class PlanEditRequest(BaseModel):
+    changes: List[PlanRowChange]
+
+class BatchScheduleRequest(BaseModel):
+    requests: List[ScheduleRequest]
+    max_workers: Optional[int] = None # Process pool size (None = all cores; capped at SCHEDULER_BATCH_MAX_WORKERS)
@@ -0,0 +1,95 @@
+"""
+Replays a model export bundle (a request sent with "export_bundle": "<id>") offline, under
+other solver parameters, and reports timings next to the ones recorded in production:
+
+    python replay_bundle.py school-42 --workers 1 8 --seeds 0 1 2 --time-limit 30
+    python replay_bundle.py bundles/school-42 --pass strict --param linearization_level=2
+    python replay_bundle.py school-42 --full --output replay.json
+
+Every combination of --workers and --seeds is solved for every exported model. --full also
+re-runs the whole request through generate_schedule (all passes, analysis included). Each
+solve runs in a child process, so a solver abort is reported as CRASHED instead of ending the sweep.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+
+from executors import run_isolated
+from logic.model_export import bundle_path, load_bundle, bundle_models, parse_param, replay_cp_model, replay_pulp_model
+
+COLUMNS = [("model", 22), ("params", 34), ("status", 10), ("wall", 8), ("det", 8), ("conflicts", 10), ("objective", 12), ("gap", 7)]
+SHORT_NAMES = {"max_time_in_seconds": "time", "timeLimit": "time", "num_workers": "workers", "threads": "workers", "random_seed": "seed"}
+
+
+def isolated(fn, *args, **kwargs):
+    return run_isolated(fn, *args, **kwargs) or {"status": "CRASHED"}
+
+
+def row(values):
+    return " ".join(str("-" if v is None else v)[:width].ljust(width) for v, (_, width) in zip(values, COLUMNS))
+
+
+def describe(model_name, params, stats):
+    return row([model_name, " ".join(f"{SHORT_NAMES.get(k, k)}={v}" for k, v in params.items()) or "-", stats.get("status"), stats.get("wall_time"),
+                stats.get("deterministic_time"), stats.get("conflicts"), stats.get("objective"), stats.get("gap")])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an exported scheduling model bundle under other solver parameters")
+    parser.add_argument("bundle", help="Bundle id (in $SCHEDULER_BUNDLE_DIR or ./bundles) or bundle directory")
+    parser.add_argument("--pass", dest="passes", nargs="+", help="Only these passes (strict, diagnostic, emergency)")
+    parser.add_argument("--time-limit", type=float, help="Seconds per solve (default: the limit recorded for the pass)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[None], help="CP-SAT num_workers / CBC threads to try")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[None], help="CP-SAT random_seed values to try")
+    parser.add_argument("--param", action="append", default=[], help="Extra CP-SAT parameter as name=value (repeatable)")
+    parser.add_argument("--full", action="store_true", help="Also re-run the whole request through generate_schedule")
+    parser.add_argument("--output", help="Write all replay results as JSON here")
+    args = parser.parse_args()
+
+    path = args.bundle if os.path.isdir(args.bundle) else bundle_path(args.bundle)
+    manifest, data = load_bundle(path)
+    recorded = {p.get("pass"): p for p in manifest.get("passes", [])}
+    extra = dict(parse_param(p) for p in args.param)
+    print(f"📦 {path}: {len(data.plan)} plan rows, {sum(p.hours_per_week for p in data.plan)} lessons, strategy {data.strategy}")
+
+    results = []
+    print(row([name for name, _ in COLUMNS]))
+    for model_path in bundle_models(path):
+        model_name = os.path.basename(model_path)
+        pass_name = os.path.splitext(model_name)[0].rsplit("_", 1)[-1]
+        if args.passes and pass_name not in args.passes:
+            continue
+        baseline = recorded.get(pass_name, {})
+        if baseline:
+            print(describe(model_name, {"recorded": "production"}, baseline))
+        time_limit = args.time_limit or baseline.get("time_limit")
+
+        for workers, seed in itertools.product(args.workers, args.seeds):
+            if model_name.endswith(".mps"):
+                params = {k: v for k, v in {"timeLimit": time_limit, "threads": workers}.items() if v is not None}
+                stats = isolated(replay_pulp_model, model_path, time_limit=time_limit, threads=workers)
+            else:
+                params = {k: v for k, v in {"max_time_in_seconds": time_limit, "num_workers": workers, "random_seed": seed}.items() if v is not None}
+                params.update(extra)
+                stats = isolated(replay_cp_model, model_path, params)
+            print(describe(model_name, params, stats))
+            results.append({"model": model_name, "pass": pass_name, "params": params, "stats": stats, "recorded": baseline})
+
+    if args.full:
+        from solver import generate_schedule
+
+        started = time.perf_counter()
+        result = generate_schedule(data)
+        elapsed = round(time.perf_counter() - started, 3)
+        print(f"🔁 generate_schedule: {result['status']} in {elapsed}s, passes {[p.get('pass') for p in result.get('solver_stats', [])]}")
+        results.append({"model": "generate_schedule", "status": result["status"], "wall_time": elapsed, "passes": result.get("solver_stats", [])})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Continues a checkpointed genetic run from the command line, e.g. for overnight sessions:
+
+    python resume_run.py school-42 --budget 28800 --output school-42.json
+
+The run was started with "checkpoint_id": "school-42" (API or batch request) and keeps
+checkpointing to the same file, so it can be resumed again after this session.
+"""
+import argparse
+import json
+import os
+
+from solver import resume_from_checkpoint
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume a checkpointed genetic scheduling run")
+    parser.add_argument("checkpoint_id")
+    parser.add_argument("--budget", type=float, help="Wall-clock seconds for this session")
+    parser.add_argument("--generations", type=int, help="Generation cap per island for this session")
+    parser.add_argument("--stagnation", type=int, help="Stop an island after this many evaluations without improvement")
+    parser.add_argument("--checkpoint-dir", help="Directory of the checkpoint files (default: $SCHEDULER_CHECKPOINT_DIR or ./checkpoints)")
+    parser.add_argument("--output", help="Write the result JSON here")
+    args = parser.parse_args()
+
+    if args.checkpoint_dir:
+        os.environ["SCHEDULER_CHECKPOINT_DIR"] = args.checkpoint_dir
+
+    result = resume_from_checkpoint(
+        args.checkpoint_id, time_budget=args.budget, generations=args.generations, stagnation_limit=args.stagnation,
+        progress_callback=lambda progress, message: print(f"[{progress:3d}%] {message}"),
+    )
+    if result["status"] == "error":
+        print(f"❌ {result['message']}")
+        raise SystemExit(1)
+
+    print(f"✅ {result['status']}: {len(result['schedule'])} lessons, stats {result.get('genetic')}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Result written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,272 @@
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from models import ScheduleRequest
 from logic.preprocessor import validate_workloads
 from logic.analyzer import analyze_violations
-from logic.engine import ortools_solve, optimize_period_zero
+from logic.engine import ortools_solve, optimize_period_zero, STRICT_TIME_LIMIT, RELAXED_TIME_LIMIT
 from logic.genetic_solver import GeneticSolver
+from logic.context import build_context
+from logic.pins import pin_domains
+from logic.repair import repair_schedule
+from logic.schedule_diff import diff_schedules
+from logic.decomposition import solve_decomposed
+from logic.greedy import greedy_solve
+from logic.local_search import local_search_solve
+from logic.checkpoint import checkpoint_path, load_checkpoint
+from logic.alternatives import ortools_alternatives, distinct_elites, describe_alternatives
+from logic.model_export import start_bundle, model_file, write_manifest
+from logic.admission import admit
+from logic.memory import MemoryProbe
 
 from logic.pulp_solver.core import solve_with_pulp
 
-def generate_schedule(data: ScheduleRequest, progress_callback=None) -> Dict[str, Any]:
+# Strategies that place lessons without the CP-SAT/PuLP domains, so pins and forbidden slots would be ignored
+UNCONSTRAINED_STRATEGIES = {"genetic", "decomposition", "greedy", "local_search"}
+
+def add_ortools_alternatives(result: Dict[str, Any], data: ScheduleRequest, ctx, periods: List[int], strict: bool,
+                             time_limit: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Adds result["alternatives"] when more than one timetable was requested (within `time_limit` seconds, if given).
+    The primary's objective is the one its pass reported, before optimize_period_zero changed the timetable.
+    """
+    if (data.num_alternatives or 1) > 1 and result.get("schedule"):
+        objective = (result.get("solver_stats") or [{}])[-1].get("objective")
+        objective, others = ortools_alternatives(data, periods, strict, data.num_alternatives, result["schedule"], ctx=ctx,
+                                                 time_limit=time_limit, first_objective=objective)
+        result["alternatives"] = describe_alternatives(data, ctx, result["schedule"], objective, others)
+    return result
+
+def generate_schedule(data: ScheduleRequest, progress_callback=None, resume_state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # data.time_budget bounds the CP-SAT cascade, its alternatives and the decomposition stages
+    deadline = time.perf_counter() + data.time_budget if data.time_budget else None
+
+    def time_left() -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - time.perf_counter())
+    # Shared, precomputed lookups for every stage below
+    ctx = build_context(data)
+
     # Pass 0: Pre-validation
-    validation_errors = validate_workloads(data)
+    validation_errors = validate_workloads(data, ctx)
     if validation_errors:
         return {"status": "error", "message": "Помилка валідації:\n" + "\n".join(validation_errors)}
+    if data.pinned_lessons:
+        pin_errors = pin_domains(ctx, list(range(0, 8))).dropped
+        if pin_errors:
+            return {"status": "error", "message": "Помилка закріплених уроків:\n" + "\n".join(pin_errors)}
+
+    # Admission: the model size is estimated before anything is built
+    admission = admit(data, ctx)
+    if admission["decision"] == "reject":
+        return {"status": "error", "message": admission["message"], "admission": admission}
+    if admission["decision"] == "decompose":
+        print(f"🗂️ Estimated model too large ({admission['estimate']['variables']} variables), routing to decomposition...")
+        data = data.model_copy(update={"strategy": "decomposition"})
+    # Reported with decomposition results when the request was routed there
+    routed = {"admission": admission} if admission["decision"] == "decompose" else {}
+
+    # Only the CP-SAT and PuLP models honour pinned lessons and forbidden slots
+    if (data.pinned_lessons or data.forbidden_slots) and (data.mode == "repair" or data.strategy in UNCONSTRAINED_STRATEGIES):
+        return {"status": "error", "message": f"• Закріплені уроки та заборонені слоти підтримують лише стратегії ortools і pulp "
+                                              f"(обрано {data.strategy if data.mode != 'repair' else 'repair'}).", **routed}
+
+    # Mode: Repair (minimal changes to the current schedule)
+    if data.mode == "repair":
+        if not data.current_schedule:
+            return {"status": "error", "message": "Для режиму repair потрібен поточний розклад (current_schedule)."}
+        current = [l.model_dump() for l in data.current_schedule]
+        print(f"🔧 Repairing schedule ({len(current)} lessons)...")
+        result, info = repair_schedule(data, current, progress_callback=progress_callback, ctx=ctx)
+        if result is None:
+            return {"status": "error", "message": "Не вдалося відремонтувати розклад з мінімальними змінами."}
+        if progress_callback:
+            progress_callback(100, "✅ Ремонт завершено!")
+        changes = diff_schedules(current, result)
+        info.update({"moved": len(changes["moved"]), "added": len(changes["added"]), "removed": len(changes["removed"])})
+        violations = analyze_violations(result, data, ctx)
+        if not violations: return {"status": "success", "schedule": result, "repair": info}
+        return {"status": "conflict", "schedule": result, "violations": violations, "repair": info}
 
     # Strategy: Genetic (Evolutionary)
     # Strategy: Genetic (Evolutionary)
     if data.strategy == "genetic":
         pop_size = data.genetic_population_size or 8
         generations = data.genetic_generations or 3
-        mutation_rate = data.genetic_mutation_rate or 0.4
+        if data.genetic_time_budget and "genetic_generations" not in data.model_fields_set:
+            generations = None  # Run until the budget or stagnation
+        mutation_rate = data.genetic_mutation_rate if data.genetic_mutation_rate is not None else 0.4
         
         print(f"🧬 Using Genetic Solver (Pop={pop_size}, Gen={generations}, Mut={mutation_rate})...")
-        genetic = GeneticSolver(data, population_size=pop_size, generations=generations, mutation_rate=mutation_rate, progress_callback=progress_callback)
+        genetic = GeneticSolver(data, population_size=pop_size, generations=generations, mutation_rate=mutation_rate, progress_callback=progress_callback, ctx=ctx,
+                                time_budget=data.genetic_time_budget, stagnation_limit=data.genetic_stagnation_limit,
+                                checkpoint_path=checkpoint_path(data.checkpoint_id) if data.checkpoint_id else None, resume_state=resume_state)
         result = genetic.evolve()
         
         if result:
             if progress_callback:
                 progress_callback(100, "✅ Генерацію завершено!")
-            violations = analyze_violations(result, data)
-            if not violations: return {"status": "success", "schedule": result}
-            return {"status": "conflict", "schedule": result, "violations": violations}
+            violations = analyze_violations(result, data, ctx)
+            extra = {"genetic": genetic.stats}
+            if data.checkpoint_id: extra["checkpoint_id"] = data.checkpoint_id
+            if (data.num_alternatives or 1) > 1:
+                # Distinct elites of the final island populations; objective = -fitness (lower is better)
+                elites = distinct_elites(genetic.final_population, result, data.num_alternatives)
+                extra["alternatives"] = describe_alternatives(data, ctx, result, -genetic.best_score, [(-score, s) for score, s in elites])
+            if not violations: return {"status": "success", "schedule": result, **extra}
+            return {"status": "conflict", "schedule": result, "violations": violations, **extra}
         else:
             return {"status": "error", "message": "Генетичний алгоритм не зміг знайти валідне рішення."}
 
+    # Strategy: Decomposition (days first, then periods per day in parallel)
+    if data.strategy == "decomposition":
+        print("🗂️ Using day/period decomposition...")
+        result, error = solve_decomposed(data, list(range(1, 8)), ctx=ctx, progress_callback=progress_callback, time_limit=time_left())
+        if result is None:
+            print(f"Decomposition 1-7 failed ({error}). Attempting EMERGENCY decomposition (0-7)...")
+            result, error = solve_decomposed(data, list(range(0, 8)), ctx=ctx, progress_callback=progress_callback, time_limit=time_left())
+            if result is not None:
+                result = optimize_period_zero(result, data, ctx)
+        if result is None:
+            return {"status": "error", "message": f"Декомпозиція не знайшла рішення: {error}", **routed}
+        if progress_callback:
+            progress_callback(100, "✅ Генерацію завершено!")
+        violations = analyze_violations(result, data, ctx)
+        if not violations: return {"status": "success", "schedule": result, **routed}
+        return {"status": "conflict", "schedule": result, "violations": violations, **routed}
+
+    # Strategy: Greedy (DSatur construction, no solver)
+    if data.strategy == "greedy":
+        print("⚡ Using greedy construction...")
+        result, error = greedy_solve(data, list(range(1, 8)), ctx=ctx)
+        if error:
+            print(f"Greedy 1-7 incomplete ({error}). Attempting EMERGENCY construction (0-7)...")
+            result, error = greedy_solve(data, list(range(0, 8)), ctx=ctx)
+            result = optimize_period_zero(result, data, ctx)
+        if progress_callback:
+            progress_callback(100, "✅ Генерацію завершено!")
+        violations = analyze_violations(result, data, ctx)
+        if not violations: return {"status": "success", "schedule": result}
+        return {"status": "conflict", "schedule": result, "violations": violations}
+
+    # Strategy: Local Search (simulated annealing from the greedy timetable)
+    if data.strategy == "local_search":
+        periods = list(range(1, 8))
+        initial, error = greedy_solve(data, periods, ctx=ctx)
+        if error:
+            periods = list(range(0, 8))
+            initial, _ = greedy_solve(data, periods, ctx=ctx)
+        print(f"🔥 Using local search ({data.timeout or 30}s budget)...")
+        result, info = local_search_solve(data, periods, ctx=ctx, time_limit=data.timeout or 30, progress_callback=progress_callback, initial=initial)
+        if result is None:
+            return {"status": "error", "message": "Локальний пошук не зміг побудувати розклад."}
+        if 0 in periods:
+            result = optimize_period_zero(result, data, ctx)
+        if progress_callback:
+            progress_callback(100, "✅ Генерацію завершено!")
+        violations = analyze_violations(result, data, ctx)
+        if not violations: return {"status": "success", "schedule": result, "local_search": info}
+        return {"status": "conflict", "schedule": result, "violations": violations, "local_search": info}
+
+    # Optional model export for offline replay (see logic/model_export.py)
+    try:
+        bundle = start_bundle(data) if data.export_bundle else None
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
     # Dispatch based on strategy
     if data.strategy == "pulp":
         print(f"Using PuLP Solver with timeout {data.timeout}s...")
         timeout_seconds = data.timeout if data.timeout else 30
-        result, error = solve_with_pulp(data, list(range(1, 8)), strict=True, timeout=timeout_seconds)
+        stats = {"pass": "strict"}
+        # CBC solves in a child process: its memory is only in the children's counters
+        with MemoryProbe(stats, children=True):
+            result, error = solve_with_pulp(data, list(range(1, 8)), strict=True, timeout=timeout_seconds, ctx=ctx, stats=stats,
+                                            export_path=model_file(bundle, "pulp", "strict"))
+        if bundle: write_manifest(bundle, [stats])
         # Note: PuLP simple implementation doesn't have "diagnostic" passes yet in this iteration
         # simple failover or return
         if result:
              # Basic violation check (reusing existing analyzer)
-            violations = analyze_violations(result, data)
-            if not violations: return {"status": "success", "schedule": result}
-            return {"status": "conflict", "schedule": result, "violations": violations}
+            violations = analyze_violations(result, data, ctx)
+            if not violations: return {"status": "success", "schedule": result, "solver_stats": [stats]}
+            return {"status": "conflict", "schedule": result, "violations": violations, "solver_stats": [stats]}
         else:
-             return {"status": "error", "message": f"PuLP Solver failed: {error}"}
+             return {"status": "error", "message": f"PuLP Solver failed: {error}", "solver_stats": [stats]}
 
     # Default: OR-Tools (Logic preserved)
+    # A greedy timetable (milliseconds) is the starting point hinted to every pass
+    hint, _ = greedy_solve(data, list(range(1, 8)), ctx=ctx)
+    # Model size and search statistics, one entry per pass that ran
+    solver_stats = []
+
+    def solve_pass(name: str, periods: List[int], strict: bool):
+        stats = {"pass": name}
+        solver_stats.append(stats)
+        time_limit = None
+        if deadline is not None:
+            time_limit = min(deadline - time.perf_counter(), STRICT_TIME_LIMIT if strict else RELAXED_TIME_LIMIT)
+            if time_limit <= 0:
+                stats["status"] = "SKIPPED"  # Time budget used up by the earlier passes
+                return None, "Час вичерпано."
+        with MemoryProbe(stats):
+            solved = ortools_solve(data, periods, strict=strict, ctx=ctx, hint=hint, time_limit=time_limit, stats=stats,
+                                   export_path=model_file(bundle, "cp_sat", name))
+        if bundle: write_manifest(bundle, solver_stats)
+        return solved
+
     # Pass 1: Strict Solve (Periods 1-7)
     print("Attempting STRICT solve (1-7)...")
-    result, error = ortools_solve(data, list(range(1, 8)), strict=True)
+    result, error = solve_pass("strict", list(range(1, 8)), True)
     if result:
-        violations = analyze_violations(result, data)
-        if not violations: return {"status": "success", "schedule": result}
-        return {"status": "conflict", "schedule": result, "violations": violations}
+        violations = analyze_violations(result, data, ctx)
+        if not violations: return add_ortools_alternatives({"status": "success", "schedule": result, "solver_stats": solver_stats}, data, ctx, list(range(1, 8)), True, time_left())
+        return add_ortools_alternatives({"status": "conflict", "schedule": result, "violations": violations, "solver_stats": solver_stats}, data, ctx, list(range(1, 8)), True, time_left())
     
     # Pass 2: Diagnostic Solve (Periods 1-7)
     print("Strict solve failed. Attempting DIAGNOSTIC solve (1-7)...")
-    result, error = ortools_solve(data, list(range(1, 8)), strict=False)
+    result, error = solve_pass("diagnostic", list(range(1, 8)), False)
     if result:
-        result = optimize_period_zero(result, data)
-        violations = analyze_violations(result, data)
-        return {
+        result = optimize_period_zero(result, data, ctx)
+        violations = analyze_violations(result, data, ctx)
+        return add_ortools_alternatives({
             "status": "conflict", 
             "schedule": result, 
-            "violations": violations or ["• Solver не зміг знайти ідеальне рішення, спробуйте зменшити навантаження."]
-        }
+            "violations": violations or ["• Solver не зміг знайти ідеальне рішення, спробуйте зменшити навантаження."],
+            "solver_stats": solver_stats,
+        }, data, ctx, list(range(1, 8)), False, time_left())
     
     # Pass 3: Emergency Solve (Periods 0-7)
     print("Diagnostic 1-7 failed. Attempting EMERGENCY solve (0-7)...")
-    result, error = ortools_solve(data, list(range(0, 8)), strict=False)
+    result, error = solve_pass("emergency", list(range(0, 8)), False)
     if result:
-        result = optimize_period_zero(result, data)
-        violations = analyze_violations(result, data)
-        return {
+        result = optimize_period_zero(result, data, ctx)
+        violations = analyze_violations(result, data, ctx)
+        return add_ortools_alternatives({
             "status": "conflict",
             "schedule": result,
-            "violations": violations or ["• Використано нульовий урок для розміщення всіх уроків."]
-        }
+            "violations": violations or ["• Використано нульовий урок для розміщення всіх уроків."],
+            "solver_stats": solver_stats,
+        }, data, ctx, list(range(0, 8)), False, time_left())
+
+    if deadline is not None and solver_stats[-1].get("status") == "SKIPPED":
+        return {"status": "error", "message": f"Помилка генерації: бюджет часу ({data.time_budget} с) вичерпано.", "solver_stats": solver_stats}
+    return {"status": "error", "message": "Помилка генерації. Навіть частковий розклад неможливий.", "solver_stats": solver_stats}
+
+
+def resume_from_checkpoint(checkpoint_id: str, time_budget: Optional[float] = None, generations: Optional[int] = None,
+                           stagnation_limit: Optional[int] = None, progress_callback=None) -> Dict[str, Any]:
+    """Continues a checkpointed genetic run for another session (same checkpoint id, so it keeps checkpointing)."""
+    try:
+        state = load_checkpoint(checkpoint_path(checkpoint_id))
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    if state is None:
+        return {"status": "error", "message": f"Контрольну точку '{checkpoint_id}' не знайдено."}
 
-    return {"status": "error", "message": "Помилка генерації. Навіть частковий розклад неможливий."}
+    overrides = {"strategy": "genetic", "checkpoint_id": checkpoint_id}
+    if time_budget is not None: overrides["genetic_time_budget"] = time_budget
+    if generations is not None: overrides["genetic_generations"] = generations
+    if stagnation_limit is not None: overrides["genetic_stagnation_limit"] = stagnation_limit
+    # The request was saved with exclude_unset, so "generations given explicitly" survives the round trip
+    data = ScheduleRequest(**{**state["request"], **overrides})
+    print(f"💾 Resuming checkpoint '{checkpoint_id}' (best score {state.get('best_score')})...")
+    return generate_schedule(data, progress_callback=progress_callback, resume_state=state)
@@ -0,0 +1,57 @@
+from solver import generate_schedule
+from logic import admission
+from logic.admission import admit, estimate_model_size
+from logic.context import build_context
+from logic.engine import build_cp_model
+from logic.memory import MemoryProbe
+
+
+def test_estimate_matches_the_built_model(pins_request):
+    ctx = build_context(pins_request())
+    estimate = estimate_model_size(ctx)
+    built = build_cp_model(ctx, list(range(0, 8)), strict=False)
+    assert estimate["lesson_vars"] == built.stats["lesson_vars"]
+    assert abs(estimate["variables"] - len(built.model.Proto().variables)) <= 0.05 * estimate["variables"]
+    assert estimate_model_size(ctx, "pulp")["variables"] > estimate["variables"]
+
+
+def test_admission_decisions(monkeypatch, pins_request):
+    assert admit(pins_request())["decision"] == "accept"
+    monkeypatch.setattr(admission, "LARGE_JOB_MEMORY_MB", 10)
+    assert admit(pins_request())["decision"] == "large"
+
+    monkeypatch.setattr(admission, "MAX_MODEL_VARIABLES", 100)
+    assert admit(pins_request())["decision"] == "reject"
+    assert admit(pins_request(), policy="queue")["decision"] == "large"
+    assert admit(pins_request(), policy="decompose")["decision"] == "decompose"
+    assert admit(pins_request(mode="repair"), policy="decompose")["decision"] == "reject"
+    # Strategies without a whole-timetable model are always admitted
+    assert admit(pins_request(strategy="greedy"))["decision"] == "accept"
+
+
+def test_oversized_requests_are_rejected_or_decomposed(monkeypatch, pins_request):
+    monkeypatch.setattr(admission, "MAX_MODEL_VARIABLES", 100)
+    result = generate_schedule(pins_request())
+    assert result["status"] == "error" and "завелика" in result["message"]
+
+    monkeypatch.setattr(admission, "OVERSIZE_POLICY", "decompose")
+    result = generate_schedule(pins_request())
+    assert result["status"] in ("success", "conflict") and len(result["schedule"]) == 14
+    assert result["admission"]["decision"] == "decompose"
+
+
+def test_peak_memory_is_reported_per_pass(pins_request):
+    stats = {}
+    with MemoryProbe(stats):
+        block = bytearray(20 * 1024 * 1024)
+        block[::4096] = b"x" * len(block[::4096])
+    assert stats["peak_rss_mb"] >= 20 and stats["peak_rss_scope"] in ("solve", "process")
+
+    result = generate_schedule(pins_request())
+    assert result["solver_stats"][0]["peak_rss_mb"] > 0
+
+
+def test_pulp_memory_includes_the_cbc_process(pins_request):
+    result = generate_schedule(pins_request().model_copy(update={"strategy": "pulp"}))
+    stats = result["solver_stats"][0]
+    assert stats["solver_peak_rss_mb"] > 0 and stats["solver_peak_rss_scope"] in ("solve", "process")
@@ -0,0 +1,74 @@
+import pytest
+from models import ScheduleRequest
+from solver import generate_schedule
+from logic.alternatives import changed_lessons, min_changed
+from logic.schedule_diff import schedule_hash
+
+@pytest.fixture
+def make_request(grid_request):
+    return lambda strategy="ortools": grid_request(3, 4, strategy=strategy, num_alternatives=3)
+
+def assert_diverse(result, expected):
+    alternatives = result["alternatives"]
+    assert len(alternatives) == expected
+    assert alternatives[0]["schedule"] == result["schedule"]
+    assert [a["rank"] for a in alternatives] == list(range(1, expected + 1))
+    schedules = [a["schedule"] for a in alternatives]
+    assert len({schedule_hash(s) for s in schedules}) == expected
+    for i, first in enumerate(schedules):
+        for second in schedules[i + 1:]:
+            assert changed_lessons(first, second) >= min_changed(second)
+
+def test_ortools_returns_distinct_alternatives(make_request):
+    result = generate_schedule(make_request())
+    assert result["status"] == "success"
+    assert_diverse(result, 3)
+    assert all(not a["violations"] for a in result["alternatives"])
+    objectives = [a["objective"] for a in result["alternatives"][1:]]
+    assert objectives == sorted(objectives)
+
+def test_genetic_returns_distinct_elites(make_request):
+    request = make_request("genetic")
+    request.genetic_population_size = 6
+    request.genetic_generations = 1
+    result = generate_schedule(request)
+    assert 1 <= len(result["alternatives"]) <= 3
+    assert_diverse(result, len(result["alternatives"]))
+
+def test_single_timetable_by_default(make_request):
+    request = make_request()
+    request.num_alternatives = None
+    assert "alternatives" not in generate_schedule(request)
+
+def test_alternative_count_is_capped(make_request):
+    from pydantic import ValidationError
+    with pytest.raises(ValidationError):
+        ScheduleRequest.model_validate({**make_request().model_dump(), "num_alternatives": 11})
+
+def test_primary_objective_comes_from_its_pass(make_request):
+    from solver import add_ortools_alternatives
+    from logic.context import build_context
+    request = make_request()
+    schedule = generate_schedule(request)["schedule"]
+    result = {"status": "conflict", "schedule": schedule, "solver_stats": [{"pass": "emergency", "objective": 1234.0}]}
+    add_ortools_alternatives(result, request, build_context(request), list(range(0, 8)), False)
+    assert result["alternatives"][0]["objective"] == 1234.0
+
+def test_alternatives_move_free_lessons_around_pins(make_request):
+    pins = [
+        {"class_id": "c0", "subject_id": "s0", "teacher_id": "t0", "day": "Mon", "period": 1},
+        {"class_id": "c1", "subject_id": "s1", "teacher_id": "t1", "day": "Mon", "period": 1},
+    ]
+    request = ScheduleRequest.model_validate({**make_request().model_dump(), "pinned_lessons": pins})
+    result = generate_schedule(request)
+    assert result["status"] == "success"
+    assert_diverse(result, 3)
+    assert all(a["changed_lessons"] > 0 for a in result["alternatives"][1:])
+    assert all(all(p in a["schedule"] for p in pins) for a in result["alternatives"])
+
+def test_no_alternatives_when_every_lesson_is_pinned(make_request):
+    from logic.alternatives import ortools_alternatives
+    schedule = generate_schedule(make_request())["schedule"]
+    request = ScheduleRequest.model_validate({**make_request().model_dump(), "pinned_lessons": schedule})
+    _, others = ortools_alternatives(request, list(range(1, 8)), True, 3, schedule)
+    assert others == []
@@ -0,0 +1,87 @@
+import asyncio
+import statistics
+import time
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import main
+from executors import shutdown_executors
+
+CONCURRENT_SOLVES = 3
+
+def solve_payload():
+    # 6 classes x 8 subjects x 4 hours: roughly a second of CP-SAT work per solve
+    return {
+        "subjects": [{"id": f"s{i}", "name": f"Subject {i}"} for i in range(8)],
+        "teachers": [{"id": f"t{i}", "name": f"Teacher {i}", "subjects": [f"s{i}"]} for i in range(8)],
+        "classes": [{"id": f"c{i}", "name": f"{5 + i}-A"} for i in range(6)],
+        "plan": [
+            {"class_id": f"c{c}", "subject_id": f"s{i}", "teacher_id": f"t{i}", "hours_per_week": 4}
+            for c in range(6) for i in range(8)
+        ],
+    }
+
+async def measure(client, samples):
+    latencies = []
+    for _ in range(samples):
+        for path in ("/api/health", "/api/data"):
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+    return latencies
+
+def test_health_and_data_latency_stay_flat_during_solves():
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+            await measure(client, 2)  # Warm up the database pool
+            baseline = await measure(client, 10)
+
+            solves = [asyncio.ensure_future(client.post("/api/generate", json=solve_payload())) for _ in range(CONCURRENT_SOLVES)]
+            during = []
+            while not all(s.done() for s in solves):
+                during += await measure(client, 5)
+                await asyncio.sleep(0.05)
+            return baseline, during, await asyncio.gather(*solves)
+
+    try:
+        baseline, during, responses = asyncio.run(scenario())
+    finally:
+        shutdown_executors()
+
+    assert all(r.status_code == 200 and r.json()["status"] == "success" for r in responses)
+    assert len(during) >= 10
+    # The event loop stays free while solves run in worker processes
+    assert statistics.median(during) < max(0.05, 5 * statistics.median(baseline))
+    assert max(during) < 1.0
+
+def test_feasibility_probe_does_not_queue_behind_solves(monkeypatch):
+    import threading
+    from executors import run_solver, solver_pool_size
+    threads = []
+    original = main.check_feasibility
+
+    def recording_check(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(main, "check_feasibility", recording_check)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+            busy = [asyncio.ensure_future(run_solver(time.sleep, 5)) for _ in range(solver_pool_size())]
+            await asyncio.sleep(0.5)  # Let the pool pick them up
+            response = await client.post("/api/feasibility", json=solve_payload(), params={"time_limit": 1})
+            await asyncio.gather(*busy)
+            return response
+
+    try:
+        response = asyncio.run(scenario())
+    finally:
+        shutdown_executors()
+    assert response.status_code == 200 and response.json()["status"] == "feasible"
+    # Probes run on their own threads, not behind the busy solver processes
+    assert len(threads) == 1 and threads[0].startswith("probe")
@@ -0,0 +1,39 @@
+from models import ScheduleRequest, Teacher, Subject, ClassGroup, TeachingPlanItem
+from batch import batch_pool_size, prepare_batch, iter_batch, summarize_batch
+
+def make_request(school_id, hours):
+    return ScheduleRequest(
+        teachers=[Teacher(id="t1", name="John Doe", subjects=["math"])],
+        subjects=[Subject(id="math", name="Math")],
+        classes=[ClassGroup(id="c1", name="Class A")],
+        plan=[TeachingPlanItem(class_id="c1", subject_id="math", teacher_id="t1", hours_per_week=hours)],
+        school_id=school_id
+    )
+
+def test_pool_size_is_bounded_by_jobs_and_cores(monkeypatch):
+    import batch
+    monkeypatch.setattr(batch.os, "cpu_count", lambda: 4)
+    assert batch_pool_size(1) == 1
+    assert batch_pool_size(100) == 4
+    assert batch_pool_size(100, max_workers=2) == 2
+    assert batch_pool_size(100, max_workers=1000) == 4
+    monkeypatch.setattr(batch, "BATCH_MAX_WORKERS", 8)
+    assert batch_pool_size(100, max_workers=1000) == 8
+
+def test_prepare_batch_caps_solver_threads():
+    requests = [make_request("a", 2), make_request("b", 2).model_copy(update={"solver_workers": 3})]
+    jobs = prepare_batch(requests, pool_size=2)
+    assert jobs[0].solver_workers >= 1
+    assert jobs[1].solver_workers == 3
+    assert requests[0].solver_workers is None
+
+def test_batch_solves_every_school():
+    requests = [make_request("a", 2), make_request("b", 3), make_request("overloaded", 50)]
+    jobs = list(iter_batch(requests, max_workers=2))
+    assert sorted(j["school_id"] for j in jobs) == ["a", "b", "overloaded"]
+
+    summary = summarize_batch(jobs, wall_time=1.0)
+    assert summary["total"] == 3
+    assert summary["by_status"] == {"success": 2, "error": 1}
+    assert [s["school_id"] for s in summary["schools"]] == ["a", "b", "overloaded"]
+    assert "result" not in summary["schools"][0]
@@ -0,0 +1,68 @@
+import csv
+import json
+import subprocess
+import sys
+import os
+
+from models import ScheduleRequest
+from batch import apply_time_budget
+from batch_cli import load_requests
+
+def request_dict(hours, **extra):
+    return {
+        "teachers": [{"id": "t1", "name": "John Doe", "subjects": ["math"]}],
+        "subjects": [{"id": "math", "name": "Math"}],
+        "classes": [{"id": "c1", "name": "Class A"}],
+        "plan": [{"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "hours_per_week": hours}],
+        **extra,
+    }
+
+def test_load_requests_names_schools_after_files(tmp_path):
+    (tmp_path / "alpha.json").write_text(json.dumps(request_dict(2)))
+    (tmp_path / "many.json").write_text(json.dumps({"requests": [request_dict(2), request_dict(3, school_id="named")]}))
+    requests = load_requests([str(tmp_path)])
+    assert [r.school_id for r in requests] == ["alpha", "many-0", "named"]
+
+def test_time_budget_keeps_explicit_fields():
+    request = apply_time_budget(ScheduleRequest(**request_dict(2, timeout=5)), 12.5)
+    assert request.time_budget == 12.5
+    assert request.genetic_time_budget == 12.5
+    assert request.timeout == 5
+
+def test_cli_runs_without_api_or_database(tmp_path):
+    (tmp_path / "a.json").write_text(json.dumps(request_dict(2)))
+    (tmp_path / "overloaded.json").write_text(json.dumps(request_dict(50)))
+    out = tmp_path / "results"
+    script = (
+        "import sys, batch_cli\n"
+        f"code = batch_cli.main([{str(tmp_path / '*.json')!r}, '--workers', '2', '--time-budget', '5', "
+        f"'--output-dir', {str(out)!r}, '--csv', {str(tmp_path / 'summary.csv')!r}])\n"
+        "assert 'fastapi' not in sys.modules and 'sqlalchemy' not in sys.modules\n"
+        "sys.exit(code)\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    assert proc.returncode == 1, proc.stderr  # The overloaded school fails
+    assert "parallelism" in proc.stdout
+
+    assert json.loads((out / "a.json").read_text())["status"] == "success"
+    assert json.loads((out / "overloaded.json").read_text())["status"] == "error"
+    with open(tmp_path / "summary.csv") as f:
+        rows = {row["school_id"]: row for row in csv.DictReader(f)}
+    assert rows["a"]["status"] == "success"
+
+def test_exhausted_budget_skips_cascade_passes():
+    from solver import generate_schedule
+    result = generate_schedule(ScheduleRequest(**request_dict(2, time_budget=1e-9)))
+    assert result["status"] == "error"
+    assert [s["status"] for s in result["solver_stats"]] == ["SKIPPED"] * 3
+
+def test_time_budget_bounds_decomposition_and_alternatives():
+    from solver import generate_schedule
+    result = generate_schedule(ScheduleRequest(**request_dict(2, time_budget=1e-9, strategy="decomposition")))
+    assert result["status"] == "error" and "Час вичерпано" in result["message"]
+
+    from logic.alternatives import ortools_alternatives
+    data = ScheduleRequest(**request_dict(3))
+    first = generate_schedule(data)["schedule"]
+    _, others = ortools_alternatives(data, list(range(1, 8)), True, 5, first, time_limit=0)
+    assert others == []
@@ -0,0 +1,65 @@
+from solver import generate_schedule, resume_from_checkpoint
+from logic.checkpoint import checkpoint_path, load_checkpoint, save_checkpoint, checkpoint_summary
+from logic.genetic_solver import resumed_island_states
+import pytest
+
+@pytest.fixture
+def make_request(grid_request):
+    return lambda checkpoint_id: grid_request(3, 4, strategy="genetic", genetic_population_size=2, genetic_generations=1, checkpoint_id=checkpoint_id)
+
+def test_checkpoint_ids_stay_inside_the_checkpoint_dir():
+    with pytest.raises(ValueError):
+        checkpoint_path("../etc/passwd")
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "run.ckpt.gz")
+    save_checkpoint(path, {"islands": {}, "best": [], "best_score": -5, "stats": {"evaluations": 3}})
+    state = load_checkpoint(path)
+    assert checkpoint_summary(state)["best_score"] == -5
+    assert load_checkpoint(str(tmp_path / "missing.ckpt.gz")) is None
+
+def test_run_checkpoints_and_resumes(make_request):
+    first = generate_schedule(make_request("resume-test"))
+    assert first["status"] in ["success", "conflict"]
+    state = load_checkpoint(checkpoint_path("resume-test"))
+    assert state["stats"]["sessions"] == 1
+    assert state["islands"] and state["best_score"] == first["genetic"]["best_score"]
+
+    resumed = resume_from_checkpoint("resume-test", generations=1)
+    assert resumed["status"] in ["success", "conflict"]
+    assert resumed["genetic"]["sessions"] == 2
+    # Duplicate children are not evaluated, so a short session can add no evaluations, but it adds generations
+    assert resumed["genetic"]["generations"] > first["genetic"]["generations"]
+    assert resumed["genetic"]["evaluations"] >= first["genetic"]["evaluations"]
+    assert resumed["genetic"]["best_score"] >= first["genetic"]["best_score"]
+    assert resume_from_checkpoint("missing")["status"] == "error"
+
+def test_resume_with_different_island_count_deals_individuals():
+    state = {"islands": {0: {"population": [(-1, ["a"]), (-2, ["b"]), (-3, ["c"])], "seen": ["h"]}}}
+    dealt = resumed_island_states(state, 2)
+    assert [len(s["population"]) for s in dealt] == [2, 1]
+    assert resumed_island_states(state, 1) == [state["islands"][0]]
+
+def test_checkpoint_endpoints(make_request):
+    httpx = pytest.importorskip("httpx")
+    import asyncio
+    import main
+    from executors import shutdown_executors
+
+    generate_schedule(make_request("api-test"))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+            summary = await client.get("/api/checkpoints/api-test")
+            missing = await client.get("/api/checkpoints/nope")
+            resumed = await client.post("/api/checkpoints/api-test/resume", json={"genetic_generations": 1})
+            return summary, missing, resumed
+
+    try:
+        summary, missing, resumed = asyncio.run(scenario())
+    finally:
+        shutdown_executors()
+    assert summary.status_code == 200 and summary.json()["lessons"] == 3 * 4 * 4
+    assert missing.status_code == 404
+    assert resumed.status_code == 200 and resumed.json()["genetic"]["sessions"] == 2
@@ -0,0 +1,48 @@
+import pickle
+from models import ScheduleRequest, Teacher, Subject, ClassGroup, TeachingPlanItem
+from logic.context import build_context
+
+def make_request():
+    return ScheduleRequest(
+        teachers=[
+            Teacher(id="t1", name="Math Teacher", subjects=["math"], availability={"Mon": [1, 2, -1, 9], "Fri": [7], "Sat": [1]}),
+            Teacher(id="t2", name="Primary Teacher", subjects=[], is_primary=True),
+        ],
+        subjects=[Subject(id="math", name="Math")],
+        classes=[ClassGroup(id="c1", name="7-A"), ClassGroup(id="c2", name="3-Б"), ClassGroup(id="c3", name="Class A"),
+                 ClassGroup(id="c4", name="0-В")],
+        plan=[
+            TeachingPlanItem(class_id="c1", subject_id="math", teacher_id="t1", hours_per_week=4),
+            TeachingPlanItem(class_id="c2", subject_id="math", teacher_id="t2", hours_per_week=4),
+            TeachingPlanItem(class_id="c3", subject_id="math", teacher_id="t1", hours_per_week=0),
+        ],
+    )
+
+def test_context_indexes_and_availability():
+    ctx = build_context(make_request())
+    assert ctx.class_index == {"c1": 0, "c2": 1, "c3": 2, "c4": 3}
+    assert ctx.teacher_blocked["t1"] == (0b110, 0, 0, 0, 1 << 7)
+    assert ctx.is_blocked("t1", 0, 2) and not ctx.is_blocked("t1", 0, 3)
+    assert not ctx.is_blocked("unknown", 0, 1)
+    assert ctx.blocked_count("t1") == 3  # "Sat" and periods outside 0-8 are ignored
+
+def test_context_requests_skip_primary_and_empty_rows():
+    ctx = build_context(make_request())
+    assert ctx.primary_classes == frozenset({"c2"})
+    assert ctx.is_primary_grade("c2") and not ctx.is_primary_grade("c3") and not ctx.is_primary_grade("c4")
+    assert [(r.class_id, r.count, r.teacher_idx) for r in ctx.requests] == [("c1", 4, 0)]
+    assert ctx.teacher_requests == {"t1": (0,)}
+    assert ctx.class_requests == {"c1": (0,)}
+
+def test_context_pickles():
+    ctx = build_context(make_request())
+    assert pickle.loads(pickle.dumps(ctx)) == ctx
+
+def test_cp_model_has_no_variables_for_blocked_slots():
+    from logic.engine import build_cp_model
+    ctx = build_context(make_request())
+    built = build_cp_model(ctx, list(range(1, 8)), strict=True)
+    # One request, 35 weekly slots, 3 of them blocked (Mon 1-2, Fri 7)
+    assert built.stats["lesson_vars"] == 32
+    assert built.stats["lesson_vars_eliminated"] == 3
+    assert (0, 0, 1) not in built.x and (0, 0, 3) in built.x
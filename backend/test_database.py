@@ -0,0 +1,104 @@
+from sqlalchemy import inspect, text
+from database import create_db_engine, init_db
+import crud
+
+def test_engine_uses_wal_and_indexes(db_session):
+    db_engine, db = db_session
+    assert db.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+    inspector = inspect(db_engine)
+    plan_indexes = {tuple(i["column_names"]) for i in inspector.get_indexes("teaching_plan")}
+    assert ("class_id",) in plan_indexes and ("teacher_id",) in plan_indexes
+    schedule_indexes = {tuple(i["column_names"]) for i in inspector.get_indexes("schedules")}
+    assert ("school_id", "created_at") in schedule_indexes
+
+def test_init_db_migrates_old_schedules_table(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with db_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE schedules (id INTEGER PRIMARY KEY, name VARCHAR, lessons JSON, created_at VARCHAR)"))
+    init_db(db_engine)
+    columns = {c["name"] for c in inspect(db_engine).get_columns("schedules")}
+    assert {"school_id", "lesson_count"} <= columns
+
+def test_plan_roundtrip(db_session):
+    _, db = db_session
+    crud.save_plan(
+        db,
+        subjects=[{"id": "math", "name": "Math"}],
+        teachers=[{"id": "t1", "name": "John Doe", "subjects": ["math"], "availability": {"Mon": [1]}}],
+        classes=[{"id": "c1", "name": "5-A"}],
+        plan=[{"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "hours_per_week": 4}],
+    )
+    # Saving again replaces instead of duplicating
+    crud.save_plan(
+        db,
+        subjects=[{"id": "math", "name": "Math"}],
+        teachers=[{"id": "t1", "name": "John Doe", "subjects": ["math"], "availability": {"Mon": [1]}}],
+        classes=[{"id": "c1", "name": "5-A"}],
+        plan=[{"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "hours_per_week": 4}],
+    )
+    data = crud.load_plan(db)
+    assert data["teachers"][0]["subjects"] == ["math"]
+    assert data["teachers"][0]["availability"] == {"Mon": [1]}
+    assert data["plan"] == [{"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "hours_per_week": 4}]
+
+def test_schedule_roundtrip(db_session):
+    _, db = db_session
+    lessons = [
+        {"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "day": "Mon", "period": 1},
+        {"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "day": "Fri", "period": 2},
+    ]
+    first = crud.save_schedule(db, lessons, name="v1", school_id="s1")
+    second = crud.save_schedule(db, lessons[:1], name="v2", school_id="s1")
+    crud.save_schedule(db, lessons, school_id="other")
+
+    assert crud.load_schedule(db, first)["lessons"] == lessons
+    assert crud.load_schedule(db, 999) is None
+
+    headers = crud.list_schedules(db, school_id="s1")
+    assert [h["id"] for h in headers] == [second, first]
+    assert headers[0]["lesson_count"] == 1
+
+    loaded = crud.load_schedules(db, [first, second])
+    assert loaded[second] == lessons[:1]
+
+def test_versions_store_deltas_and_snapshots(monkeypatch, db_session):
+    monkeypatch.setattr(crud, "SNAPSHOT_INTERVAL", 3)
+    _, db = db_session
+    base = [
+        {"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "day": d, "period": p}
+        for d in ("Mon", "Tue", "Wed") for p in (1, 2, 3)
+    ]
+    schedule_id = crud.save_schedule(db, base, school_id="s1")
+
+    history = [base]
+    current = base
+    for i in range(4):
+        current = current[1:] + [{"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "day": "Fri", "period": i + 1}]
+        crud.add_schedule_version(db, schedule_id, current, label=f"edit {i}")
+        history.append(current)
+
+    versions = crud.list_versions(db, schedule_id)
+    assert [v["version"] for v in versions] == [1, 2, 3, 4, 5]
+    assert [v["is_snapshot"] for v in versions] == [True, False, False, True, False]
+
+    loaded = crud.load_versions(db, schedule_id, [1, 2, 3, 4, 5])
+    for version, lessons in enumerate(history, start=1):
+        key = lambda l: (l["day"], l["period"])
+        assert sorted(loaded[version], key=key) == sorted(lessons, key=key)
+
+    assert crud.load_schedule(db, schedule_id)["head_version"] == 5
+    assert crud.load_versions(db, schedule_id, [6]) is None
+
+def test_unversioned_schedule_becomes_base_version(db_session):
+    db_engine, db = db_session
+    lesson = {"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "day": "Mon", "period": 1}
+    with db_engine.begin() as conn:
+        conn.execute(text("INSERT INTO schedules (id, name, lessons, created_at) VALUES (1, 'old', :lessons, '2025-01-01')"),
+                     {"lessons": '[{"class_id": "c1", "subject_id": "math", "teacher_id": "t1", "day": "Mon", "period": 1}]'})
+    assert crud.load_schedule(db, 1)["lessons"] == [lesson]
+    assert crud.load_versions(db, 1, [1]) == {1: [lesson]}
+
+    moved = {**lesson, "period": 2}
+    crud.add_schedule_version(db, 1, [moved])
+    assert crud.load_versions(db, 1, [1, 2]) == {1: [lesson], 2: [moved]}
@@ -0,0 +1,41 @@
+from collections import Counter
+import pytest
+from solver import generate_schedule
+from logic.context import build_context
+from logic.decomposition import solve_day_assignment, sequence_day
+from logic.engine import feasible_periods
+
+@pytest.fixture
+def make_request(grid_request):
+    def make(classes=4, subjects=5, hours=4):
+        return grid_request(classes, subjects, hours, availability={0: {"Wed": [1, 2, 3]}}, strategy="decomposition")
+    return make
+
+def test_decomposition_places_every_lesson_without_clashes(make_request):
+    request = make_request()
+    result = generate_schedule(request)
+    assert result["status"] == "success", result.get("violations") or result.get("message")
+    schedule = result["schedule"]
+    assert len(schedule) == 4 * 5 * 4
+    assert max(Counter((l["teacher_id"], l["day"], l["period"]) for l in schedule).values()) == 1
+    assert max(Counter((l["class_id"], l["day"], l["period"]) for l in schedule).values()) == 1
+    assert not any(l["teacher_id"] == "t0" and l["day"] == "Wed" and l["period"] in [1, 2, 3] for l in schedule)
+
+def test_day_assignment_respects_teacher_day_capacity_and_cuts(make_request):
+    request = make_request(classes=2, subjects=2, hours=5)
+    ctx = build_context(request)
+    periods = list(range(1, 8))
+    domains = {t: feasible_periods(ctx, t, periods) for t in ctx.teacher_requests}
+    assignment = solve_day_assignment(ctx, periods, domains, [], 5.0, None)
+    assert [sum(row) for row in assignment] == [r.count for r in ctx.requests]
+    # Teacher t0 has 4 free periods on Wednesday
+    assert sum(assignment[r][2] for r in ctx.teacher_requests["t0"]) <= 4
+
+    wednesday = tuple(row[2] for row in assignment)
+    cut = solve_day_assignment(ctx, periods, domains, [(2, wednesday)], 5.0, None)
+    assert tuple(row[2] for row in cut) != wednesday
+
+def test_sequence_day_reports_unplaceable_day():
+    # Two lessons of the same teacher but only one free period
+    lessons = [(0, "c1", "t1", 1), (1, "c2", "t1", 1)]
+    assert sequence_day(0, lessons, {"t1": [3]}, list(range(1, 8)), {}, True, 2.0, 1) == (0, None)
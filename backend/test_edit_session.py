@@ -0,0 +1,93 @@
+import random
+from models import ScheduleRequest, Teacher, Subject, ClassGroup, TeachingPlanItem
+from logic.edit_session import EditSession, EditSessionStore
+import pytest
+
+
+def make_data():
+    return ScheduleRequest(
+        teachers=[
+            Teacher(id="t1", name="Teacher 1", subjects=["s1"]),
+            Teacher(id="t2", name="Teacher 2", subjects=["s2"], availability={"Tue": [1]}),
+        ],
+        subjects=[Subject(id="s1", name="Math"), Subject(id="s2", name="Art")],
+        classes=[ClassGroup(id="c1", name="5A"), ClassGroup(id="c2", name="5B")],
+        plan=[
+            TeachingPlanItem(class_id="c1", subject_id="s1", teacher_id="t1", hours_per_week=2),
+            TeachingPlanItem(class_id="c1", subject_id="s2", teacher_id="t2", hours_per_week=1),
+            TeachingPlanItem(class_id="c2", subject_id="s1", teacher_id="t1", hours_per_week=1),
+        ],
+    )
+
+
+LESSONS = [
+    {"class_id": "c1", "subject_id": "s1", "teacher_id": "t1", "day": "Mon", "period": 1},
+    {"class_id": "c1", "subject_id": "s1", "teacher_id": "t1", "day": "Mon", "period": 2},
+    {"class_id": "c1", "subject_id": "s2", "teacher_id": "t2", "day": "Mon", "period": 3},
+    {"class_id": "c2", "subject_id": "s1", "teacher_id": "t1", "day": "Tue", "period": 1},
+]
+
+
+def test_check_reports_introduced_violations_without_changing_state():
+    session = EditSession(1, LESSONS, make_data())
+    assert session.violations() == []
+
+    result = session.edit(3, "Mon", 2)
+    assert not result["allowed"] and not result["applied"]
+    assert any("одночасно в класах" in msg for msg in result["introduced"])
+    assert session.lessons[3]["day"] == "Tue" and session.violations() == []
+
+    blocked = session.edit(2, "Tue", 1)
+    assert any("недоступний" in msg for msg in blocked["introduced"])
+
+
+def test_apply_then_undo_resolves_the_same_violations():
+    session = EditSession(1, LESSONS, make_data())
+    applied = session.edit(0, "Mon", 5, apply=True)
+    assert applied["applied"] and applied["lessons"][0]["period"] == 5
+    assert set(session.violations()) == set(applied["introduced"])
+
+    undone = session.edit(0, "Mon", 1, apply=True)
+    assert set(undone["resolved"]) == set(applied["introduced"])
+    assert session.violations() == [] and session.moves == 2
+
+
+def test_swap_exchanges_slots():
+    session = EditSession(1, LESSONS, make_data())
+    result = session.edit(0, swap_with=2, apply=True)
+    assert result["allowed"]
+    assert (session.lessons[0]["period"], session.lessons[2]["period"]) == (3, 1)
+    # Art moves on to period 2, math back to period 1
+    assert session.edit(1, swap_with=2)["allowed"]
+
+
+def test_invalid_moves_raise():
+    session = EditSession(1, LESSONS, make_data())
+    with pytest.raises(ValueError):
+        session.edit(10, "Mon", 1)
+    with pytest.raises(ValueError):
+        session.edit(0, "Sun", 1)
+    with pytest.raises(ValueError):
+        session.edit(0, "Mon", 9)
+
+
+def test_incremental_issues_match_a_fresh_session():
+    data = make_data()
+    session = EditSession(1, LESSONS, data)
+    rng = random.Random(7)
+    for _ in range(200):
+        if rng.random() < 0.3:
+            session.edit(rng.randrange(4), swap_with=rng.randrange(4), apply=True)
+        else:
+            session.edit(rng.randrange(4), rng.choice(["Mon", "Tue"]), rng.randrange(0, 6), apply=rng.random() < 0.7)
+        assert sorted(session.violations()) == sorted(EditSession(1, session.schedule(), data).violations())
+
+
+def test_store_evicts_least_recently_used():
+    store = EditSessionStore(max_sessions=2)
+    first = store.add(EditSession(1, LESSONS, make_data()))
+    second = store.add(EditSession(2, LESSONS, make_data()))
+    assert store.get(first) is not None
+    store.add(EditSession(3, LESSONS, make_data()))
+    assert store.get(second) is None and store.get(first) is not None
+    assert store.remove(first) and not store.remove(first)
@@ -0,0 +1,55 @@
+from models import ScheduleRequest, Teacher, Subject, ClassGroup, TeachingPlanItem
+from logic.context import DAYS
+from logic.feasibility import check_feasibility
+
+
+def free_only(*slots):
+    """Availability that blocks every period 0-7 except `slots`."""
+    return {d: [p for p in range(8) if (d, p) not in slots] for d in DAYS}
+
+
+def make_request(plan, t3_free=None):
+    return ScheduleRequest(
+        teachers=[
+            Teacher(id="t1", name="T1", subjects=["s1", "s2"], availability=free_only(("Mon", 1), ("Mon", 2))),
+            Teacher(id="t2", name="T2", subjects=["s1", "s2"], availability=free_only(("Mon", 1))),
+            Teacher(id="t3", name="T3", subjects=["s1", "s2"], availability=t3_free or free_only(("Mon", 1))),
+            Teacher(id="t4", name="T4", subjects=["s1", "s2"]),
+        ],
+        subjects=[Subject(id="s1", name="Math"), Subject(id="s2", name="Art")],
+        classes=[ClassGroup(id="c1", name="5A"), ClassGroup(id="c2", name="6B"), ClassGroup(id="c3", name="7C")],
+        plan=[TeachingPlanItem(class_id=c, subject_id=s, teacher_id=t, hours_per_week=h) for c, s, t, h in plan],
+    )
+
+
+# T2 and T3 can only teach Mon 1, so T1 has to teach both 5A and 6B in Mon 2
+CLASHING_PLAN = [("c1", "s1", "t1", 1), ("c1", "s2", "t2", 1), ("c2", "s1", "t1", 1), ("c2", "s2", "t3", 1), ("c3", "s1", "t4", 5)]
+
+
+def test_infeasible_plan_names_the_clashing_rows():
+    result = check_feasibility(make_request(CLASHING_PLAN))
+    assert result["status"] == "infeasible"
+    assert result["checks"]["capacity"] == "passed" and result["checks"]["relaxed"] == "infeasible"
+    # 7C and T4 are schedulable and must not be blamed
+    assert {t["id"] for t in result["teachers"]} <= {"t1", "t2", "t3"} and "t1" in {t["id"] for t in result["teachers"]}
+    assert {c["id"] for c in result["classes"]} == {"c1", "c2"}
+    assert result["reasons"]
+
+
+def test_feasible_plan_reports_the_strict_level():
+    result = check_feasibility(make_request(CLASHING_PLAN, t3_free=free_only(("Mon", 1), ("Mon", 2))))
+    assert result["status"] == "feasible" and result["level"] == "strict"
+    assert result["elapsed"] < 5
+
+    # With T3 free in Mon 3 instead, 6B can only get Mon 1 and Mon 3: a gap
+    relaxed = check_feasibility(make_request(CLASHING_PLAN, t3_free=free_only(("Mon", 1), ("Mon", 3))))
+    assert relaxed["status"] == "feasible" and relaxed["level"] == "relaxed"
+    assert relaxed["checks"]["strict"] == "infeasible"
+
+
+def test_capacity_checks_run_before_the_solver():
+    # 5A needs three lessons, but its teachers are only free in Mon 1 and Mon 2
+    result = check_feasibility(make_request([("c1", "s1", "t1", 2), ("c1", "s2", "t2", 1)]))
+    assert result["status"] == "infeasible" and result["checks"]["capacity"] == "failed"
+    assert "relaxed" not in result["checks"]
+    assert [c["id"] for c in result["classes"]] == ["c1"]
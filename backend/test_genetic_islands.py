@@ -0,0 +1,98 @@
+import queue
+import random
+from collections import Counter
+import pytest
+from logic.context import build_context
+from logic.greedy import greedy_schedule
+from solver import generate_schedule
+from logic.genetic_solver import GeneticSolver, AdaptiveStrength, IslandConfig, crossover, initial_population_worker, island_worker, schedule_fitness
+from logic.schedule_diff import schedule_hash
+
+@pytest.fixture
+def make_request(grid_request):
+    return lambda: grid_request(4, 5, strategy="genetic")
+
+def test_crossover_child_is_complete_and_clash_free(make_request):
+    ctx = build_context(make_request())
+    first, _ = greedy_schedule(ctx, list(range(1, 8)), seed=1)
+    second, _ = greedy_schedule(ctx, list(range(1, 8)), seed=2)
+    rng = random.Random(0)
+    for _ in range(20):
+        child = crossover(ctx, first, second, rng)
+        assert len(child) == 4 * 5 * 4
+        assert max(Counter((l["teacher_id"], l["day"], l["period"]) for l in child).values()) == 1
+        assert max(Counter((l["class_id"], l["day"], l["period"]) for l in child).values()) == 1
+        assert Counter((l["class_id"], l["subject_id"]) for l in child) == Counter({(f"c{c}", f"s{i}"): 4 for c in range(4) for i in range(5)})
+
+def test_fitness_penalizes_missing_lessons(make_request):
+    ctx = build_context(make_request())
+    schedule, _ = greedy_schedule(ctx, list(range(1, 8)), seed=1)
+    assert schedule_fitness(schedule[:-1], ctx) < schedule_fitness(schedule, ctx)
+
+def test_islands_migrate_and_return_best(monkeypatch, make_request):
+    solver = GeneticSolver(make_request(), population_size=4, generations=2, mutation_rate=0.0)
+    monkeypatch.setattr(solver, "island_layout", lambda: (2, 2))
+    updates = []
+    solver.progress_callback = lambda progress, message: updates.append(progress)
+    result = solver.evolve()
+    assert len(result) == 4 * 5 * 4
+    assert solver.best_score == schedule_fitness(result, solver.ctx)
+    assert updates[-1] == 95
+    assert solver.stats["migrants_sent"] == 2  # Each island sends its best after generation 2
+
+def test_island_accepts_migrants_from_its_inbox(make_request):
+    request = make_request()
+    ctx = build_context(request)
+    migrant, _ = greedy_schedule(ctx, list(range(1, 8)), seed=12345)
+    inbox, outbox, status = queue.Queue(), queue.Queue(), queue.Queue()
+    inbox.put(migrant)
+    _, _, stats, _ = island_worker(request, ctx, 0, IslandConfig(2, 2, 0.0, seed=7), inbox, outbox, status)
+    assert stats["migrants_sent"] == 1 and stats["migrants_received"] == 1
+    assert outbox.qsize() == 1 and inbox.empty()
+
+def test_adaptive_strength_follows_success_rate():
+    strength = AdaptiveStrength(0.25)
+    for _ in range(AdaptiveStrength.WINDOW):
+        strength.record(True)
+    assert strength.strength > 0.25
+    for _ in range(3 * AdaptiveStrength.WINDOW):
+        strength.record(False)
+    assert AdaptiveStrength.MIN <= strength.strength < 0.25
+
+def test_time_budget_and_stagnation_stop_unbounded_evolution(make_request):
+    request = make_request()
+    request.genetic_population_size = 2
+    request.genetic_time_budget = 3
+    request.genetic_stagnation_limit = 4
+    result = generate_schedule(request)
+    stats = result["genetic"]
+    assert result["status"] in ["success", "conflict"]
+    assert stats["elapsed"] < 10
+    assert set(stats["stop_reasons"]) <= {"time_budget", "stagnation"}
+    assert stats["evaluations"] >= 2 and stats["evaluations_per_second"] > 0
+
+def test_seeded_population_is_diverse_and_hash_is_canonical(make_request):
+    request = make_request()
+    ctx = build_context(request)
+    seeds = [initial_population_worker(request, ctx, seed) for seed in range(3)]
+    assert all(len(s) == 4 * 5 * 4 for s in seeds)
+    assert len({schedule_hash(s) for s in seeds}) == len(seeds)
+    assert schedule_hash(seeds[0]) == schedule_hash(list(reversed(seeds[0])))
+    assert schedule_hash(initial_population_worker(request, ctx, 3)) == schedule_hash(initial_population_worker(request, ctx, 3))
+
+def test_cascade_passes_share_the_time_budget(monkeypatch, make_request):
+    import time
+    import logic.genetic_solver as genetic_solver
+    limits = []
+    monkeypatch.setattr(genetic_solver, "ortools_solve", lambda *args, time_limit=None, **kwargs: (limits.append(time_limit), (None, ""))[1])
+    request = make_request()
+    ctx = build_context(request)
+    schedule, _ = greedy_schedule(ctx, list(range(1, 8)), seed=1)
+
+    assert genetic_solver.mutate_schedule(request, schedule, ctx, strength=0.2, time_limit=3.0) == schedule
+    # Each pass gets an even share of what is left: a third, half of the rest, all of the rest (the stub takes no time)
+    assert [round(l, 1) for l in limits] == [1.0, 1.5, 3.0]
+
+    limits.clear()
+    assert genetic_solver.initial_population_worker(request, ctx, seed=1, deadline=time.time() - 1) is None
+    assert limits == []
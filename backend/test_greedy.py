@@ -0,0 +1,41 @@
+from collections import Counter
+import pytest
+from solver import generate_schedule
+from logic.context import build_context
+from logic.engine import build_cp_model
+from logic.greedy import greedy_schedule, window_count
+
+@pytest.fixture
+def make_request(grid_request):
+    return lambda: grid_request(5, 6, availability={0: {"Mon": [1, 2, 3, 4]}}, strategy="greedy")
+
+def test_window_count():
+    assert window_count(0) == 0
+    assert window_count(0b1110) == 0
+    assert window_count(0b10110) == 1
+
+def test_greedy_places_all_lessons_without_clashes(make_request):
+    ctx = build_context(make_request())
+    schedule, unplaced = greedy_schedule(ctx, list(range(1, 8)))
+    assert unplaced == 0
+    assert len(schedule) == 5 * 6 * 4
+    assert max(Counter((l["teacher_id"], l["day"], l["period"]) for l in schedule).values()) == 1
+    assert max(Counter((l["class_id"], l["day"], l["period"]) for l in schedule).values()) == 1
+    assert not any(l["teacher_id"] == "t0" and l["day"] == "Mon" and l["period"] <= 4 for l in schedule)
+
+def test_greedy_seeds_vary_the_timetable(make_request):
+    ctx = build_context(make_request())
+    key = lambda l: (l["class_id"], l["day"], l["period"], l["subject_id"])
+    first = sorted(map(key, greedy_schedule(ctx, list(range(1, 8)), seed=1)[0]))
+    second = sorted(map(key, greedy_schedule(ctx, list(range(1, 8)), seed=2)[0]))
+    assert first != second
+
+def test_greedy_strategy_and_hint(make_request):
+    result = generate_schedule(make_request())
+    assert result["status"] in ["success", "conflict"]
+    assert len(result["schedule"]) == 5 * 6 * 4
+
+    ctx = build_context(make_request())
+    built = build_cp_model(ctx, list(range(1, 8)), hint=result["schedule"])
+    assert len(built.model.Proto().solution_hint.vars) == 5 * 6 * 4
+    assert set(built.model.Proto().solution_hint.values) == {1}
@@ -0,0 +1,47 @@
+from collections import Counter
+import pytest
+from solver import generate_schedule
+from logic.context import build_context
+from logic.greedy import greedy_schedule
+from logic.local_search import LocalSearch
+
+@pytest.fixture
+def make_request(grid_request):
+    return lambda: grid_request(5, 6, hours=5, availability={1: {"Tue": [5, 6, 7]}}, strategy="local_search", timeout=5)
+
+def test_incremental_cost_matches_full_evaluation(make_request):
+    ctx = build_context(make_request())
+    schedule, _ = greedy_schedule(ctx, list(range(1, 8)), seed=3)
+    search = LocalSearch(ctx, schedule, list(range(1, 8)), seed=3)
+    for _ in range(5000):
+        i = search.rng.randrange(len(schedule))
+        proposal = search.propose_move(i) if search.rng.random() < 0.5 else search.propose_swap(i)
+        if proposal:
+            search.apply(proposal[1], proposal[0])
+    assert search.cost == search.total_cost()
+
+def test_local_search_strategy_keeps_hard_rules(make_request):
+    result = generate_schedule(make_request())
+    assert result["status"] in ["success", "conflict"]
+    schedule = result["schedule"]
+    assert len(schedule) == 5 * 6 * 5
+    assert max(Counter((l["teacher_id"], l["day"], l["period"]) for l in schedule).values()) == 1
+    assert max(Counter((l["class_id"], l["day"], l["period"]) for l in schedule).values()) == 1
+    assert not any(l["teacher_id"] == "t1" and l["day"] == "Tue" and l["period"] >= 5 for l in schedule)
+    stats = result["local_search"]
+    assert stats["best_cost"] <= stats["start_cost"]
+    assert stats["elapsed"] < 6
+
+def test_missing_start_lessons_are_inserted(make_request):
+    from logic.local_search import local_search_solve
+    data = make_request()
+    ctx = build_context(data)
+    schedule, _ = greedy_schedule(ctx, list(range(1, 8)), seed=3)
+    result, stats = local_search_solve(data, list(range(1, 8)), ctx=ctx, time_limit=2, initial=schedule[:-10], seed=3)
+    assert len(result) == len(schedule) and stats["unplaced"] == 0
+    assert max(Counter((l["class_id"], l["day"], l["period"]) for l in result).values()) == 1
+
+    search = LocalSearch(ctx, schedule[:-1], list(range(1, 8)), seed=3)
+    last = schedule[-1]
+    assert search.insert(next(r.index for r in ctx.requests if (r.class_id, r.subject_id) == (last["class_id"], last["subject_id"])))
+    assert search.cost == search.total_cost()
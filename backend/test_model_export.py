@@ -0,0 +1,49 @@
+import os
+import pytest
+from solver import generate_schedule
+from logic.model_export import load_bundle, bundle_models, parse_param, replay_cp_model, replay_pulp_model
+
+
+@pytest.fixture
+def bundles(tmp_path, monkeypatch):
+    monkeypatch.setenv("SCHEDULER_BUNDLE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_cp_sat_bundle_replays_the_production_model(bundles, pins_request, pins):
+    result = generate_schedule(pins_request(pins, export_bundle="school-1"))
+    assert result["status"] == "success"
+
+    manifest, data = load_bundle(str(bundles / "school-1"))
+    assert data.pinned_lessons and data.export_bundle is None
+    assert manifest["models"] == ["cp_sat_strict.pbtxt"] and manifest["passes"] == result["solver_stats"]
+
+    stats = replay_cp_model(bundle_models(str(bundles / "school-1"))[0], {"num_workers": 1, "random_seed": 3})
+    assert stats["status"] == "OPTIMAL"
+    assert stats["variables"] == manifest["passes"][0]["variables"] and stats["objective"] == manifest["passes"][0]["objective"]
+
+
+def test_pulp_bundle_and_invalid_ids(bundles, pins_request, pins):
+    result = generate_schedule(pins_request(export_bundle="school-2", strategy="pulp", timeout=20))
+    assert result["status"] == "success"
+    (model_path,) = bundle_models(str(bundles / "school-2"))
+    assert model_path.endswith("pulp_strict.mps")
+    stats = replay_pulp_model(model_path, time_limit=20)
+    assert stats["status"] == "Optimal" and stats["objective"] == pytest.approx(result["solver_stats"][0]["objective"])
+
+    # Re-using the id replaces the earlier run's models
+    generate_schedule(pins_request(pins, export_bundle="school-2"))
+    manifest, _ = load_bundle(str(bundles / "school-2"))
+    assert manifest["models"] == ["cp_sat_strict.pbtxt"]
+    assert [os.path.basename(p) for p in bundle_models(str(bundles / "school-2"))] == ["cp_sat_strict.pbtxt"]
+
+    result = generate_schedule(pins_request(export_bundle="../elsewhere"))
+    assert result["status"] == "error" and not os.path.exists(bundles.parent / "elsewhere")
+
+
+def test_parse_param():
+    assert parse_param("num_workers=8") == ("num_workers", 8)
+    assert parse_param("relative_gap_limit=0.05") == ("relative_gap_limit", 0.05)
+    assert parse_param("repair_hint=false") == ("repair_hint", False)
+    with pytest.raises(ValueError):
+        parse_param("num_workers")
@@ -0,0 +1,100 @@
+from solver import generate_schedule
+from logic.context import build_context
+from logic.engine import build_cp_model, ortools_solve
+from logic.pins import pin_domains
+from logic.pulp_solver.core import solve_with_pulp
+
+PERIODS = list(range(1, 8))
+
+
+def lesson(class_id, subject_id, teacher_id, day, period):
+    return {"class_id": class_id, "subject_id": subject_id, "teacher_id": teacher_id, "day": day, "period": period}
+
+
+FORBIDDEN = [{"teacher_id": "t1", "day": "Mon"}, {"class_id": "c2", "day": "Tue", "period": 1}]
+
+
+def test_pins_close_teacher_and_class_slots(pins_request, pins):
+    ctx = build_context(pins_request(pins, FORBIDDEN))
+    domains = pin_domains(ctx, PERIODS)
+    assert domains.remaining == [3, 3, 3, 3] and not domains.dropped
+    # Wed 1 is closed for every request of T1, T2, 5A and 6B; Monday for every T1 request
+    assert not any(domains.is_open(r, 2, 1) for r in range(4))
+    assert not domains.is_open(0, 0, 3) and domains.is_open(1, 0, 3)
+    assert not domains.is_open(3, 1, 1) and domains.is_open(3, 1, 2)
+
+
+def test_invalid_pins_are_dropped_with_a_reason(pins_request, pins):
+    ctx = build_context(pins_request(pins + [lesson("c2", "s2", "t2", "Wed", 1), lesson("c1", "s1", "t2", "Mon", 1), lesson("c1", "s1", "t1", "Mon", 2)], FORBIDDEN))
+    domains = pin_domains(ctx, PERIODS)
+    assert len(domains.pinned) == 2 and len(domains.dropped) == 3
+
+    result = generate_schedule(pins_request([lesson("c1", "s1", "t1", "Mon", 1)], FORBIDDEN))
+    assert result["status"] == "error" and "закріплених" in result["message"]
+
+
+def test_pinned_lessons_get_no_variables(pins_request, pins):
+    ctx = build_context(pins_request())
+    pinned_ctx = build_context(pins_request(pins))
+    free, reduced = build_cp_model(ctx, PERIODS), build_cp_model(pinned_ctx, PERIODS)
+    assert reduced.stats["pinned_lessons"] == 2
+    assert reduced.stats["lesson_vars"] < free.stats["lesson_vars"]
+    assert all(p != 1 for (_, d, p) in reduced.x if d == 2)
+
+
+def check_schedule(schedule, pins):
+    keys = {tuple(l.values()) for l in schedule}
+    assert len(schedule) == 14
+    assert all(tuple(p.values()) in keys for p in pins)
+    assert not any(l["teacher_id"] == "t1" and l["day"] == "Mon" for l in schedule)
+    assert not any(l["class_id"] == "c2" and l["day"] == "Tue" and l["period"] == 1 for l in schedule)
+
+
+def test_cp_sat_and_pulp_respect_pins_and_forbidden_slots(pins_request, pins):
+    data = pins_request(pins, FORBIDDEN)
+    schedule, _ = ortools_solve(data, PERIODS)
+    check_schedule(schedule, pins)
+    schedule, _ = solve_with_pulp(data, PERIODS, timeout=20)
+    check_schedule(schedule, pins)
+
+    result = generate_schedule(data)
+    assert result["status"] == "success"
+    check_schedule(result["schedule"], pins)
+
+
+def test_period_zero_pin_is_kept_by_the_cascade(pins_request):
+    pin = lesson("c1", "s1", "t1", "Wed", 0)
+    assert pin_domains(build_context(pins_request([pin])), PERIODS).dropped
+    schedule, error = solve_with_pulp(pins_request([pin]), PERIODS, timeout=20)
+    assert schedule is None and "закріплених" in error
+
+    result = generate_schedule(pins_request([pin]))
+    assert result["status"] != "success"
+    assert pin in result["schedule"]
+    assert [s["pass"] for s in result["solver_stats"]] == ["strict", "diagnostic", "emergency"]
+
+
+def test_other_strategies_reject_pins_and_forbidden_slots(pins_request):
+    for strategy in ("greedy", "local_search", "decomposition", "genetic"):
+        result = generate_schedule(pins_request(forbidden=[{"day": "Mon"}], strategy=strategy))
+        assert result["status"] == "error" and strategy in result["message"]
+
+
+def test_analyzer_reports_missing_pins_and_forbidden_lessons(pins_request, pins):
+    from logic.analyzer import analyze_violations
+    data = pins_request(pins, FORBIDDEN)
+    schedule, _ = ortools_solve(data, PERIODS)
+    assert not analyze_violations(schedule, data)
+
+    moved = [dict(l, day="Mon") if l["teacher_id"] == "t1" and l["day"] == "Wed" and l["period"] == 1 else l for l in schedule]
+    violations = analyze_violations(moved, data)
+    assert any("закріплений урок" in v for v in violations)
+    assert any("забороненому слоті" in v for v in violations)
+
+
+def test_forbidden_slots_are_validated(pins_request):
+    import pytest
+    from pydantic import ValidationError
+    for rule in ({"day": "Mon", "period": -1}, {"day": "Mon", "period": 9}, {"day": "Sat"}):
+        with pytest.raises(ValidationError):
+            pins_request(forbidden=[rule])
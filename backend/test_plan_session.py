@@ -0,0 +1,81 @@
+import random
+from models import ScheduleRequest, Teacher, Subject, ClassGroup, TeachingPlanItem
+from logic.plan_session import PlanSession
+from logic.preprocessor import validate_workloads, EMPTY_PLAN_ERROR
+import pytest
+
+
+def make_data(plan):
+    return ScheduleRequest(
+        teachers=[
+            Teacher(id="t1", name="Teacher 1", subjects=["s1", "s2"]),
+            Teacher(id="t2", name="Teacher 2", subjects=["s2"], availability={"Mon": list(range(9)), "Tue": list(range(9))}),
+        ],
+        subjects=[Subject(id="s1", name="Math"), Subject(id="s2", name="Art")],
+        classes=[ClassGroup(id="c1", name="5A"), ClassGroup(id="c2", name="6B")],
+        plan=plan,
+    )
+
+
+def row(class_id, subject_id, teacher_id, hours):
+    return TeachingPlanItem(class_id=class_id, subject_id=subject_id, teacher_id=teacher_id, hours_per_week=hours)
+
+
+def test_edit_returns_only_the_changed_messages():
+    session = PlanSession(make_data([row("c1", "s1", "t1", 5), row("c2", "s2", "t2", 3)]))
+    assert session.errors_list() == []
+
+    duplicate = session.edit([(None, row("c1", "s1", "t1", 2))])
+    assert duplicate["row_ids"] == [2]
+    assert duplicate["added"] == ["• Клас '5A', предмет 'Math': дублікат в плані"]
+    assert duplicate["teacher_loads"] == {} and duplicate["error_count"] == 1
+
+    # Deleting the first row promotes the duplicate to the counted row
+    promoted = session.edit([(0, None)])
+    assert promoted["removed"] == duplicate["added"] and promoted["added"] == []
+    assert promoted["teacher_loads"] == {"t1": 2} and promoted["class_loads"] == {"c1": 2}
+
+    # Teacher 2 has 22 free slots after the blocked days
+    overload = session.edit([(1, row("c2", "s2", "t2", 23))])
+    assert overload["added"] == ["• Вчитель Teacher 2 має 23 год/тиждень, але з урахуванням графіка доступно лише 22 слотів"]
+
+    unqualified = session.edit([(1, row("c2", "s1", "t2", 3))])
+    assert overload["added"][0] in unqualified["removed"]
+    assert unqualified["added"] == ["• Клас '6B', предмет 'Math': вчитель Teacher 2 не викладає цей предмет"]
+
+
+def test_empty_plan_is_reported_like_validate_workloads():
+    session = PlanSession(make_data([row("c1", "s1", "t1", 2)]))
+    emptied = session.edit([(0, row("c1", "s1", "t1", 0))])
+    assert emptied["added"] == [EMPTY_PLAN_ERROR] and session.errors_list() == [EMPTY_PLAN_ERROR]
+    refilled = session.edit([(0, row("c1", "s1", "t1", 1))])
+    assert refilled["removed"] == [EMPTY_PLAN_ERROR] and session.errors_list() == []
+
+
+def test_unknown_rows_are_rejected():
+    session = PlanSession(make_data([row("c1", "s1", "t1", 2)]))
+    with pytest.raises(ValueError):
+        session.edit([(5, None)])
+
+
+def test_incremental_errors_match_a_full_validation():
+    rng = random.Random(3)
+    choices = dict(class_id=["c1", "c2", "cX"], subject_id=["s1", "s2", "sX"], teacher_id=["t1", "t2", "", "tX"], hours=[-1, 0, 1, 4, 12, 25])
+
+    def random_row():
+        return row(*(rng.choice(choices[k]) for k in ["class_id", "subject_id", "teacher_id", "hours"]))
+
+    session = PlanSession(make_data([random_row() for _ in range(6)]))
+    for _ in range(300):
+        roll = rng.random()
+        if roll < 0.2 and session.rows:
+            result = session.edit([(rng.choice(list(session.rows)), None)])
+        elif roll < 0.5:
+            result = session.edit([(None, random_row())])
+        elif session.rows:
+            result = session.edit([(rng.choice(list(session.rows)), random_row())])
+        else:
+            continue
+        expected = validate_workloads(make_data(session.plan()))
+        assert sorted(session.errors_list()) == sorted(expected)
+        assert result["error_count"] == len(expected)
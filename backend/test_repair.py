@@ -0,0 +1,55 @@
+from models import ScheduleRequest, Teacher, Subject, ClassGroup, TeachingPlanItem, Lesson
+from solver import generate_schedule
+
+def make_request(availability=None):
+    subjects = [Subject(id="math", name="Math"), Subject(id="eng", name="English"), Subject(id="art", name="Art")]
+    teachers = [
+        Teacher(id="t1", name="Math Teacher", subjects=["math"], availability=availability),
+        Teacher(id="t2", name="English Teacher", subjects=["eng"]),
+        Teacher(id="t3", name="Art Teacher", subjects=["art"]),
+    ]
+    classes = [ClassGroup(id="c1", name="7-A"), ClassGroup(id="c2", name="8-A")]
+    plan = [
+        TeachingPlanItem(class_id="c1", subject_id="math", teacher_id="t1", hours_per_week=5),
+        TeachingPlanItem(class_id="c1", subject_id="eng", teacher_id="t2", hours_per_week=4),
+        TeachingPlanItem(class_id="c2", subject_id="eng", teacher_id="t2", hours_per_week=4),
+        TeachingPlanItem(class_id="c2", subject_id="art", teacher_id="t3", hours_per_week=3),
+    ]
+    return ScheduleRequest(teachers=teachers, subjects=subjects, classes=classes, plan=plan)
+
+def test_repair_requires_current_schedule():
+    request = make_request()
+    request.mode = "repair"
+    assert generate_schedule(request)["status"] == "error"
+
+def test_repair_moves_only_affected_lessons():
+    original = generate_schedule(make_request())
+    assert original["status"] == "success"
+    current = original["schedule"]
+
+    # Math teacher can no longer teach on the days/periods they currently teach on Monday
+    blocked = sorted(l["period"] for l in current if l["teacher_id"] == "t1" and l["day"] == "Mon")
+    request = make_request(availability={"Mon": blocked} if blocked else {"Mon": [1]})
+    request.mode = "repair"
+    request.current_schedule = [Lesson(**l) for l in current]
+
+    result = generate_schedule(request)
+    assert result["status"] in ["success", "conflict"]
+    schedule = result["schedule"]
+    assert len(schedule) == len(current)
+    assert not any(l["teacher_id"] == "t1" and l["day"] == "Mon" and l["period"] in blocked for l in schedule)
+
+    # Class c2 does not involve the math teacher: untouched
+    key = lambda l: (l["day"], l["period"], l["subject_id"])
+    assert sorted((l for l in schedule if l["class_id"] == "c2"), key=key) == sorted((l for l in current if l["class_id"] == "c2"), key=key)
+    assert result["repair"]["dropped"] == len(blocked)
+    assert result["repair"]["moved"] <= len(blocked) + 2
+
+def test_repair_without_changes_returns_current_schedule():
+    original = generate_schedule(make_request())
+    request = make_request()
+    request.mode = "repair"
+    request.current_schedule = [Lesson(**l) for l in original["schedule"]]
+    result = generate_schedule(request)
+    assert result["schedule"] == original["schedule"]
+    assert result["repair"]["moved"] == 0
@@ -0,0 +1,24 @@
+from logic.schedule_diff import diff_schedules, compute_delta
+
+def lesson(class_id, teacher_id, day, period, subject_id="math"):
+    return {"class_id": class_id, "subject_id": subject_id, "teacher_id": teacher_id, "day": day, "period": period}
+
+def test_diff_classifies_moves_additions_and_removals():
+    old = [lesson("c1", "t1", "Mon", 1), lesson("c1", "t1", "Tue", 1), lesson("c2", "t2", "Mon", 1)]
+    new = [lesson("c1", "t1", "Mon", 3), lesson("c1", "t1", "Tue", 1), lesson("c3", "t2", "Fri", 5, "art")]
+
+    diff = diff_schedules(old, new)
+    assert diff["moved"] == [{
+        "class_id": "c1", "subject_id": "math", "teacher_id": "t1",
+        "from": {"day": "Mon", "period": 1}, "to": {"day": "Mon", "period": 3},
+    }]
+    assert diff["added"] == [lesson("c3", "t2", "Fri", 5, "art")]
+    assert diff["removed"] == [lesson("c2", "t2", "Mon", 1)]
+    assert diff["unchanged"] == 1
+    assert diff["by_class"]["c1"] == {"added": 0, "removed": 0, "moved": 1}
+    assert diff["by_teacher"]["t2"] == {"added": 1, "removed": 1, "moved": 0}
+
+def test_identical_schedules_have_empty_delta():
+    schedule = [lesson("c1", "t1", "Mon", 1), lesson("c1", "t1", "Mon", 2)]
+    assert compute_delta(schedule, list(reversed(schedule))) == ([], [])
+    assert diff_schedules(schedule, schedule)["moved"] == []
@@ -0,0 +1,50 @@
+from solver import generate_schedule
+from logic.engine import ortools_solve, presolved_size
+from logic.pulp_solver.core import solve_with_pulp
+import crud
+
+PERIODS = list(range(1, 8))
+
+PRESOLVE_LOG = """Presolved optimization model '': (model_fingerprint: 0x26ca089ee8095e32)
+#Variables: 1'230 ( in objective) (158 primary variables)
+  - 220 Booleans in [0,1]
+  - 10 in [1,7]
+#kBoolOr: 10 (#literals: 70)
+#kExactlyOne: 70 (#literals: 210)
+[Symmetry] Graph for symmetry has 834 nodes and 1'360 arcs.
+#kLinear1: 999
+"""
+
+
+def test_presolved_size_reads_the_log_section():
+    assert presolved_size(PRESOLVE_LOG) == (1230, 80)
+    assert presolved_size("Starting presolve at 0.00s") == (None, None)
+
+
+def test_cp_sat_and_pulp_report_model_and_search_stats(pins_request, pins):
+    stats = {}
+    schedule, _ = ortools_solve(pins_request(pins), PERIODS, stats=stats)
+    assert schedule and stats["status"] == "OPTIMAL" and stats["pinned_lessons"] == 2
+    assert stats["variables"] >= stats["lesson_vars"] > 0 and stats["presolved_variables"] is not None
+    assert stats["gap"] == 0 and stats["objective"] == stats["best_bound"]
+    assert stats["conflicts"] >= 0 and stats["wall_time"] <= stats["time_limit"]
+
+    stats = {}
+    schedule, _ = solve_with_pulp(pins_request(), PERIODS, timeout=20, stats=stats)
+    assert schedule and stats["status"] == "Optimal" and stats["constraints"] > 0 and stats["objective"] is not None
+
+
+def test_cascade_passes_are_reported_and_persisted(pins_request, db_session):
+    result = generate_schedule(pins_request())
+    assert result["status"] == "success"
+    assert [p["pass"] for p in result["solver_stats"]] == ["strict"]
+
+    _, db = db_session
+    crud.save_solve_stats(db, result["solver_stats"], result["status"], "ortools", school_id="s1", lesson_count=14)
+    crud.save_solve_stats(db, [{"pass": "strict", "wall_time": 1.5}, {"pass": "diagnostic", "wall_time": 2.25}], "conflict", "ortools", school_id="s1")
+    crud.save_solve_stats(db, [], "error", "pulp", school_id="s2")
+
+    history = crud.list_solve_stats(db, school_id="s1")
+    assert [h["status"] for h in history] == ["conflict", "success"]
+    assert history[0]["wall_time"] == 3.75 and history[1]["passes"][0]["status"] == "OPTIMAL"
+    assert len(crud.list_solve_stats(db, limit=2)) == 2
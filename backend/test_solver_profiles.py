@@ -0,0 +1,64 @@
+import pytest
+from ortools.sat.python import cp_model
+from logic.context import build_context
+from logic.engine import ortools_solve, apply_parameters
+from logic.solver_profiles import size_bucket, solver_profile, save_profiles
+from logic.tuning import schedule_cost, candidate_grid, tune, select_profiles
+
+PERIODS = list(range(1, 8))
+
+
+@pytest.fixture
+def profiles_file(tmp_path, monkeypatch):
+    path = tmp_path / "profiles.json"
+    monkeypatch.setenv("SCHEDULER_SOLVER_PROFILES", str(path))
+    return path
+
+
+def test_size_buckets():
+    assert [size_bucket(n) for n in (14, 150, 151, 400, 401, 5000)] == ["small", "small", "medium", "medium", "large", "large"]
+
+
+def test_ortools_solve_uses_the_profile_of_its_bucket(profiles_file, pins_request):
+    ctx = build_context(pins_request())
+    assert solver_profile(ctx) == {}
+
+    save_profiles(str(profiles_file), {"small": {"name": "full-lp", "params": {"linearization_level": 2, "search_branching": "FIXED_SEARCH"}}})
+    assert solver_profile(ctx)["name"] == "full-lp"
+    stats = {}
+    schedule, _ = ortools_solve(pins_request(), PERIODS, ctx=ctx, stats=stats)
+    assert len(schedule) == 14 and stats["profile"] == "full-lp"
+
+    # A broken file falls back to the defaults instead of failing the solve
+    profiles_file.write_text("{not json")
+    assert solver_profile(ctx) == {}
+
+
+def test_invalid_parameters_are_rejected():
+    with pytest.raises(ValueError):
+        apply_parameters(cp_model.CpSolver(), {"no_such_parameter": 1})
+
+
+def test_schedule_cost_uses_default_penalties():
+    lesson = lambda day, period: {"class_id": "c1", "day": day, "period": period}
+    assert schedule_cost([lesson("Mon", 1), lesson("Mon", 2)]) == 0
+    # One window, a start at period 2 and a period-0 lesson
+    assert schedule_cost([lesson("Mon", 1), lesson("Mon", 3), lesson("Tue", 2), lesson("Wed", 0), lesson("Wed", 1)]) == 5000 + 1000 + 10000
+
+
+def test_best_candidate_per_bucket(pins_request):
+    grid = candidate_grid([{"name": "default"}, {"name": "full-lp", "params": {"linearization_level": 2}}], [None, 4])
+    assert [c["name"] for c in grid] == ["default", "default@4w", "full-lp", "full-lp@4w"]
+    assert grid[3]["params"] == {"linearization_level": 2, "num_workers": 4}
+
+    outcomes = {"default": (True, 5000, 1.0), "default@4w": None, "full-lp": (True, 0, 2.0), "full-lp@4w": (False, None, 3.0)}
+
+    def runner(fn, data, candidate, time_limit):
+        outcome = outcomes[candidate["name"]]
+        return outcome and {"solved": outcome[0], "pass": "strict", "cost": outcome[1], "wall_time": outcome[2]}
+
+    runs = tune([("school", pins_request())], grid, 1.0, runner=runner)
+    assert [r.get("crashed", False) for r in runs] == [False, True, False, False]
+    profiles = select_profiles(runs, grid)
+    assert list(profiles) == ["small"] and profiles["small"]["name"] == "full-lp"
+    assert profiles["small"]["params"] == {"linearization_level": 2}
@@ -0,0 +1,68 @@
+from models import Teacher
+from logic.substitutes import SubstituteIndex, find_substitutes, MAX_SUBSTITUTIONS_PER_TEACHER
+
+
+def lesson(class_id, subject_id, teacher_id, day, period):
+    return {"class_id": class_id, "subject_id": subject_id, "teacher_id": teacher_id, "day": day, "period": period}
+
+
+TEACHERS = [
+    Teacher(id="t1", name="Absent", subjects=["math"]),
+    Teacher(id="t2", name="Math colleague", subjects=["math"]),
+    Teacher(id="t3", name="Other subject", subjects=["art"]),
+    Teacher(id="t4", name="Blocked", subjects=["math"], availability={"Mon": [1, 2]}),
+]
+
+LESSONS = [
+    lesson("5A", "math", "t1", "Mon", 1),
+    lesson("5A", "math", "t1", "Mon", 2),
+    lesson("5B", "math", "t2", "Mon", 3),
+    lesson("5A", "art", "t3", "Mon", 3),
+    lesson("5A", "math", "t1", "Tue", 1),
+]
+
+
+def test_index_tracks_busy_and_blocked_periods():
+    index = SubstituteIndex(TEACHERS, LESSONS)
+    assert not index.is_free("t1", 0, 1)
+    assert not index.is_free("t4", 0, 2)
+    assert index.is_free("t4", 1, 2)
+    assert index.subject_teachers["math"] == ["t1", "t2", "t4"]
+
+
+def test_ranks_qualified_free_teachers_first():
+    result = find_substitutes(TEACHERS, LESSONS, ["t1"], "Mon")
+    assert [entry["lesson"]["period"] for entry in result["lessons"]] == [1, 2]
+
+    first = result["lessons"][0]["substitutes"]
+    assert [c["teacher_id"] for c in first] == ["t2", "t3"]  # t4 is blocked, t1 is absent
+    assert first[0]["qualified"] and not first[1]["qualified"]
+
+    # Period 2 sits right before t2's own lesson, so it leaves no window
+    second = result["lessons"][1]["substitutes"][0]
+    assert second["teacher_id"] == "t2" and "без вікна" in second["reasons"]
+    assert second["score"] > first[0]["score"]
+
+
+def test_assignment_never_double_books_a_teacher():
+    lessons = LESSONS + [lesson("5C", "math", "t4", "Mon", 3), lesson("5C", "math", "t4", "Mon", 4), lesson("5C", "math", "t4", "Mon", 5)]
+    result = find_substitutes(TEACHERS, lessons, ["t1", "t4"], "Mon", limit=1, assign=True)
+    assert all(len(entry["substitutes"]) <= 1 for entry in result["lessons"])
+
+    assignment = result["assignment"]
+    assert len(assignment) == 5
+    taken = [(a["teacher_id"], a["lesson"]["period"]) for a in assignment if a["teacher_id"]]
+    assert len(taken) == len(set(taken))
+    for teacher_id in {t for t, _ in taken}:
+        assert sum(1 for t, _ in taken if t == teacher_id) <= MAX_SUBSTITUTIONS_PER_TEACHER
+    # t2 and t3 can cover at most two lessons each
+    assert len(taken) == 4
+
+
+def test_limit_stops_at_enough_qualified_teachers(monkeypatch):
+    index = SubstituteIndex(TEACHERS, LESSONS)
+    scanned = []
+    score = index.score
+    monkeypatch.setattr(index, "score", lambda teacher_id, *args: (scanned.append(teacher_id), score(teacher_id, *args))[1])
+    assert [c["teacher_id"] for c in index.candidates(LESSONS[0], 0, {"t1"}, limit=1)] == ["t2"]
+    assert scanned == ["t2"]  # t3 teaches another subject and is never scored
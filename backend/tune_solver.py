@@ -0,0 +1,82 @@
+"""
+Tunes the CP-SAT parameters and penalty weights per problem-size bucket and writes the
+profiles ortools_solve picks up (see logic/solver_profiles.py):
+
+    python tune_solver.py --classes 2 6 14 --time-limit 10
+    python tune_solver.py --corpus bundles/ captures/*.json --workers 1 8 --output solver_profiles.json
+
+The corpus is the generate_data.py school cut down to its first N classes (--classes) plus
+captured ScheduleRequest JSON files or bundle directories (--corpus). Each run happens in a
+child process, so a solver abort only loses that run.
+"""
+import argparse
+import glob
+import json
+import os
+
+from models import ScheduleRequest
+from generate_data import generate_data
+from executors import run_isolated
+from logic.solver_profiles import profiles_path, save_profiles
+from logic.tuning import CANDIDATES, candidate_grid, tune, select_profiles
+
+
+def generated_instances(class_counts):
+    full = generate_data()
+    for count in class_counts:
+        class_ids = {c["id"] for c in full["classes"][:count]}
+        yield f"generated-{count}", ScheduleRequest(
+            teachers=full["teachers"], subjects=full["subjects"],
+            classes=[c for c in full["classes"] if c["id"] in class_ids],
+            plan=[p for p in full["plan"] if p["class_id"] in class_ids],
+        )
+
+
+def corpus_instances(paths):
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.isdir(path):
+                files = [os.path.join(path, "request.json")] if os.path.exists(os.path.join(path, "request.json")) else \
+                    sorted(glob.glob(os.path.join(path, "*", "request.json")) + glob.glob(os.path.join(path, "*.json")))
+            else:
+                files = [path]
+            for file in files:
+                with open(file, encoding="utf-8") as f:
+                    yield file, ScheduleRequest(**json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune CP-SAT parameters and penalty weights per problem-size bucket")
+    parser.add_argument("--classes", type=int, nargs="*", default=[2, 6, 14], help="Generated instances: first N classes of generate_data.py")
+    parser.add_argument("--corpus", nargs="*", default=[], help="ScheduleRequest JSON files, bundle directories or directories of either")
+    parser.add_argument("--candidates", nargs="+", help=f"Only these candidates (of: {', '.join(c['name'] for c in CANDIDATES)})")
+    parser.add_argument("--workers", type=int, nargs="+", default=[None], help="num_workers values to combine with every candidate")
+    parser.add_argument("--time-limit", type=float, default=10.0, help="Seconds per pass")
+    parser.add_argument("--output", default=profiles_path(), help="Profiles file (default: $SCHEDULER_SOLVER_PROFILES or ./solver_profiles.json)")
+    parser.add_argument("--runs", help="Also write every run record as JSON here")
+    args = parser.parse_args()
+
+    candidates = [c for c in CANDIDATES if not args.candidates or c["name"] in args.candidates]
+    if not candidates:
+        raise SystemExit(f"No candidate matches {args.candidates}")
+    grid = candidate_grid(candidates, args.workers)
+    instances = list(generated_instances(args.classes)) + list(corpus_instances(args.corpus))
+    print(f"🎛️ {len(instances)} instances x {len(grid)} candidates, {args.time_limit}s per pass")
+
+    def report(run):
+        outcome = f"{run['pass']} cost {run['cost']}" if run["solved"] else ("CRASHED" if run.get("crashed") else "unsolved")
+        print(f"   {run['instance']} ({run['lessons']} lessons, {run['bucket']}) {run['candidate']}: {outcome} in {run['wall_time']}s")
+
+    runs = tune(instances, grid, args.time_limit, runner=run_isolated, on_run=report)
+    profiles = select_profiles(runs, grid)
+    for bucket, profile in sorted(profiles.items()):
+        print(f"✅ {bucket}: {profile['name']} {profile['score']}")
+
+    save_profiles(args.output, profiles)
+    print(f"Profiles written to {args.output}")
+    if args.runs:
+        with open(args.runs, "w", encoding="utf-8") as f:
+            json.dump(runs, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()